@@ -0,0 +1,41 @@
+import os
+from fastapi import APIRouter, Response
+
+from app.core import metrics, principal_cache
+from app.db import pool_stats
+from app.db.session import replicas
+from app.services import exercise_catalog
+
+# Operational endpoints, mounted at /internal outside the public /api/v1 router.
+# Every number is per uvicorn worker process, hence the pid in each response.
+router = APIRouter(include_in_schema=False)
+
+# GET /metrics, mounted at the root (where Prometheus looks) when METRICS_ENABLED.
+# Unlike /internal, it covers every worker when METRICS_DIR is set.
+metrics_router = APIRouter(include_in_schema=False)
+
+@metrics_router.get("/metrics")
+def read_metrics():
+    """
+    Request latency histograms by route template and status, in-flight requests,
+    pool gauges, AI call latency and errors, and cache hits/misses.
+    """
+    return Response(metrics.render(metrics.gather()), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@router.get("/db-pool")
+def read_db_pool_stats():
+    """
+    Pool sizes and checkout/overflow/invalidation counters for each engine.
+    """
+    return {"pid": os.getpid(), "engines": pool_stats.snapshot(), "replicas_healthy": replicas.health()}
+
+@router.get("/caches")
+def read_cache_stats():
+    """
+    Hit/miss counters for the in-process caches.
+    """
+    return {
+        "pid": os.getpid(),
+        "principal": principal_cache.stats(),
+        "exercise_catalog": exercise_catalog.stats(),
+    }
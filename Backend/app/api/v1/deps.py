@@ -1,15 +1,21 @@
-from fastapi import Depends, HTTPException, status
+import functools
+from types import ModuleType
+
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from typing import Optional
 
-from app.db.session import SessionLocal
+from app.db.session import SessionLocal, AsyncSessionLocal, wrote_recently
 from app.core.config import settings
-from app.core import security
+from app.core import security, principal_cache
 from app.db.models.models import User
 from app.crud import crud_user
+from app.crud.aio import crud_user as aio_crud_user
 
 # This tells FastAPI where to look for the token
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/login/token")
@@ -17,33 +23,99 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/login/token")
 class TokenData(BaseModel):
     email: Optional[str] = None
 
-def get_db():
+def get_db(request: Request):
     db = SessionLocal()
+    # Safe methods may read from a replica; get_current_user narrows this per user
+    db.info["read_only"] = request.method in ("GET", "HEAD")
     try:
         yield db
     finally:
         db.close()
 
-def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
-) -> User:
-    credentials_exception = HTTPException(
+async def get_async_db():
+    """Async counterpart of get_db. Only available when settings.DB_ASYNC is on."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _decode_token(token: str) -> tuple[TokenData, Optional[float]]:
+    """Validate the JWT and return its subject and `exp` claim."""
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
         )
         email: str = payload.get("sub")
         if email is None:
-            raise credentials_exception
+            raise _credentials_exception()
         token_data = TokenData(email=email)
     except JWTError:
-        raise credentials_exception
-    
-    user = crud_user.get_user_by_email(db, email=token_data.email)
+        raise _credentials_exception()
+    return token_data, payload.get("exp")
+
+def get_current_user(
+    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
+) -> User:
+    token_data, token_exp = _decode_token(token)
+    # The principal is cached after loading, so always load it from the primary
+    read_only = db.info.pop("read_only", False)
+
+    user = principal_cache.get(db, sub=token_data.email)
     if user is None:
-        raise credentials_exception
-    return user
\ No newline at end of file
+        user = crud_user.get_user_with_profile_by_email(db, email=token_data.email)
+        if user is None:
+            raise _credentials_exception()
+        principal_cache.put(token_data.email, user, token_exp=token_exp)
+
+    db.info["user_id"] = user.id
+    db.info["read_only"] = read_only and not wrote_recently(user.id)
+    return user
+
+async def get_current_user_async(
+    db: AsyncSession = Depends(get_async_db), token: str = Depends(oauth2_scheme)
+) -> User:
+    """get_current_user for routes on the async stack."""
+    token_data, token_exp = _decode_token(token)
+
+    user = await principal_cache.get_async(db, sub=token_data.email)
+    if user is not None:
+        return user
+
+    user = await aio_crud_user.get_user_with_profile_by_email(db, email=token_data.email)
+    if user is None:
+        raise _credentials_exception()
+    principal_cache.put(token_data.email, user, token_exp=token_exp)
+    return user
+
+# For the read routes that have an async version (app.crud.aio): the session and
+# principal on the stack settings.DB_ASYNC picks
+get_read_db = get_async_db if settings.DB_ASYNC else get_db
+get_read_user = get_current_user_async if settings.DB_ASYNC else get_current_user
+
+class ReadCrud:
+    """
+    A crud module's read functions bound to the request's session, each returning an
+    awaitable: the app.crud.aio counterpart on the async stack, otherwise the sync
+    function run in the threadpool. `crud.get_workout_plans_by_user(user_id=...)`.
+    """
+
+    def __init__(self, db, module: ModuleType, aio_module: ModuleType):
+        self._db = db
+        self._module = aio_module if settings.DB_ASYNC else module
+
+    def __getattr__(self, name: str):
+        function = getattr(self._module, name)
+        if settings.DB_ASYNC:
+            return functools.partial(function, self._db)
+        return functools.partial(run_in_threadpool, function, self._db)
+
+def read_crud(module: ModuleType, aio_module: ModuleType):
+    """A dependency giving ReadCrud for `module` and its app.crud.aio counterpart."""
+    async def dependency(db=Depends(get_read_db)) -> ReadCrud:
+        return ReadCrud(db, module, aio_module)
+    return dependency
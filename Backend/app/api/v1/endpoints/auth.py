@@ -1,30 +1,75 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from datetime import timedelta
+from datetime import datetime, timedelta
 
-from app.schemas.token import Token
-from app.crud import crud_user
-from app.core.security import create_access_token, verify_password
+from app.schemas.token import Token, RefreshTokenRequest
+from app.crud import crud_user, crud_refresh_token
+from app.core.security import create_access_token, verify_password_async
 from app.core.config import settings
 from app.api.v1 import deps
+from app.core.request_timing import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 @router.post("/token", response_model=Token)
-def login_for_access_token(
+async def login_for_access_token(
     db: Session = Depends(deps.get_db), 
     form_data: OAuth2PasswordRequestForm = Depends()
 ):
-    user = crud_user.get_user_by_email(db, email=form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    # Async so that waiting on bcrypt (in the hashing pool) doesn't hold a threadpool slot
+    user = await run_in_threadpool(crud_user.get_user_by_email, db, email=form_data.username)
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    refresh_token = await run_in_threadpool(crud_refresh_token.issue_refresh_token, db, user_id=user.id)
+    return _token_response(user.email, refresh_token)
+
+def _token_response(email: str, refresh_token: str) -> dict:
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data={"sub": email}, expires_delta=access_token_expires
+    )
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+@router.post("/refresh", response_model=Token)
+def refresh_access_token(
+    payload: RefreshTokenRequest,
+    db: Session = Depends(deps.get_db)
+):
+    """
+    Exchange a refresh token for a new access token (no password, no bcrypt).
+    The refresh token is single-use: the response carries its replacement.
+    """
+    invalid_token_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
     )
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    db_token = crud_refresh_token.get_refresh_token(db, token=payload.refresh_token, for_update=True)
+    if not db_token or db_token.expires_at <= datetime.utcnow():
+        raise invalid_token_exception
+    if db_token.revoked_at is not None:
+        # A spent token was replayed, so it may have been stolen: end the whole login
+        crud_refresh_token.revoke_refresh_token_family(db, family_id=db_token.family_id)
+        raise invalid_token_exception
+
+    email = db_token.user.email
+    refresh_token = crud_refresh_token.rotate_refresh_token(db, db_token=db_token)
+    return _token_response(email, refresh_token)
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout(
+    payload: RefreshTokenRequest,
+    db: Session = Depends(deps.get_db)
+):
+    """
+    Revoke the refresh token and every token rotated from the same login.
+    """
+    db_token = crud_refresh_token.get_refresh_token(db, token=payload.refresh_token)
+    if db_token:
+        crud_refresh_token.revoke_refresh_token_family(db, family_id=db_token.family_id)
\ No newline at end of file
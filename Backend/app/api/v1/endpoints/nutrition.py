@@ -1,32 +1,57 @@
-from fastapi import APIRouter, Depends, HTTPException, Body, Query, status
+import csv
+from fastapi import APIRouter, Depends, HTTPException, Body, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from datetime import date
 from pydantic import BaseModel
 from app.api.v1 import deps
+from app.core.config import settings
+from app.core.etag import not_modified, private_headers, weak_etag
+from app.core.json_response import json_response
+from app.core.streaming import text_reader
 from app.db.models.models import User
 from app.schemas import meal
-from app.schemas.food import FoodItem, FoodItemCreate
+from app.schemas.food import FoodImportResult, FoodItem, FoodItemCreate
 from app.schemas.meal import (UserMealLogCreate, NaturalLanguageQuery, 
                              MacroAnalysisResponse, UserMealLog, LoggedFoodItem)
 from app.crud import crud_food, crud_meal
-from app.services import nutrition_ai
+from app.crud.aio import crud_meal as aio_crud_meal
+from app.services import food_import, nutrition_ai
+from app.services.file_import import ImportReport, read_rows
+from app.core.request_timing import TimedRoute
 import json
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
+
+# The meal log reads, on the sync or async stack (settings.DB_ASYNC)
+read_meals = deps.read_crud(crud_meal, aio_crud_meal)
 
 # This is a helper schema for the delete endpoint
 class DeleteItemPayload(BaseModel):
     date: date
     log_item_id: str
 
-# Helper function to parse log response (we'll reuse this)
+# Helper function to build the log response (we'll reuse this). The items were validated
+# as LoggedFoodItems when logged, so it goes out through json_response as is.
 def parse_log_response(db_log: UserMealLog):
+    items = [
+        {
+            "log_item_id": item.log_item_id,
+            "name": item.name,
+            "quantity_g": item.quantity_g,
+            "calories": item.calories,
+            "protein": item.protein,
+            "carbs": item.carbs,
+            "fat": item.fat,
+        }
+        for item in db_log.items
+    ]
     return {
         "id": db_log.id,
         "date": db_log.date,
         "user_id": db_log.user_id,
-        "food_items": json.loads(db_log.food_items_json),
-        "total_macros": json.loads(db_log.total_macros_json)
+        "food_items": {"items": items},
+        "total_macros": crud_meal.calculate_totals(db_log.items)
     }
 
 # --- Food Library Endpoints ---
@@ -47,14 +72,66 @@ def create_food_item_for_user(
 def search_user_food_items(
     *,
     db: Session = Depends(deps.get_db),
-    query: str,
+    query: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
     current_user: User = Depends(deps.get_current_user)
 ):
     """
-    Search the user's food library.
+    Search the user's food library, best matches first. Tolerates small typos on Postgres.
     """
-    return crud_food.search_user_food_items(db=db, user_id=current_user.id, query=query)
+    return crud_food.search_user_food_items(db=db, user_id=current_user.id, query=query, limit=limit)
+
+
+# Content-Type of an import upload -> file format
+FOOD_IMPORT_FORMATS = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/json": "json",
+}
 
+def _import_foods(db: Session, request: Request, format: str, user_id: int) -> ImportReport:
+    # Runs in a worker thread, reading the body as it arrives
+    report = ImportReport(max_errors=settings.FOOD_IMPORT_MAX_ERRORS)
+    with text_reader(request) as body:
+        try:
+            food_import.import_foods(
+                db, user_id=user_id, rows=read_rows(body, format), report=report,
+                batch_size=settings.FOOD_IMPORT_BATCH_SIZE, max_rows=settings.FOOD_IMPORT_MAX_ROWS,
+            )
+        except (csv.Error, ValueError) as e:
+            # The file itself is broken from here on; the batches before it are kept
+            report.add_read_error(e)
+    return report
+
+@router.post("/foods/import", response_model=FoodImportResult)
+async def import_food_items_for_user(
+    request: Request,
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Bulk-add foods to the user's library from the request body: CSV with a header row
+    (Content-Type: text/csv), NDJSON (application/x-ndjson) or a JSON array, with the
+    fields of FoodItemCreate. The upload is streamed and inserted in batches, each in
+    its own transaction; invalid rows are skipped and listed by row number.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    format = FOOD_IMPORT_FORMATS.get(content_type)
+    if format is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Send the file as one of: {', '.join(FOOD_IMPORT_FORMATS)}",
+        )
+    report = await run_in_threadpool(_import_foods, db, request, format, current_user.id)
+    return {
+        "read": report.read,
+        "imported": report.written,
+        "invalid": report.invalid,
+        # A batch the database rejected reports its rows after later ones; sort by row
+        "errors": [{"row": row, "error": error} for row, error in sorted(report.errors)],
+        "errors_truncated": report.invalid > len(report.errors),
+    }
 
 # --- Meal Log Endpoints ---
 
@@ -76,43 +153,43 @@ def log_meal_for_user(
         log_date=log_date, 
         items_to_log=log_in.items_to_log
     )
-    
-    # We need to manually parse the JSON for the response
+    return json_response(parse_log_response(db_log))
+
+def empty_log_response(log_date: date, user_id: int):
+    """A clean, empty log for a date that has nothing logged yet."""
     return {
-        "id": db_log.id,
-        "date": db_log.date,
-        "user_id": db_log.user_id,
-        "food_items": json.loads(db_log.food_items_json),
-        "total_macros": json.loads(db_log.total_macros_json)
+        "id": -1, "date": log_date, "user_id": user_id,
+        "food_items": {"items": []},
+        "total_macros": {"calories": 0, "protein": 0, "carbs": 0, "fat": 0}
     }
 
+def log_etag(db_log, user_id: int, log_date: date) -> str:
+    """A log's ETag, from its version (bumped whenever its items change); a fixed one for an empty day."""
+    if db_log is None:
+        return weak_etag(user_id, log_date.isoformat(), 0)
+    return weak_etag(db_log.id, db_log.version)
+
 @router.get("/meals/by-date", response_model=UserMealLog)
-def get_meal_log(
+async def get_meal_log(
     *,
-    db: Session = Depends(deps.get_db),
+    crud: deps.ReadCrud = Depends(read_meals),
+    request: Request,
     log_date: date,
-    current_user: User = Depends(deps.get_current_user)
+    current_user: User = Depends(deps.get_read_user)
 ):
     """
     Get the full meal log (all items and totals) for a specific date.
+    Send If-None-Match to get a 304 when it hasn't changed (checked before loading the items).
     """
-    db_log = crud_meal.get_meal_log_by_date(db=db, user_id=current_user.id, log_date=log_date)
+    db_log = await crud.get_meal_log_header(user_id=current_user.id, log_date=log_date)
+    etag = log_etag(db_log, current_user.id, log_date)
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
     if not db_log:
-        # Return a clean, empty log for that date
-        return {
-            "id": -1, "date": log_date, "user_id": current_user.id,
-            "food_items": {"items": []},
-            "total_macros": {"calories": 0, "protein": 0, "carbs": 0, "fat": 0}
-        }
-    
-    # Manually parse JSON for the response model
-    return {
-        "id": db_log.id,
-        "date": db_log.date,
-        "user_id": db_log.user_id,
-        "food_items": json.loads(db_log.food_items_json),
-        "total_macros": json.loads(db_log.total_macros_json)
-    }
+        return json_response(empty_log_response(log_date, current_user.id), headers=private_headers(etag))
+    await crud.load_items(db_log)
+    return json_response(parse_log_response(db_log), headers=private_headers(etag))
 
 @router.put("/meals/log-item/{log_item_id}", response_model=UserMealLog)
 def update_a_logged_item(
@@ -131,7 +208,7 @@ def update_a_logged_item(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Log not found for this date")
 
     updated_log = crud_meal.update_logged_item(db, db_log=db_log, log_item_id=log_item_id, item_in=item_in)
-    return parse_log_response(updated_log)
+    return json_response(parse_log_response(updated_log))
 
 @router.delete("/meals/log-item", response_model=UserMealLog)
 def delete_a_logged_item(
@@ -149,7 +226,7 @@ def delete_a_logged_item(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Log not found for this date")
 
     updated_log = crud_meal.delete_logged_item(db, db_log=db_log, log_item_id=payload.log_item_id)
-    return parse_log_response(updated_log)
+    return json_response(parse_log_response(updated_log))
 
 # --- AI Endpoint ---
 
@@ -5,8 +5,9 @@ from app.api.v1 import deps
 from app.db.models.models import User
 from app.schemas.profile import UserProfile, UserProfileCreate, UserProfileUpdate
 from app.crud import crud_profile
+from app.core.request_timing import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 @router.get("/me", response_model=UserProfile)
 def read_current_user_profile(
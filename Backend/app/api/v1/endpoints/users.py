@@ -1,24 +1,53 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app.schemas.user import User, UserCreate
 from app.crud import crud_user
+from app.core.security import get_password_hash_async
 from app.api.v1 import deps
+from app.core import principal_cache
+from app.core.etag import not_modified, private_headers, weak_etag
+from app.core.request_timing import TimedRoute
 # from app.db.models.models import User
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
+
+def _create_user(db: Session, user: UserCreate, hashed_password: str) -> User:
+    db_user = crud_user.create_user(db=db, user=user, hashed_password=hashed_password)
+    # Serialize here so the lazy `profile` load doesn't run on the event loop
+    return User.model_validate(db_user)
 
 @router.post("/", response_model=User)
-def create_user(user: UserCreate, db: Session = Depends(deps.get_db)):
-    db_user = crud_user.get_user_by_email(db, email=user.email)
-    if db_user:
-        raise HTTPException(status_code=400, detail="Email already registered")
-    return crud_user.create_user(db=db, user=user)
+async def create_user(user: UserCreate, db: Session = Depends(deps.get_db)):
+    # Async so that waiting on bcrypt (in the hashing pool) doesn't hold a threadpool slot.
+    # A taken email is caught by the unique index on insert (400 from crud_user.create_user).
+    hashed_password = await get_password_hash_async(user.password)
+    return await run_in_threadpool(_create_user, db, user, hashed_password)
 
 @router.get("/me", response_model=User)
 def read_users_me(
+    request: Request,
+    response: Response,
+    db: Session = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_user)
 ):
     """
     Get current user.
+    Send If-None-Match to get a 304 when it hasn't changed. The versions are read from
+    the database: the cached principal may predate a profile update made on another worker.
     """
+    profile = current_user.profile
+    if crud_user.get_user_versions(db, user_id=current_user.id) != \
+            (current_user.version, profile.version if profile is not None else None):
+        # Out of date in this worker's cache. Expunged (with its profile), or the reload
+        # would hand back the same merged objects, old values and all
+        principal_cache.invalidate(user_id=current_user.id)
+        db.expunge(current_user)
+        current_user = crud_user.get_user_with_profile_by_email(db, email=current_user.email)
+        profile = current_user.profile
+    etag = weak_etag(current_user.id, current_user.version, profile.version if profile is not None else 0)
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    response.headers.update(private_headers(etag))
     return current_user
\ No newline at end of file
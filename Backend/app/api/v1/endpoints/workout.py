@@ -1,58 +1,102 @@
-import json
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+import hashlib
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
-from datetime import date
+from datetime import date, datetime
+from typing import Optional
 
 from app.api.v1 import deps
-from app.db.models.models import User
+from app.core.config import settings
+from app.core.etag import if_none_match, not_modified, private_headers, weak_etag
+from app.core.json_response import StoredJSON, json_response
+from app.core.pagination import decode_cursor, encode_cursor, link_next, split_page
+from app.db.models.models import ExerciseDifficulty, ExerciseMuscleGroup, User
 from app.crud import crud_workout
+from app.crud.aio import crud_workout as aio_crud_workout
 from app.schemas import workout as schemas
+from app.services import exercise_catalog
+from app.core.request_timing import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
+
+# The plan and log reads, on the sync or async stack (settings.DB_ASYNC)
+read_workouts = deps.read_crud(crud_workout, aio_crud_workout)
+
+# GET /workouts/logs default page size
+LOGS_PAGE_SIZE = 100
 
 # --- Helper Function ---
+# The stored exercises JSON was validated against PlanExercise / LoggedExercise when it
+# was written, so responses splice it in as is (see json_response) rather than parse it.
 def parse_plan_response(db_plan):
-    """Parses JSON string from DB into a list for the response."""
+    """The WorkoutPlan document for a row, for json_response()."""
     return {
         "id": db_plan.id,
         "name": db_plan.name,
         "user_id": db_plan.user_id,
         "goal_type": db_plan.goal_type,
-        "exercises": json.loads(db_plan.plan_details_json)
+        "exercises": StoredJSON(db_plan.plan_details_json)
     }
 
+def plan_etag(plan_id: int, updated_at: datetime) -> str:
+    return weak_etag(plan_id, f"{updated_at:%Y%m%d%H%M%S%f}")
+
+def plans_etag(user_id: int, versions) -> str:
+    """The ETag of a user's plan list, from the (id, updated_at) of each plan."""
+    listed = ",".join(f"{plan_id}:{updated_at:%Y%m%d%H%M%S%f}" for plan_id, updated_at in sorted(versions))
+    return weak_etag(user_id, len(versions), hashlib.blake2b(listed.encode(), digest_size=8).hexdigest())
+
 def parse_log_response(db_log):
-    """Parses JSON string from DB into a list for the response."""
+    """The WorkoutLog document for a row, for json_response()."""
     return {
         "id": db_log.id,
         "date": db_log.date,
         "user_id": db_log.user_id,
         "notes": db_log.notes,
-        "exercises": json.loads(db_log.log_details_json)
+        "exercises": StoredJSON(db_log.log_details_json)
     }
 
 # --- Exercise Endpoints ---
 @router.get("/exercises", response_model=list[schemas.Exercise])
 def read_master_exercise_list(
+    request: Request,
     db: Session = Depends(deps.get_db),
-    skip: int = 0,
-    limit: int = 100
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=settings.PAGE_SIZE_MAX)
 ):
     """
-    Get the master list of all available exercises.
-    """
-    return crud_workout.get_exercises(db, skip=skip, limit=limit)
+    Get the master list of all available exercises, in id order.
+    Served from the in-memory catalog; send If-None-Match to get a 304 when it hasn't changed.
+    If there are more, the Link header has the URL of the next page.
+    """
+    catalog = exercise_catalog.get(db)
+    after = decode_cursor(cursor, int)
+    start = catalog.start_after(after[0] if after else None)
+    etag = catalog.etag(start, limit)
+    # no-cache: clients may store it, but must revalidate (cheap, thanks to the ETag)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if if_none_match(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response = Response(catalog.page(start, limit), media_type="application/json", headers=headers)
+    last_id = catalog.last_id(start, limit)
+    link_next(request, response, encode_cursor(last_id) if last_id is not None else None)
+    return response
 
 @router.get("/exercises/search", response_model=list[schemas.Exercise])
 def search_master_exercise_list(
     *,
     db: Session = Depends(deps.get_db),
-    query: str = Query(..., min_length=1)
+    query: str = Query(..., min_length=1),
+    muscle_group: Optional[ExerciseMuscleGroup] = None,
+    difficulty: Optional[ExerciseDifficulty] = None,
+    limit: int = Query(20, ge=1, le=100)
 ):
     """
-    Search the master exercise list by name.
+    Search the master exercise list by name, equipment and muscle group.
+    Ranked, prefix-aware and typo-tolerant ("bench pres", "dumbell curl"); runs in memory.
     """
-    return crud_workout.search_exercises(db, query=query)
+    catalog = exercise_catalog.get(db)
+    matches = catalog.search.search(query, limit=limit, muscle_group=muscle_group, difficulty=difficulty)
+    return Response(catalog.select(matches), media_type="application/json")
 
 # --- Workout Plan Endpoints ---
 @router.post("/plans", response_model=schemas.WorkoutPlan)
@@ -66,19 +110,27 @@ def create_a_workout_plan(
     Create a new reusable workout plan.
     """
     db_plan = crud_workout.create_workout_plan(db, user_id=current_user.id, plan_in=plan_in)
-    return parse_plan_response(db_plan)
+    return json_response(parse_plan_response(db_plan))
 
 @router.get("/plans", response_model=list[schemas.WorkoutPlan])
-def get_my_workout_plans(
+async def get_my_workout_plans(
     *,
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+    crud: deps.ReadCrud = Depends(read_workouts),
+    request: Request,
+    current_user: User = Depends(deps.get_read_user)
 ):
     """
     Get all saved workout plans for the current user.
-    """
-    plans = crud_workout.get_workout_plans_by_user(db, user_id=current_user.id)
-    return [parse_plan_response(plan) for plan in plans]
+    Send If-None-Match to get a 304 when they haven't changed (checked without loading them).
+    """
+    if request.headers.get("if-none-match"):
+        versions = await crud.get_workout_plan_versions(user_id=current_user.id)
+        unchanged = not_modified(request, plans_etag(current_user.id, versions))
+        if unchanged is not None:
+            return unchanged
+    plans = await crud.get_workout_plans_by_user(user_id=current_user.id)
+    etag = plans_etag(current_user.id, [(plan.id, plan.updated_at) for plan in plans])
+    return json_response([parse_plan_response(plan) for plan in plans], headers=private_headers(etag))
 
 # --- Workout Log Endpoints ---
 @router.post("/logs", response_model=schemas.WorkoutLog)
@@ -92,37 +144,58 @@ def log_a_workout(
     Log a completed workout for a specific date.
     """
     db_log = crud_workout.create_workout_log(db, user_id=current_user.id, log_in=log_in)
-    return parse_log_response(db_log)
+    return json_response(parse_log_response(db_log))
 
 @router.get("/logs", response_model=list[schemas.WorkoutLog])
-def get_my_workout_logs(
+async def get_my_workout_logs(
     *,
-    db: Session = Depends(deps.get_db),
+    crud: deps.ReadCrud = Depends(read_workouts),
+    request: Request,
     start_date: date,
     end_date: date,
-    current_user: User = Depends(deps.get_current_user)
+    cursor: Optional[str] = None,
+    limit: int = Query(LOGS_PAGE_SIZE, ge=1, le=settings.PAGE_SIZE_MAX),
+    current_user: User = Depends(deps.get_read_user)
 ):
     """
-    Get workout logs for the current user within a date range.
-    """
-    logs = crud_workout.get_workout_logs_by_user(db, user_id=current_user.id, start_date=start_date, end_date=end_date)
-    return [parse_log_response(log) for log in logs]
+    Get workout logs for the current user within a date range, by date.
+    A page of `limit` logs; if there are more, the Link header has the URL of the next page.
+    """
+    after = decode_cursor(cursor, date.fromisoformat, int)
+    logs = await crud.get_workout_logs_by_user(
+        user_id=current_user.id, start_date=start_date, end_date=end_date,
+        after=after, limit=limit + 1
+    )
+    logs, next_cursor = split_page(logs, limit, key=lambda log: (log.date, log.id))
+    response = json_response([parse_log_response(log) for log in logs])
+    link_next(request, response, next_cursor)
+    return response
 
 # --- NEW: Get a single plan (to load it for logging) ---
 @router.get("/plans/{plan_id}", response_model=schemas.WorkoutPlan)
-def get_a_workout_plan(
+async def get_a_workout_plan(
     *,
-    db: Session = Depends(deps.get_db),
+    crud: deps.ReadCrud = Depends(read_workouts),
+    request: Request,
     plan_id: int,
-    current_user: User = Depends(deps.get_current_user)
+    current_user: User = Depends(deps.get_read_user)
 ):
     """
     Get a single workout plan by its ID.
-    """
-    db_plan = crud_workout.get_workout_plan_by_id(db, plan_id=plan_id, user_id=current_user.id)
+    Send If-None-Match to get a 304 when it hasn't changed (checked without loading it).
+    """
+    if request.headers.get("if-none-match"):
+        updated_at = await crud.get_workout_plan_version(plan_id=plan_id, user_id=current_user.id)
+        if updated_at is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Plan not found")
+        unchanged = not_modified(request, plan_etag(plan_id, updated_at))
+        if unchanged is not None:
+            return unchanged
+    db_plan = await crud.get_workout_plan_by_id(plan_id=plan_id, user_id=current_user.id)
     if not db_plan:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Plan not found")
-    return parse_plan_response(db_plan)
+    return json_response(parse_plan_response(db_plan),
+                         headers=private_headers(plan_etag(db_plan.id, db_plan.updated_at)))
 
 # --- NEW: Delete a plan ---
 @router.delete("/plans/{plan_id}", status_code=status.HTTP_204_NO_CONTENT)
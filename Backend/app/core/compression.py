@@ -0,0 +1,250 @@
+import gzip
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from starlette.datastructures import MutableHeaders
+
+from app.core import request_timing
+from app.core.config import settings
+
+# Media types worth compressing; anything else (images, archives, octet-stream) is
+# usually compressed already or too small to matter
+COMPRESSIBLE_TYPES = {"application/json", "application/problem+json", "application/javascript",
+                      "application/xml", "image/svg+xml"}
+# A compressed body has to save at least this much to be sent instead of the original
+MIN_SAVING = 0.1
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def _compressors() -> dict:
+    """Encoding -> compress function, in the server's order of preference, for the packages installed."""
+    compressors = {}
+    zstandard, brotli = _zstandard(), _brotli()
+    if zstandard is not None:
+        # Only the event loop thread compresses, so one compressor can be reused
+        compressor = zstandard.ZstdCompressor(level=settings.COMPRESSION_ZSTD_LEVEL)
+        compressors["zstd"] = compressor.compress
+    if brotli is not None:
+        compressors["br"] = lambda body: brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    # mtime=0: the same body always compresses to the same bytes
+    compressors["gzip"] = lambda body: gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+    return {encoding: compressors[encoding] for encoding in settings.COMPRESSION_ENCODINGS if encoding in compressors}
+
+
+_available: Optional[dict] = None
+
+
+def compressors() -> dict:
+    global _available
+    if _available is None:
+        _available = _compressors()
+    return _available
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    The encoding to send for an Accept-Encoding header: the one the client gives
+    the highest q-value, ties going to the server's order (COMPRESSION_ENCODINGS).
+    None if it accepts none of them.
+    """
+    if not accept_encoding:
+        return None
+    accepted: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, parameters = part.partition(";")
+        quality = 1.0
+        for parameter in parameters.split(";"):
+            key, _, value = parameter.strip().partition("=")
+            if key.lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name.strip().lower()] = quality
+    best, best_quality = None, 0.0
+    for encoding in compressors():
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class VariantCache:
+    """
+    Compressed bodies of cacheable responses, keyed like an HTTP cache would: the
+    request (method, path, query string) and the response's ETag, plus the encoding
+    and the body's length. Least recently used go first, to stay within
+    COMPRESSION_CACHE_BYTES. Only the event loop uses it.
+    """
+
+    def __init__(self):
+        self._entries: OrderedDict[tuple, bytes] = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> Optional[bytes]:
+        body = self._entries.get(key)
+        if body is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return body
+
+    def put(self, key: tuple, body: bytes):
+        if len(body) > settings.COMPRESSION_CACHE_BYTES or key in self._entries:
+            return
+        self._entries[key] = body
+        self.size += len(body)
+        while self.size > settings.COMPRESSION_CACHE_BYTES:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+
+variants = VariantCache()
+# (method, route template, encoding) -> [bytes sent, bytes before compression, CPU seconds
+# compressing]; "identity" for bodies sent as they were. Only the event loop writes it.
+_routes: dict[tuple[str, str, str], list] = {}
+
+
+def stats() -> dict:
+    """Per-route byte and CPU counts, and the variant cache's hits and misses (for app.core.metrics)."""
+    return {"routes": {key: list(values) for key, values in list(_routes.items())},
+            "hits": variants.hits, "misses": variants.misses, "cached_bytes": variants.size}
+
+
+def _record(scope, encoding: str, sent: int, uncompressed: int, seconds: float = 0.0):
+    values = _routes.setdefault((scope["method"], request_timing.route_template(scope), encoding), [0, 0, 0.0])
+    values[0] += sent
+    values[1] += uncompressed
+    values[2] += seconds
+
+
+def cache_key(scope, headers: MutableHeaders) -> Optional[tuple]:
+    """
+    The request and ETag of a versioned response that isn't one user's own (e.g. the
+    exercise catalog), whose compressed copies can be reused; None for any other.
+    Responses that differ per user must say Cache-Control: private (or no-store).
+    """
+    cache_control = headers.get("cache-control", "").lower()
+    if "etag" not in headers or "private" in cache_control or "no-store" in cache_control:
+        return None
+    return scope["method"], scope["path"], scope["query_string"], headers["etag"]
+
+
+def compress(body: bytes, encoding: str, key: Optional[tuple] = None) -> bytes:
+    """`body` in `encoding`; from the variant cache, given a cache_key(), if it's been compressed before."""
+    if key is None or not settings.COMPRESSION_CACHE_BYTES:
+        return compressors()[encoding](body)
+    key = (*key, encoding, len(body))
+    compressed = variants.get(key)
+    if compressed is None:
+        compressed = compressors()[encoding](body)
+        variants.put(key, compressed)
+    return compressed
+
+
+def _compressible(start: dict) -> bool:
+    headers = MutableHeaders(raw=start["headers"])
+    media_type = headers.get("content-type", "").split(";")[0].strip().lower()
+    return start["status"] not in (204, 304) and "content-encoding" not in headers and (
+        media_type in COMPRESSIBLE_TYPES or media_type.startswith("text/"))
+
+
+class CompressionMiddleware:
+    """
+    Compresses response bodies with the best encoding the client accepts (zstd,
+    br or gzip, see COMPRESSION_ENCODINGS). Skips bodies under
+    COMPRESSION_MIN_SIZE, media types that don't compress, responses that already
+    have a Content-Encoding, and streamed ones (more than one body message).
+    Compressed variants of cacheable responses are kept (VariantCache), so the
+    exercise catalog is compressed once per version. Bytes sent and the CPU time
+    spent compressing are counted per route (stats(), exported by
+    app.core.metrics), and the time is the "compress" phase of the request timing.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = next((value.decode("latin-1") for name, value in scope["headers"]
+                                if name == b"accept-encoding"), None)
+        encoding = negotiate(accept_encoding)
+        held = {"start": None}
+        # Recorded at the end unless the body went out compressed
+        sent = {"bytes": 0, "seconds": 0.0, "recorded": False}
+
+        async def send_compressed(message):
+            if message["type"] == "http.response.start":
+                if _compressible(message):
+                    # Held until the body shows whether it's worth compressing
+                    held["start"] = message
+                else:
+                    await send(message)
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            start, held["start"] = held["start"], None
+            if start is None:
+                # Not compressible, or the rest of a streamed body
+                sent["bytes"] += len(message.get("body", b""))
+                await send(message)
+                return
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start["headers"])
+            # The body depends on Accept-Encoding, even when this one isn't compressed
+            headers.add_vary_header("Accept-Encoding")
+            compressed = None
+            if not message.get("more_body") and encoding is not None and len(body) >= settings.COMPRESSION_MIN_SIZE:
+                started = time.thread_time()
+                with request_timing.span("compress"):
+                    compressed = compress(body, encoding, cache_key(scope, headers))
+                sent["seconds"] = time.thread_time() - started
+                if len(compressed) > len(body) * (1 - MIN_SAVING):
+                    compressed = None
+            if compressed is None:
+                sent["bytes"] += len(body)
+                await send(start)
+                await send(message)
+                return
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                # The compressed bytes aren't the ones the strong tag names
+                headers["ETag"] = f"W/{etag}"
+            _record(scope, encoding, len(compressed), len(body), sent["seconds"])
+            sent["recorded"] = True
+            await send(start)
+            await send({**message, "body": compressed})
+
+        try:
+            await self.app(scope, receive, send_compressed)
+        finally:
+            if not sent["recorded"]:
+                _record(scope, "identity", sent["bytes"], sent["bytes"], sent["seconds"])
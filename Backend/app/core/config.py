@@ -1,5 +1,6 @@
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import List
+from typing import List, Literal, Optional
 
 class Settings(BaseSettings):
     """
@@ -14,16 +15,116 @@ class Settings(BaseSettings):
     # postgresql://<user>:<password>@<host>:<port>/<dbname>
     DATABASE_URL: str
 
+    # Serve the hot read routes from an async engine (asyncpg) instead of the threadpool.
+    # ASYNC_DATABASE_URL defaults to DATABASE_URL with the driver swapped for asyncpg.
+    DB_ASYNC: bool = False
+    ASYNC_DATABASE_URL: Optional[str] = None
+
+    # Connection pool, per engine and per uvicorn worker.
+    # "queue" keeps a local pool; "pgbouncer" opens a connection per checkout (NullPool)
+    # and disables asyncpg's prepared statement cache, for PgBouncer in transaction mode.
+    DB_POOL_MODE: Literal["queue", "pgbouncer"] = "queue"
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800  # seconds, -1 to never recycle
+    # "always" pings on every checkout (one extra round trip per request);
+    # "never" relies on pool_recycle and on invalidating the pool after a disconnect error.
+    DB_POOL_PRE_PING: Literal["always", "never"] = "never"
+
+    # Read replicas. Read-only (GET/HEAD) requests are spread over the healthy replicas;
+    # writes, and a user's reads for READ_YOUR_WRITES_SECONDS after they write, use the primary.
+    # A replica that errors is skipped for REPLICA_RETRY_SECONDS. Writers are remembered per
+    # process: with several workers, a user's next GET may still hit a lagging replica.
+    DATABASE_REPLICA_URLS: List[str] = []
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+    REPLICA_RETRY_SECONDS: float = 30.0
+
+    # Name search (foods, exercises) on Postgres: when substring matches don't fill the
+    # page, names whose pg_trgm word similarity to the query reaches this are added (typos)
+    SEARCH_TYPO_THRESHOLD: float = 0.5
+
+    # Each worker serves GET /workouts/exercises from memory, and checks the catalog
+    # version in the database at most this often (seconds) to pick up other writers
+    EXERCISE_CATALOG_CHECK_SECONDS: float = 5.0
+
+    # Keyset-paginated lists (GET /workouts/exercises, /workouts/logs) take ?limit= up to
+    # this; the next page's ?cursor= comes back in a Link header. The exercise picker
+    # loads the whole catalog as one page, hence the high cap.
+    PAGE_SIZE_MAX: int = 1000
+
+    # POST /nutrition/foods/import: rows per INSERT (and transaction), the most rows one
+    # upload may add, and how many per-row errors the response lists
+    FOOD_IMPORT_BATCH_SIZE: int = 1000
+    FOOD_IMPORT_MAX_ROWS: int = 250_000
+    FOOD_IMPORT_MAX_ERRORS: int = 1000
+
+    # How the workout log and plan JSON is stored (app.db.blob_codec). Rows in any format stay
+    # readable; `python -m app.reencode_blobs` (or BLOB_REENCODE_IN_BACKGROUND) converts them
+    BLOB_FORMAT: Literal["json", "msgpack", "zstd"] = "json"
+    BLOB_ZSTD_LEVEL: int = 3
+    BLOB_REENCODE_IN_BACKGROUND: bool = False
+    BLOB_REENCODE_BATCH_SIZE: int = 500
+    # Between batches, so the re-encoder doesn't crowd out requests
+    BLOB_REENCODE_PAUSE_SECONDS: float = 1.0
+
+    # Response compression (app.core.compression). Levels are capped low because responses are
+    # compressed on the event loop; COMPRESSION_CACHE_BYTES = 0 disables the variant cache.
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024
+    COMPRESSION_ENCODINGS: List[Literal["zstd", "br", "gzip"]] = ["zstd", "br", "gzip"]
+    COMPRESSION_GZIP_LEVEL: int = Field(5, ge=1, le=6)
+    COMPRESSION_BROTLI_QUALITY: int = Field(3, ge=0, le=6)
+    COMPRESSION_ZSTD_LEVEL: int = Field(1, ge=1, le=9)
+    COMPRESSION_CACHE_BYTES: int = 8 * 1024 * 1024
+
+    # A log line per request; slower than REQUEST_SLOW_MS (0 = never) logs its SQL
+    REQUEST_TIMING_ENABLED: bool = True
+    REQUEST_SLOW_MS: float = 500.0
+    # Also send the timings and query count to clients as a Server-Timing header (development only)
+    SERVER_TIMING_HEADER: bool = False
+
+    # Development and tests only: per-route SQL budgets and lazy-load checks (app.core.query_budget).
+    # Needs REQUEST_TIMING_ENABLED; "warn" logs offending requests, "raise" fails them.
+    QUERY_BUDGET_MODE: Literal["off", "warn", "raise"] = "off"
+    QUERY_BUDGET_DEFAULT: int = 5
+
+    # GET /metrics for Prometheus; off by default, as it has no auth. With several workers, set
+    # METRICS_DIR to a directory they share (emptied on deploy) so each scrape covers them all.
+    METRICS_ENABLED: bool = False
+    METRICS_DIR: Optional[str] = None
+    METRICS_FLUSH_SECONDS: float = 5.0
+
+    # Mount the /internal stats routes (not in the OpenAPI schema). They have no auth and
+    # show pool internals and replica hosts: only turn them on behind a proxy that blocks them.
+    INTERNAL_ENDPOINTS_ENABLED: bool = False
+
     # Secret key for signing JWTs
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Refresh tokens rotate on every use; each one is valid for this long
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+
+    # In-process cache of authenticated users, keyed by the token's `sub`.
+    # Entries never outlive the token that populated them. Set TTL to 0 to disable.
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 1024
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+
+    # bcrypt runs in a dedicated process pool so it can't starve the shared threadpool.
+    # 0 workers means one per CPU core. Requests beyond workers + max pending get a 503.
+    PASSWORD_HASH_WORKERS: int = 0
+    PASSWORD_HASH_MAX_PENDING: int = 64
 
     # CORS origins, this will allow requests from specified origins
     BACKEND_CORS_ORIGINS: List[str] = ["*"]  # Allow all origins by default. Adjust as needed.
 
     #Gemini API Key
     GEMINI_API_KEY: str
+    # Answer /nutrition/nutrition/analyze from a local stub instead of Gemini (offline
+    # development, load tests); the latency imitates a real model call
+    NUTRITION_AI_STUB: bool = False
+    NUTRITION_AI_STUB_LATENCY_MS: float = 0.0
 
 
 # Create a single instance of the settings to be used throughout the app
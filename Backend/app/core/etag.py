@@ -0,0 +1,41 @@
+from typing import Optional
+
+from fastapi import Request, Response, status
+
+# One user's own data: the browser keeps it but revalidates every time, and shared
+# caches (and the compressed-variant cache, app.core.compression) don't store it
+PRIVATE_NO_CACHE = "private, no-cache"
+
+
+def _opaque_tag(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def if_none_match(header: Optional[str], etag: str) -> bool:
+    """
+    True if an If-None-Match header matches `etag`, i.e. the client's copy is
+    current and a 304 can be sent. Uses weak comparison, as RFC 9110 requires.
+    """
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    tag = _opaque_tag(etag)
+    return any(_opaque_tag(candidate) == tag for candidate in header.split(","))
+
+
+def weak_etag(*parts) -> str:
+    """W/"a-b-c" from the ids and versions a response was built from."""
+    return 'W/"' + "-".join(str(part) for part in parts) + '"'
+
+
+def private_headers(etag: str) -> dict[str, str]:
+    return {"ETag": etag, "Cache-Control": PRIVATE_NO_CACHE}
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """A 304 for a per-user response whose ETag is `etag`, if the client's copy is current."""
+    if not if_none_match(request.headers.get("if-none-match"), etag):
+        return None
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=private_headers(etag))
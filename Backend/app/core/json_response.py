@@ -0,0 +1,16 @@
+import orjson
+from fastapi import Response
+
+# JSON text the app stored after validating it, e.g. a workout log's exercises. Put
+# it in a json_response() document and orjson copies the text in as is, instead of
+# it being parsed, validated and encoded again on every read.
+StoredJSON = orjson.Fragment
+
+
+def json_response(content, **kwargs) -> Response:
+    """
+    `content` encoded by orjson, bypassing the route's response_model (which still
+    documents the shape). Only for documents that already have that shape: built
+    from rows and stored JSON written through the validated create/update paths.
+    """
+    return Response(orjson.dumps(content), media_type="application/json", **kwargs)
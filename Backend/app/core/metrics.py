@@ -0,0 +1,302 @@
+import asyncio
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from app.core import compression, principal_cache, request_timing
+from app.core.config import settings
+from app.db import pool_stats
+from app.services import exercise_catalog
+
+logger = logging.getLogger(__name__)
+
+# Latency histogram buckets (seconds); Prometheus' defaults
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+AI_BUCKETS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0)
+
+
+class _Sharded:
+    """
+    Per-thread slots, summed when read. Each thread only ever writes its own
+    slots, so updates need no lock, whether they come from the event loop or
+    from threadpool workers. Shards of finished threads are kept (and counted).
+    """
+
+    size = 1
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: list[list[float]] = []
+
+    def _shard(self) -> list[float]:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = [0] * self.size
+            self._shards.append(shard)
+        return shard
+
+    def values(self) -> list[float]:
+        return [sum(column) for column in zip(*list(self._shards))] or [0] * self.size
+
+
+class Counter(_Sharded):
+    def inc(self, amount: float = 1):
+        self._shard()[0] += amount
+
+
+class Histogram(_Sharded):
+    """Bucket counts (not cumulative, +Inf last) followed by the sum of observations."""
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.size = len(buckets) + 2
+        super().__init__()
+
+    def observe(self, value: float):
+        shard = self._shard()
+        shard[bisect.bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+
+class Labelled:
+    """One metric per combination of label values, created on first use."""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self.children: dict[tuple, _Sharded] = {}
+
+    def labels(self, *values) -> _Sharded:
+        child = self.children.get(values)
+        if child is None:
+            # setdefault is atomic, so two threads racing here end up with the same child
+            child = self.children.setdefault(values, self._factory())
+        return child
+
+
+REQUEST_LABELS = ("method", "route", "status")
+requests = Labelled(lambda: Histogram(LATENCY_BUCKETS))
+request_queries = Labelled(Counter)
+ai_latency = Histogram(AI_BUCKETS)
+ai_errors = Counter()
+# Only the event loop thread changes this (MetricsMiddleware)
+_in_flight = 0
+
+
+class MetricsMiddleware:
+    """Counts requests by route template (not raw path, so ids don't explode the series) and status."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        global _in_flight
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        _in_flight += 1
+        started = time.perf_counter()
+        queries = _query_count()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _in_flight -= 1
+            route = request_timing.route_template(scope)
+            requests.labels(scope["method"], route, str(status["code"])).observe(time.perf_counter() - started)
+            request_queries.labels(scope["method"], route).inc(_query_count() - queries)
+
+
+def _query_count() -> int:
+    # Statements counted by request_timing for the current request, if it's switched on
+    timings = request_timing.current()
+    return timings.queries if timings is not None else 0
+
+
+# --- Collection ---
+# A snapshot is {name: {"type", "help", ["buckets"], "samples": [[labels, value], ...]}},
+# labels being [[name, value], ...]; histogram values are Histogram.values() lists.
+# It is JSON, so workers can hand it to each other through METRICS_DIR.
+
+def _family(snapshot: dict, name: str, type: str, help: str, buckets: Optional[tuple] = None) -> list:
+    family = snapshot.setdefault(name, {"type": type, "help": help, "samples": []})
+    if buckets is not None:
+        family["buckets"] = list(buckets)
+    return family["samples"]
+
+
+def collect() -> dict:
+    """This process's metrics."""
+    snapshot: dict = {}
+    samples = _family(snapshot, "lifehub_http_request_duration_seconds", "histogram",
+                      "Request latency by route template and status", LATENCY_BUCKETS)
+    for values, histogram in list(requests.children.items()):
+        samples.append([list(zip(REQUEST_LABELS, values)), histogram.values()])
+    samples = _family(snapshot, "lifehub_http_request_queries_total", "counter",
+                      "SQL statements run by requests, by route template")
+    for values, counter in list(request_queries.children.items()):
+        samples.append([list(zip(REQUEST_LABELS[:2], values)), counter.values()[0]])
+    _family(snapshot, "lifehub_http_requests_in_flight", "gauge",
+            "Requests being handled").append([[], _in_flight])
+
+    _family(snapshot, "lifehub_ai_request_duration_seconds", "histogram",
+            "Latency of nutrition AI model calls", AI_BUCKETS).append([[], ai_latency.values()])
+    _family(snapshot, "lifehub_ai_errors_total", "counter",
+            "Nutrition AI analyses that failed (call errors and unusable answers)").append([[], ai_errors.values()[0]])
+
+    for engine, pool in list(pool_stats.registry.items()):
+        stats = pool.snapshot()
+        labels = [["engine", engine]]
+        for key in ("size", "checked_out", "checked_in", "overflow"):
+            if key in stats:
+                _family(snapshot, f"lifehub_db_pool_{key}", "gauge",
+                        f"Connection pool {key.replace('_', ' ')}").append([labels, stats[key]])
+        for key in ("connects", "checkouts", "overflow_checkouts", "checkout_timeouts", "invalidations"):
+            _family(snapshot, f"lifehub_db_pool_{key}_total", "counter",
+                    f"Connection pool {key.replace('_', ' ')}").append([labels, stats[key]])
+        waits = [*pool.wait_buckets, pool.wait_seconds_total]
+        _family(snapshot, "lifehub_db_pool_checkout_wait_seconds", "histogram",
+                "Time spent waiting for a pooled connection", pool_stats.WAIT_BUCKETS).append([labels, waits])
+
+    compressed = compression.stats()
+    for (method, route, encoding), (sent, uncompressed, seconds) in compressed["routes"].items():
+        labels = [["method", method], ["route", route], ["encoding", encoding]]
+        _family(snapshot, "lifehub_http_response_bytes_total", "counter",
+                "Response body bytes sent, by route template and content encoding").append([labels, sent])
+        _family(snapshot, "lifehub_http_response_uncompressed_bytes_total", "counter",
+                "The same bodies' size before compression").append([labels, uncompressed])
+        if encoding != "identity" or seconds:
+            _family(snapshot, "lifehub_http_compression_cpu_seconds_total", "counter",
+                    "CPU time spent compressing response bodies (identity: ones that didn't shrink enough)"
+                    ).append([labels, seconds])
+
+    principal = principal_cache.stats()
+    catalog = exercise_catalog.stats()
+    for cache, hits, misses in (("principal", principal["hits"], principal["misses"]),
+                                ("exercise_catalog", catalog["checks"] - catalog["loads"], catalog["loads"]),
+                                ("compressed_responses", compressed["hits"], compressed["misses"])):
+        _family(snapshot, "lifehub_cache_hits_total", "counter",
+                "Lookups (principal, compressed_responses) or version checks (exercise_catalog) that found the cached copy current").append([[["cache", cache]], hits])
+        _family(snapshot, "lifehub_cache_misses_total", "counter",
+                "Lookups or version checks that had to load from the database (or compress the response)").append([[["cache", cache]], misses])
+    return snapshot
+
+
+# --- Several workers (METRICS_DIR) ---
+
+def _snapshot_path(pid: int) -> str:
+    return os.path.join(settings.METRICS_DIR, f"metrics-{pid}.json")
+
+
+def flush():
+    """Write this worker's snapshot where the other workers' scrapes can read it."""
+    path = _snapshot_path(os.getpid())
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as file:
+        json.dump({"pid": os.getpid(), "metrics": collect()}, file)
+    # Readers see the old file or the new one, never half of one
+    os.replace(temporary, path)
+
+
+async def run_flusher():
+    """Flush every METRICS_FLUSH_SECONDS until cancelled (started from the app's lifespan)."""
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    try:
+        while True:
+            try:
+                flush()
+            except OSError:
+                logger.warning("Could not write metrics to %s", settings.METRICS_DIR, exc_info=True)
+            await asyncio.sleep(settings.METRICS_FLUSH_SECONDS)
+    finally:
+        flush()
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _merge(snapshots: list[tuple[bool, dict]]) -> dict:
+    """
+    Add up several workers' snapshots. Counters and histograms include workers
+    that have exited (so totals never go backwards); gauges only live ones.
+    """
+    merged: dict = {}
+    for alive, snapshot in snapshots:
+        for name, family in snapshot.items():
+            if family["type"] == "gauge" and not alive:
+                continue
+            target = merged.setdefault(name, {**family, "samples": {}})
+            for labels, value in family["samples"]:
+                key = tuple(map(tuple, labels))
+                if isinstance(value, list):
+                    previous = target["samples"].get(key)
+                    target["samples"][key] = [a + b for a, b in zip(previous, value)] if previous else value
+                else:
+                    target["samples"][key] = target["samples"].get(key, 0) + value
+    for family in merged.values():
+        family["samples"] = [[list(key), value] for key, value in family["samples"].items()]
+    return merged
+
+
+def gather() -> dict:
+    """Metrics for the whole server: this worker's, plus the others' when METRICS_DIR is set."""
+    if not settings.METRICS_DIR:
+        return collect()
+    flush()
+    snapshots = []
+    for entry in os.scandir(settings.METRICS_DIR):
+        if not (entry.name.startswith("metrics-") and entry.name.endswith(".json")):
+            continue
+        try:
+            with open(entry.path) as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            continue  # Removed or replaced while listing
+        snapshots.append((_alive(data["pid"]), data["metrics"]))
+    return _merge(snapshots)
+
+
+# --- Text exposition format ---
+
+def _escape(value) -> str:
+    return str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def _series(name: str, labels: list, value) -> str:
+    if labels:
+        name += "{" + ",".join(f'{key}="{_escape(label)}"' for key, label in labels) + "}"
+    return f"{name} {value}"
+
+
+def render(snapshot: dict) -> str:
+    lines = []
+    for name, family in sorted(snapshot.items()):
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['type']}")
+        for labels, value in family["samples"]:
+            if family["type"] != "histogram":
+                lines.append(_series(name, labels, value))
+                continue
+            cumulative = 0
+            for bound, count in zip([*family["buckets"], "+Inf"], value[:-1]):
+                cumulative += count
+                lines.append(_series(f"{name}_bucket", [*labels, ["le", bound]], cumulative))
+            lines.append(_series(f"{name}_count", labels, cumulative))
+            lines.append(_series(f"{name}_sum", labels, float(value[-1])))
+    return "\n".join(lines) + "\n"
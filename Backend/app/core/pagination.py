@@ -0,0 +1,45 @@
+import base64
+import json
+from datetime import date
+from typing import Callable, Optional
+
+from fastapi import HTTPException, Request, Response, status
+
+
+def encode_cursor(*values) -> str:
+    """
+    Opaque token for the sort key of the last row on a page, e.g. (date, id).
+    It's URL-safe base64 JSON, but clients should treat it as a string.
+    """
+    key = [value.isoformat() if isinstance(value, date) else value for value in values]
+    raw = json.dumps(key, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: Optional[str], *types: Callable) -> Optional[tuple]:
+    """The sort key from `encode_cursor`, each value converted by `types`; 400 if it's malformed."""
+    if token is None:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        if not isinstance(key, list) or len(key) != len(types):
+            raise ValueError(token)
+        return tuple(convert(value) for convert, value in zip(types, key))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def split_page(rows: list, limit: int, key: Callable) -> tuple[list, Optional[str]]:
+    """
+    `rows` are fetched with limit + 1, so one extra row means there's a next page.
+    Returns the page and the cursor for the page after it (None on the last one).
+    """
+    if len(rows) <= limit:
+        return rows, None
+    return rows[:limit], encode_cursor(*key(rows[limit - 1]))
+
+
+def link_next(request: Request, response: Response, cursor: Optional[str]):
+    """Point the client at the next page (RFC 8288 Link header); the body stays a plain list."""
+    if cursor is not None:
+        response.headers["Link"] = f'<{request.url.include_query_params(cursor=cursor)}>; rel="next"'
@@ -0,0 +1,82 @@
+import time
+from typing import Optional
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db.models.models import User
+
+# Cache of authenticated users (with their profile) keyed by the JWT `sub` (email).
+# We never cache a session-bound instance: each entry is a detached copy, and each
+# request merges it into its own session with load=False, which costs no SQL.
+_cache = TTLCache(
+    max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+
+def _detached_copy(obj):
+    """Copy the loaded column values of `obj` into a fresh detached instance."""
+    mapper = inspect(obj).mapper
+    copy = mapper.class_()
+    for attr in mapper.column_attrs:
+        setattr(copy, attr.key, getattr(obj, attr.key))
+    return copy
+
+
+def get(db: Session, sub: str) -> Optional[User]:
+    """Return the cached user for `sub` attached to `db`, or None on a miss."""
+    cached = _cache.get(sub)
+    if cached is None:
+        return None
+    return db.merge(cached, load=False)
+
+
+async def get_async(db, sub: str) -> Optional[User]:
+    """`get` for an AsyncSession."""
+    cached = _cache.get(sub)
+    if cached is None:
+        return None
+    return await db.merge(cached, load=False)
+
+
+def put(sub: str, user: User, token_exp: Optional[float] = None) -> None:
+    """
+    Cache `user` (whose profile must already be loaded) for `sub`.
+    `token_exp` is the token's `exp` claim; the entry never outlives it.
+    """
+    if not _cache.enabled:
+        return
+    ttl = None
+    if token_exp is not None:
+        ttl = token_exp - time.time()
+        if ttl <= 0:
+            return
+
+    user_copy = _detached_copy(user)
+    profile_copy = _detached_copy(user.profile) if user.profile is not None else None
+    user_copy.profile = profile_copy
+    if profile_copy is not None:
+        make_transient_to_detached(profile_copy)
+    make_transient_to_detached(user_copy)
+
+    _cache.set(sub, user_copy, ttl_seconds=ttl)
+
+
+def invalidate(user_id: Optional[int] = None, sub: Optional[str] = None) -> None:
+    """Evict a user after a write to their `users` or `user_profiles` row."""
+    if sub is not None:
+        _cache.pop(sub)
+    if user_id is not None:
+        # Writes are rare and the cache is small, so a scan beats keeping an index
+        _cache.pop_where(lambda cached: cached.id == user_id)
+
+
+def clear() -> None:
+    _cache.clear()
+
+
+def stats() -> dict:
+    return _cache.stats()
@@ -0,0 +1,110 @@
+import logging
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core import request_timing
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Most SQL statements a request to each route may run, worst case: a principal cache
+# miss (the user and profile, one joined query), an exercise catalog reload, and the
+# extra statements of the SQLite fallbacks. None means unbounded (it grows with the
+# input). Routes not listed get QUERY_BUDGET_DEFAULT. benchmarks.check_query_budgets
+# calls every route and fails when one goes over or isn't listed here.
+ROUTE_BUDGETS: dict[str, Optional[int]] = {
+    "POST /api/v1/login/token": 2,
+    "POST /api/v1/login/refresh": 3,
+    "POST /api/v1/login/logout": 2,
+    "POST /api/v1/users/": 1,
+    # The version check, and reloading the principal when this worker's copy is out of date
+    "GET /api/v1/users/me": 3,
+    "GET /api/v1/profile/me": 1,
+    "POST /api/v1/profile/": 2,
+    "PUT /api/v1/profile/me": 2,
+    "POST /api/v1/nutrition/foods": 2,
+    # The substring matches, then (when too few) set_config and the typo matches
+    "GET /api/v1/nutrition/foods/search": 4,
+    # One INSERT per FOOD_IMPORT_BATCH_SIZE rows
+    "POST /api/v1/nutrition/foods/import": None,
+    # The append (one statement on Postgres, two on SQLite), then the log's items
+    "POST /api/v1/nutrition/meals/log": 4,
+    "GET /api/v1/nutrition/meals/by-date": 3,
+    # With the UPDATE bumping the log's version
+    "PUT /api/v1/nutrition/meals/log-item/{log_item_id}": 5,
+    "DELETE /api/v1/nutrition/meals/log-item": 5,
+    "POST /api/v1/nutrition/nutrition/analyze": 1,
+    "GET /api/v1/workouts/exercises": 2,
+    "GET /api/v1/workouts/exercises/search": 2,
+    "POST /api/v1/workouts/plans": 2,
+    # With If-None-Match, the version lookup before (when it doesn't match) the full load
+    "GET /api/v1/workouts/plans": 3,
+    "GET /api/v1/workouts/plans/{plan_id}": 3,
+    "DELETE /api/v1/workouts/plans/{plan_id}": 3,
+    "POST /api/v1/workouts/logs": 2,
+    "GET /api/v1/workouts/logs": 2,
+    "DELETE /api/v1/workouts/logs/{log_id}": 3,
+}
+
+
+class QueryBudgetExceeded(Exception):
+    """A request ran more SQL than its route's budget, or lazy-loaded a relationship (QUERY_BUDGET_MODE=raise)."""
+
+
+def route_key(scope) -> str:
+    return f"{scope['method']} {request_timing.route_template(scope)}"
+
+
+def budget_for(scope) -> Optional[int]:
+    return ROUTE_BUDGETS.get(route_key(scope), settings.QUERY_BUDGET_DEFAULT)
+
+
+def _timings() -> Optional[request_timing.RequestTimings]:
+    timings = request_timing.current()
+    # scope["route"] is only there once routing is done; statements before that aren't budgeted
+    if timings is None or "route" not in timings.scope:
+        return None
+    if timings.budget is None:
+        timings.budget = budget_for(timings.scope)
+    return timings
+
+
+def _on_lazy_load(orm_execute_state):
+    if not orm_execute_state.is_select or orm_execute_state.lazy_loaded_from is None:
+        return
+    timings = _timings()
+    if timings is None:
+        return
+    attribute = f"{orm_execute_state.lazy_loaded_from.class_.__name__}.{orm_execute_state.loader_strategy_path[-1].key}"
+    timings.lazy_loads.append(attribute)
+    if settings.QUERY_BUDGET_MODE == "raise":
+        raise QueryBudgetExceeded(
+            f"{route_key(timings.scope)} lazy-loaded {attribute}; load it with the query (joinedload/selectinload)")
+
+
+def _check_budget(conn, cursor, statement, parameters, context, executemany):
+    timings = _timings()
+    # queries counts finished statements, so this one would be number queries + 1
+    if timings is None or timings.budget is None or timings.queries < timings.budget:
+        return
+    if settings.QUERY_BUDGET_MODE == "raise":
+        raise QueryBudgetExceeded(
+            f"{route_key(timings.scope)} is about to run SQL statement {timings.queries + 1}, "
+            f"over its budget of {timings.budget}: {' '.join(statement.split())}")
+
+
+def instrument(engine):
+    """
+    Hold requests that go through `engine` to their route's query budget. Going
+    over, or lazy-loading a relationship, raises QueryBudgetExceeded with
+    QUERY_BUDGET_MODE=raise; with "warn", RequestTimingMiddleware logs the
+    request with its statements instead. Does nothing when the mode is "off".
+    """
+    if settings.QUERY_BUDGET_MODE == "off":
+        return
+    event.listen(engine, "before_cursor_execute", _check_budget)
+    # Registered on the Session class (sync and async sessions), once
+    if not event.contains(Session, "do_orm_execute", _on_lazy_load):
+        event.listen(Session, "do_orm_execute", _on_lazy_load)
@@ -0,0 +1,200 @@
+import functools
+import inspect
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Statements kept per request for the slow-request log; the count and time cover all of them
+MAX_STATEMENTS = 200
+
+
+class RequestTimings:
+    """
+    Where one request's time went. The middleware creates one per request and
+    puts it in a context variable, which worker threads (sync endpoints and
+    dependencies) inherit, so the engine hooks and span() add to the same object.
+    """
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements: list[tuple[str, float]] = []
+        self.spans: dict[str, float] = {}
+        # When the endpoint function returned (None if it raised); what follows is
+        # FastAPI validating and serializing the return value against the response_model
+        self.endpoint_finished: Optional[float] = None
+        # Filled in by app.core.query_budget when QUERY_BUDGET_MODE is on
+        self.budget: Optional[int] = None
+        self.lazy_loads: list[str] = []
+
+    def record_query(self, statement: str, seconds: float):
+        self.queries += 1
+        self.db_seconds += seconds
+        if len(self.statements) < MAX_STATEMENTS:
+            self.statements.append((statement, seconds))
+
+    def summary(self, response_started: float) -> dict[str, float]:
+        """Milliseconds per phase: db, ser(ialization), any span()s, and total."""
+        phases = {"db": self.db_seconds}
+        if self.endpoint_finished is not None:
+            phases["ser"] = response_started - self.endpoint_finished
+        phases.update(self.spans)
+        phases["total"] = response_started - self.started
+        return {name: round(seconds * 1000, 2) for name, seconds in phases.items()}
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def route_template(scope) -> str:
+    """
+    "/api/v1/workouts/plans/{plan_id}" for a request to /api/v1/workouts/plans/5.
+    The router fills in scope["route"] when a route matched, but an included router's
+    route only knows its own part of the path; the prefix (which has no parameters
+    here) is the rest of the request path.
+    """
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    segments = scope["path"].split("/")
+    return "/".join(segments[:len(segments) - len(route.path.split("/")) + 1]) + route.path
+
+
+def current() -> Optional[RequestTimings]:
+    """The timings of the request being handled, if any."""
+    return _current.get()
+
+
+@contextmanager
+def span(name: str):
+    """Add the time spent in the block to the current request's `name` phase (e.g. "ai")."""
+    timings = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings.spans[name] = timings.spans.get(name, 0.0) + time.perf_counter() - started
+
+
+def instrument(engine):
+    """Count and time every statement `engine` runs on behalf of a request."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        timings = _current.get()
+        if timings is not None:
+            timings.record_query(statement, time.perf_counter() - started)
+
+
+def _mark_endpoint_finished():
+    timings = _current.get()
+    if timings is not None:
+        timings.endpoint_finished = time.perf_counter()
+
+
+def _timed_endpoint(endpoint):
+    # functools.wraps keeps the signature FastAPI reads the parameters from
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def timed(*args, **kwargs):
+            result = await endpoint(*args, **kwargs)
+            _mark_endpoint_finished()
+            return result
+    else:
+        @functools.wraps(endpoint)
+        def timed(*args, **kwargs):
+            result = endpoint(*args, **kwargs)
+            _mark_endpoint_finished()
+            return result
+    return timed
+
+
+class TimedRoute(APIRoute):
+    """APIRoute that notes when its endpoint returns, so response serialization is timed separately."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+
+def _server_timing(phases: dict[str, float], queries: int) -> str:
+    entries = []
+    for name, ms in phases.items():
+        entry = f"{name};dur={ms}"
+        if name == "db":
+            entry += f';desc="{queries} {"query" if queries == 1 else "queries"}"'
+        entries.append(entry)
+    return ", ".join(entries)
+
+
+class RequestTimingMiddleware:
+    """
+    Logs one line per request with where its time went (db, ser, ai, total) and
+    the query count; with SERVER_TIMING_HEADER, the response also carries them
+    as a Server-Timing header. Requests slower than REQUEST_SLOW_MS are logged
+    as warnings with each SQL statement they ran and how long it took.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings = RequestTimings(scope)
+        token = _current.set(timings)
+        result = {"status": 500, "phases": None}
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                result["status"] = message["status"]
+                result["phases"] = timings.summary(time.perf_counter())
+                if settings.SERVER_TIMING_HEADER:
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (b"server-timing", _server_timing(result["phases"], timings.queries).encode()),
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            self._log(scope, timings, result["status"], result["phases"] or timings.summary(time.perf_counter()))
+
+    def _log(self, scope, timings: RequestTimings, status: int, phases: dict[str, float]):
+        fields = {"method": scope["method"], "path": scope["path"], "status": status,
+                  "queries": timings.queries, **{f"{name}_ms": ms for name, ms in phases.items()}}
+        line = " ".join(f"{key}={value}" for key, value in fields.items())
+        problem = None
+        if timings.budget is not None and timings.queries > timings.budget or timings.lazy_loads:
+            # QUERY_BUDGET_MODE=warn (with "raise" the request failed at the offending query)
+            problem = "request over query budget"
+            line += f" budget={timings.budget} lazy_loads={','.join(timings.lazy_loads) or '-'}"
+        elif settings.REQUEST_SLOW_MS and phases["total"] >= settings.REQUEST_SLOW_MS:
+            problem = "slow request"
+        if problem:
+            statements = "".join(f"\n  {seconds * 1000:8.2f} ms  {' '.join(statement.split())}"
+                                 for statement, seconds in timings.statements)
+            if timings.queries > len(timings.statements):
+                statements += f"\n  ... and {timings.queries - len(timings.statements)} more"
+            logger.warning("%s %s%s", problem, line, statements, extra={"request_timing": fields})
+        else:
+            logger.info("request %s", line, extra={"request_timing": fields})
@@ -0,0 +1,45 @@
+import io
+
+from anyio import from_thread
+from starlette.requests import Request
+
+
+class RequestBodyReader(io.RawIOBase):
+    """
+    A blocking, file-like view of a request body that's still arriving, for code
+    running in a worker thread (run_in_threadpool). Each read pulls the next
+    chunk from the event loop, so the body is never held in memory as a whole
+    and a slow consumer slows the upload down instead of buffering it.
+    """
+
+    def __init__(self, request: Request):
+        self._chunks = request.stream()
+        self._pending = b""
+
+    def readable(self) -> bool:
+        return True
+
+    async def _next_chunk(self) -> bytes:
+        return await self._chunks.__anext__()
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            try:
+                self._pending = from_thread.run(self._next_chunk)
+            except StopAsyncIteration:
+                return 0
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+def text_reader(request: Request) -> io.TextIOWrapper:
+    """
+    The request body as text, read incrementally (see RequestBodyReader).
+    UTF-8, with any byte-order mark dropped (spreadsheet CSV exports add one);
+    undecodable bytes become U+FFFD rather than failing the whole upload.
+    """
+    return io.TextIOWrapper(
+        io.BufferedReader(RequestBodyReader(request)), encoding="utf-8-sig", errors="replace", newline=""
+    )
@@ -0,0 +1,33 @@
+from datetime import date
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from app.db.models.models import MealLogItem, UserMealLog
+
+# Async counterparts of the read paths in app.crud.crud_meal.
+
+async def get_meal_log_by_date(db: AsyncSession, user_id: int, log_date: date):
+    result = await db.execute(
+        select(UserMealLog).options(selectinload(UserMealLog.items)).filter(
+            UserMealLog.user_id == user_id,
+            UserMealLog.date == log_date
+        )
+    )
+    return result.scalars().first()
+
+async def get_meal_log_header(db: AsyncSession, user_id: int, log_date: date):
+    result = await db.execute(
+        select(UserMealLog).filter(
+            UserMealLog.user_id == user_id,
+            UserMealLog.date == log_date
+        )
+    )
+    return result.scalars().first()
+
+async def load_items(db: AsyncSession, db_log: UserMealLog) -> UserMealLog:
+    result = await db.execute(
+        select(MealLogItem).where(MealLogItem.meal_log_id == db_log.id).order_by(MealLogItem.id)
+    )
+    set_committed_value(db_log, "items", result.scalars().all())
+    return db_log
@@ -0,0 +1,16 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from app.db.models.models import User
+
+# Async counterparts of app.crud.crud_user, for routes on the async stack.
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    result = await db.execute(select(User).filter(User.email == email))
+    return result.scalars().first()
+
+async def get_user_with_profile_by_email(db: AsyncSession, email: str):
+    result = await db.execute(
+        select(User).options(joinedload(User.profile)).filter(User.email == email)
+    )
+    return result.scalars().first()
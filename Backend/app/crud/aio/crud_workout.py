@@ -0,0 +1,49 @@
+from datetime import date, datetime
+from typing import Optional
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models.models import WorkoutPlan, WorkoutLog
+
+# Async counterparts of the read paths in app.crud.crud_workout.
+
+async def get_workout_plans_by_user(db: AsyncSession, user_id: int):
+    result = await db.execute(select(WorkoutPlan).filter(WorkoutPlan.user_id == user_id))
+    return result.scalars().all()
+
+async def get_workout_plan_versions(db: AsyncSession, user_id: int) -> list[tuple[int, datetime]]:
+    result = await db.execute(
+        select(WorkoutPlan.id, WorkoutPlan.updated_at).filter(WorkoutPlan.user_id == user_id)
+    )
+    return [tuple(row) for row in result.all()]
+
+async def get_workout_plan_version(db: AsyncSession, plan_id: int, user_id: int) -> Optional[datetime]:
+    result = await db.execute(
+        select(WorkoutPlan.updated_at).filter(
+            WorkoutPlan.id == plan_id,
+            WorkoutPlan.user_id == user_id
+        )
+    )
+    return result.scalar()
+
+async def get_workout_plan_by_id(db: AsyncSession, plan_id: int, user_id: int):
+    result = await db.execute(
+        select(WorkoutPlan).filter(
+            WorkoutPlan.id == plan_id,
+            WorkoutPlan.user_id == user_id
+        )
+    )
+    return result.scalars().first()
+
+async def get_workout_logs_by_user(
+    db: AsyncSession, user_id: int, start_date: date, end_date: date,
+    after: Optional[tuple[date, int]] = None, limit: Optional[int] = None
+):
+    statement = select(WorkoutLog).filter(
+        WorkoutLog.user_id == user_id,
+        WorkoutLog.date >= start_date,
+        WorkoutLog.date <= end_date
+    )
+    if after is not None:
+        statement = statement.filter(tuple_(WorkoutLog.date, WorkoutLog.id) > tuple_(*after))
+    result = await db.execute(statement.order_by(WorkoutLog.date, WorkoutLog.id).limit(limit))
+    return result.scalars().all()
@@ -0,0 +1,66 @@
+from typing import Optional, TypeVar
+from fastapi import HTTPException, status
+from sqlalchemy import func, literal, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Query, Session
+from app.core.config import settings
+
+ModelType = TypeVar("ModelType")
+
+# SQLSTATE for unique_violation (psycopg2 exposes it as pgcode, asyncpg as sqlstate)
+UNIQUE_VIOLATION = "23505"
+
+def is_unique_violation(error: IntegrityError) -> bool:
+    orig = error.orig
+    code = getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+    if code is not None:
+        return code == UNIQUE_VIOLATION
+    # SQLite has no SQLSTATE, only the message
+    return "UNIQUE constraint failed" in str(orig)
+
+def save(db: Session, obj: ModelType, conflict_detail: Optional[str] = None) -> ModelType:
+    """
+    Add `obj` and commit, without a refresh() afterwards.
+
+    The INSERT fetches the primary key (and any server defaults) with RETURNING,
+    and sessions don't expire on commit (see SessionLocal), so the returned object
+    is complete without another SELECT. If `conflict_detail` is given, a unique
+    violation becomes a 400 with that detail instead of a 500.
+    """
+    db.add(obj)
+    try:
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        if conflict_detail is not None and is_unique_violation(e):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=conflict_detail)
+        raise
+    return obj
+
+def _escape_like(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def search_by_name(db: Session, query: Query, column, text: str, limit: int) -> list:
+    """
+    Rows of `query` whose `column` matches `text`, best `limit` matches first.
+
+    On Postgres both steps below are served by the column's gin_trgm_ops index:
+    substring matches come first, ranked by trigram word similarity, and only
+    if there are fewer than `limit` of them is a second query run for close
+    misspellings (word_similarity >= SEARCH_TYPO_THRESHOLD). Other backends
+    get the plain ILIKE, by name.
+    """
+    contains = column.ilike(f"%{_escape_like(text)}%", escape="\\")
+    if db.get_bind().dialect.name != "postgresql":
+        return query.filter(contains).order_by(column).limit(limit).all()
+
+    rank = func.word_similarity(text, column).desc()
+    matches = query.filter(contains).order_by(rank, column).limit(limit).all()
+    if len(matches) == limit:
+        return matches
+    # `<%` compares against the GUC, so set it for this transaction only
+    db.execute(select(func.set_config(
+        "pg_trgm.word_similarity_threshold", str(settings.SEARCH_TYPO_THRESHOLD), True
+    )))
+    similar = literal(text).op("<%")(column)
+    return matches + query.filter(similar, ~contains).order_by(rank, column).limit(limit - len(matches)).all()
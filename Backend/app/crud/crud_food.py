@@ -1,22 +1,18 @@
 from sqlalchemy.orm import Session
 from app.db.models.models import FoodItem
 from app.schemas.food import FoodItemCreate
+from app.crud.base import save, search_by_name
 
 def create_user_food_item(db: Session, food_in: FoodItemCreate, user_id: int):
     """
     Create a new food item for a user's personal library.
     """
-    db_food = FoodItem(**food_in.dict(), user_id=user_id)
-    db.add(db_food)
-    db.commit()
-    db.refresh(db_food)
-    return db_food
+    db_food = FoodItem(**food_in.model_dump(), user_id=user_id)
+    return save(db, db_food)
 
-def search_user_food_items(db: Session, user_id: int, query: str):
+def search_user_food_items(db: Session, user_id: int, query: str, limit: int = 20):
     """
-    Search a user's food library by name.
+    Search a user's food library by name, best matches first.
     """
-    return db.query(FoodItem).filter(
-        FoodItem.user_id == user_id,
-        FoodItem.name.ilike(f"%{query}%")
-    ).all()
\ No newline at end of file
+    user_foods = db.query(FoodItem).filter(FoodItem.user_id == user_id)
+    return search_by_name(db, user_foods, FoodItem.name, query, limit)
\ No newline at end of file
@@ -1,51 +1,99 @@
-from sqlalchemy.orm import Session
-from app.db.models.models import UserMealLog
+from sqlalchemy import column, insert as sa_insert, select, true, values
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from app.db.models.models import UserMealLog, MealLogItem
 from app.schemas.meal import LoggedFoodItem, MealLogContents, UserMealLogCreate
 from datetime import date
-import json
+
+MACRO_FIELDS = ("calories", "protein", "carbs", "fat")
+ITEM_FIELDS = ("log_item_id", "name", "quantity_g") + MACRO_FIELDS
 
 def get_meal_log_by_date(db: Session, user_id: int, log_date: date):
+    return db.query(UserMealLog).options(selectinload(UserMealLog.items)).filter(
+        UserMealLog.user_id == user_id,
+        UserMealLog.date == log_date
+    ).first()
+
+def get_meal_log_header(db: Session, user_id: int, log_date: date):
+    """The day's log without its items: enough for its ETag (see load_items)."""
     return db.query(UserMealLog).filter(
         UserMealLog.user_id == user_id,
         UserMealLog.date == log_date
     ).first()
 
+def load_items(db: Session, db_log: UserMealLog) -> UserMealLog:
+    """Fill in db_log.items for a log from get_meal_log_header, as selectinload would have."""
+    items = db.scalars(
+        select(MealLogItem).where(MealLogItem.meal_log_id == db_log.id).order_by(MealLogItem.id)
+    ).all()
+    set_committed_value(db_log, "items", items)
+    return db_log
+
+def calculate_totals(items) -> dict:
+    """Sum the macros of a log's items (ORM rows or LoggedFoodItems)."""
+    totals = {field: 0 for field in MACRO_FIELDS}
+    for item in items:
+        for field in MACRO_FIELDS:
+            totals[field] += getattr(item, field)
+    return totals
+
+def get_logged_item(db_log: UserMealLog, log_item_id: str):
+    # db_log.items is already loaded (ordered by id), so no query is needed.
+    # First match wins, as with the old JSON list, if an id was logged twice
+    return next((item for item in db_log.items if item.log_item_id == log_item_id), None)
+
 def log_meal(db: Session, user_id: int, log_date: date, items_to_log: list[LoggedFoodItem]):
     """
     Adds food items to a user's meal log for a specific date.
-    If no log exists for that date, it creates one.
+    If no log exists for that date, it creates one. Returns the log with all of
+    its items, which takes one SELECT after the append.
     """
-    # 1. Check if a log for this date already exists
-    db_log = get_meal_log_by_date(db, user_id=user_id, log_date=log_date)
-
-    if not db_log:
-        # Create a new log for this date
-        db_log = UserMealLog(user_id=user_id, date=log_date, food_items_json="{}", total_macros_json="{}")
-        db.add(db_log)
-        db.commit()
-        db.refresh(db_log)
-
-    # 2. Get current items and totals from the log
-    current_contents = MealLogContents.parse_raw(db_log.food_items_json) if db_log.food_items_json and db_log.food_items_json != "{}" else MealLogContents()
-    current_totals = json.loads(db_log.total_macros_json) if db_log.total_macros_json and db_log.total_macros_json != "{}" else {"calories": 0, "protein": 0, "carbs": 0, "fat": 0}
-
-    # 3. Add new items and update totals
-    for item in items_to_log:
-        current_contents.items.append(item)
-        current_totals["calories"] += item.calories
-        current_totals["protein"] += item.protein
-        current_totals["carbs"] += item.carbs
-        current_totals["fat"] += item.fat
-        
-    # 4. Save the updated data back to the DB as JSON strings
-    db_log.food_items_json = current_contents.json()
-    db_log.total_macros_json = json.dumps(current_totals)
-    
-    db.add(db_log)
+    # The log is upserted on (user_id, date), so concurrent first-of-day appends
+    # land on the same row instead of racing to create it
+    if db.get_bind().dialect.name == "postgresql":
+        # One round trip for the whole append; it returns the log's id
+        meal_log_id = db.execute(_append_items_statement(user_id, log_date, items_to_log)).scalars().first()
+    else:
+        # SQLite can't put DML in a CTE: upsert the log, then insert against its id
+        meal_log_id = db.execute(_upsert_log_statement(sqlite.insert, user_id, log_date)).scalar_one()
+        if items_to_log:
+            db.execute(
+                sa_insert(MealLogItem),
+                [{"meal_log_id": meal_log_id, **item.model_dump()} for item in items_to_log]
+            )
     db.commit()
-    db.refresh(db_log)
-    
-    return db_log
+    # Everything but the items is known already, so only they are read back
+    return load_items(db, UserMealLog(id=meal_log_id, user_id=user_id, date=log_date))
+
+def _upsert_log_statement(insert, user_id: int, log_date: date):
+    upsert = insert(UserMealLog).values(user_id=user_id, date=log_date)
+    # The update bumps the version (its items are about to change), and means
+    # RETURNING yields the id whether the row is new or not
+    return upsert.on_conflict_do_update(
+        index_elements=[UserMealLog.user_id, UserMealLog.date],
+        set_={"version": UserMealLog.version + 1},
+    ).returning(UserMealLog.id)
+
+def _append_items_statement(user_id: int, log_date: date, items_to_log: list[LoggedFoodItem]):
+    """
+    WITH log AS (INSERT ... ON CONFLICT DO UPDATE ... RETURNING id)
+    INSERT INTO meal_log_items SELECT log.id, new_items.* FROM log JOIN (VALUES ...) new_items
+    RETURNING meal_log_id
+    """
+    upsert = _upsert_log_statement(postgresql.insert, user_id, log_date)
+    if not items_to_log:
+        return upsert
+
+    item_columns = [getattr(MealLogItem, field) for field in ITEM_FIELDS]
+    new_items = values(
+        *(column(field, col.type) for field, col in zip(ITEM_FIELDS, item_columns)),
+        name="new_items",
+    ).data([tuple(getattr(item, field) for field in ITEM_FIELDS) for item in items_to_log])
+    log = upsert.cte("log")
+    rows = select(log.c.id, *new_items.c).select_from(log).join(new_items, true())
+    return sa_insert(MealLogItem).from_select([MealLogItem.meal_log_id, *item_columns], rows) \
+        .add_cte(log).returning(MealLogItem.meal_log_id)
 
 # def create_meal_plan(db: Session, user_id: int, plan_in: MealPlanCreate):
 #     """
@@ -80,60 +128,31 @@ def delete_logged_item(db: Session, db_log: UserMealLog, log_item_id: str) -> Us
     """
     Deletes a single item from a meal log by its log_item_id.
     """
-    current_contents = MealLogContents.parse_raw(db_log.food_items_json)
-    
-    # Find and remove the item
-    item_to_remove = next((item for item in current_contents.items if item.log_item_id == log_item_id), None)
-    if not item_to_remove:
+    db_item = get_logged_item(db_log, log_item_id=log_item_id)
+    if not db_item:
         return db_log # Item not found, do nothing
 
-    current_contents.items.remove(item_to_remove)
-    
-    # Recalculate totals
-    total_calories = sum(item.calories for item in current_contents.items)
-    total_protein = sum(item.protein for item in current_contents.items)
-    total_carbs = sum(item.carbs for item in current_contents.items)
-    total_fat = sum(item.fat for item in current_contents.items)
-
-    totals = {"calories": total_calories, "protein": total_protein, "carbs": total_carbs, "fat": total_fat}
-
-    # Save back to DB
-    db_log.food_items_json = current_contents.json()
-    db_log.total_macros_json = json.dumps(totals)
-    
-    db.add(db_log)
+    # Removing it from the loaded collection deletes the row (delete-orphan)
+    # and keeps db_log.items current without reloading it
+    db_log.items.remove(db_item)
+    db_log.version = UserMealLog.version + 1
     db.commit()
-    db.refresh(db_log)
     return db_log
 
 def update_logged_item(db: Session, db_log: UserMealLog, log_item_id: str, item_in: LoggedFoodItem) -> UserMealLog:
     """
     Updates a single item in a meal log.
     """
-    current_contents = MealLogContents.parse_raw(db_log.food_items_json)
-    
-    # Find and replace the item
-    item_index = next((i for i, item in enumerate(current_contents.items) if item.log_item_id == log_item_id), -1)
-    
-    if item_index == -1:
+    db_item = get_logged_item(db_log, log_item_id=log_item_id)
+    if not db_item:
         return db_log # Item not found
 
-    # Replace old item with new one
-    current_contents.items[item_index] = item_in
-    
-    # Recalculate totals
-    total_calories = sum(item.calories for item in current_contents.items)
-    total_protein = sum(item.protein for item in current_contents.items)
-    total_carbs = sum(item.carbs for item in current_contents.items)
-    total_fat = sum(item.fat for item in current_contents.items)
+    # Replace old item with new one. exclude_unset: if the body had no log_item_id,
+    # the item keeps its own rather than taking the one LoggedFoodItem made up
+    for key, value in item_in.model_dump(exclude_unset=True).items():
+        setattr(db_item, key, value)
 
-    totals = {"calories": total_calories, "protein": total_protein, "carbs": total_carbs, "fat": total_fat}
-    
-    # Save back to DB
-    db_log.food_items_json = current_contents.json()
-    db_log.total_macros_json = json.dumps(totals)
-    
-    db.add(db_log)
+    # db_item is the same object as in db_log.items, so the log is already current
+    db_log.version = UserMealLog.version + 1
     db.commit()
-    db.refresh(db_log)
-    return db_log
\ No newline at end of file
+    return db_log
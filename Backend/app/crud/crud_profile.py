@@ -1,23 +1,26 @@
 from sqlalchemy.orm import Session
 from app.db.models.models import UserProfile
 from app.schemas.profile import UserProfileCreate, UserProfileUpdate
+from app.core import principal_cache
+from app.crud.base import save
 
 def get_profile(db: Session, user_id: int):
     return db.query(UserProfile).filter(UserProfile.user_id == user_id).first()
 
 def create_user_profile(db: Session, profile_in: UserProfileCreate, user_id: int):
-    db_profile = UserProfile(**profile_in.dict(), user_id=user_id)
-    db.add(db_profile)
-    db.commit()
-    db.refresh(db_profile)
+    db_profile = UserProfile(**profile_in.model_dump(), user_id=user_id)
+    # user_id is unique, so a concurrent create for the same user fails here
+    save(db, db_profile, conflict_detail="Profile already exists for this user")
+    principal_cache.invalidate(user_id=user_id)
     return db_profile
 
 def update_user_profile(db: Session, db_profile: UserProfile, profile_in: UserProfileUpdate):
-    profile_data = profile_in.dict(exclude_unset=True)
+    profile_data = profile_in.model_dump(exclude_unset=True)
     for key, value in profile_data.items():
         setattr(db_profile, key, value)
-    
-    db.add(db_profile)
-    db.commit()
-    db.refresh(db_profile)
+    # In the same UPDATE; GET /users/me's ETag includes it
+    db_profile.version = UserProfile.version + 1
+
+    save(db, db_profile)
+    principal_cache.invalidate(user_id=db_profile.user_id)
     return db_profile
\ No newline at end of file
@@ -0,0 +1,51 @@
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy.orm import Session, joinedload
+from app.db.models.models import RefreshToken
+from app.core.config import settings
+from app.core.security import create_refresh_token, hash_refresh_token
+
+def issue_refresh_token(db: Session, user_id: int, family_id: Optional[str] = None) -> str:
+    """
+    Store the hash of a new refresh token and return the raw token.
+    Pass `family_id` when rotating so the new token joins the same login.
+    """
+    token = create_refresh_token()
+    db_token = RefreshToken(
+        user_id=user_id,
+        token_hash=hash_refresh_token(token),
+        family_id=family_id or str(uuid.uuid4()),
+        expires_at=datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    )
+    db.add(db_token)
+    db.commit()
+    return token
+
+def get_refresh_token(db: Session, token: str, for_update: bool = False):
+    """
+    Look a token up by its hash. The revocation state lives on the same row,
+    so checking it costs nothing beyond this one unique-index probe.
+    """
+    query = db.query(RefreshToken).options(joinedload(RefreshToken.user)).filter(
+        RefreshToken.token_hash == hash_refresh_token(token)
+    )
+    if for_update:
+        # Lock the row so two concurrent refreshes can't both spend it
+        query = query.with_for_update(of=RefreshToken)
+    return query.first()
+
+def rotate_refresh_token(db: Session, db_token: RefreshToken) -> str:
+    """Revoke `db_token` and issue its successor in the same family."""
+    db_token.revoked_at = datetime.utcnow()
+    db.add(db_token)
+    return issue_refresh_token(db, user_id=db_token.user_id, family_id=db_token.family_id)
+
+def revoke_refresh_token_family(db: Session, family_id: str) -> int:
+    """Revoke every live token from one login (logout, or a replayed token)."""
+    count = db.query(RefreshToken).filter(
+        RefreshToken.family_id == family_id,
+        RefreshToken.revoked_at.is_(None)
+    ).update({RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+    return count
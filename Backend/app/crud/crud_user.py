@@ -1,19 +1,40 @@
-from sqlalchemy.orm import Session
-from app.db.models.models import User
+from typing import Optional
+from sqlalchemy.orm import Session, joinedload
+from app.db.models.models import User, UserProfile
 from app.schemas.user import UserCreate
 from app.core.security import get_password_hash
+from app.core import principal_cache
+from app.crud.base import save
 
 def get_user_by_email(db: Session, email: str):
     return db.query(User).filter(User.email == email).first()
 
-def create_user(db: Session, user: UserCreate):
-    hashed_password = get_password_hash(user.password)
+def get_user_with_profile_by_email(db: Session, email: str):
+    """
+    Same as get_user_by_email, but loads the profile in the same query
+    so the result can be cached as an authenticated principal.
+    """
+    return db.query(User).options(joinedload(User.profile)).filter(User.email == email).first()
+
+def get_user_versions(db: Session, user_id: int) -> tuple[int, Optional[int]]:
+    """The user's row version and its profile's (None without one), in one small query."""
+    return tuple(db.query(User.version, UserProfile.version).outerjoin(User.profile)
+                 .filter(User.id == user_id).one())
+
+def create_user(db: Session, user: UserCreate, hashed_password: Optional[str] = None):
+    """
+    Create a user. Pass `hashed_password` when the hash was already computed
+    (e.g. on the hashing pool) to avoid running bcrypt inline.
+    Raises a 400 if the email is taken (the unique index decides, not a pre-check).
+    """
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
     db_user = User(
         email=user.email,
         full_name=user.full_name,
-        hashed_password=hashed_password
+        hashed_password=hashed_password,
+        profile=None  # A new user has no profile; setting it skips the lazy load
     )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    save(db, db_user, conflict_detail="Email already registered")
+    principal_cache.invalidate(user_id=db_user.id, sub=db_user.email)
     return db_user
\ No newline at end of file
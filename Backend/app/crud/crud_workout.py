@@ -1,21 +1,25 @@
-import json
-from datetime import date
+from datetime import date, datetime
+from typing import Optional
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
 from app.db.models.models import Exercise, WorkoutPlan, WorkoutLog
 from app.schemas import workout as schemas # Import the schemas file
+from app.crud.base import save
 from fastapi import HTTPException, status
 
 # --- Exercise CRUD ---
-def get_exercises(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Exercise).offset(skip).limit(limit).all()
-
-def search_exercises(db: Session, query: str):
-    return db.query(Exercise).filter(Exercise.name.ilike(f"%{query}%")).all()
+def get_exercises(db: Session, after_id: Optional[int] = None, limit: int = 100):
+    # Keyset on the primary key: no rows are skipped over, however deep the page
+    query = db.query(Exercise)
+    if after_id is not None:
+        query = query.filter(Exercise.id > after_id)
+    return query.order_by(Exercise.id).limit(limit).all()
 
 # --- Workout Plan CRUD ---
 def create_workout_plan(db: Session, user_id: int, plan_in: schemas.WorkoutPlanCreate):
-    # Serialize the exercises list into a JSON string
-    plan_details_json = json.dumps([ex.dict() for ex in plan_in.exercises])
+    # Serialize the exercises list into a JSON string (validated with plan_in, so
+    # responses can splice it in as is)
+    plan_details_json = schemas.PlanExercises.dump_json(plan_in.exercises).decode()
     
     db_plan = WorkoutPlan(
         name=plan_in.name,
@@ -23,14 +27,23 @@ def create_workout_plan(db: Session, user_id: int, plan_in: schemas.WorkoutPlanC
         goal_type=plan_in.goal_type,
         plan_details_json=plan_details_json
     )
-    db.add(db_plan)
-    db.commit()
-    db.refresh(db_plan)
-    return db_plan
+    return save(db, db_plan)
 
 def get_workout_plans_by_user(db: Session, user_id: int):
     return db.query(WorkoutPlan).filter(WorkoutPlan.user_id == user_id).all()
 
+def get_workout_plan_versions(db: Session, user_id: int) -> list[tuple[int, datetime]]:
+    """(id, updated_at) of each of the user's plans, for the list's ETag, without their JSON."""
+    return [tuple(row) for row in db.query(WorkoutPlan.id, WorkoutPlan.updated_at).filter(
+        WorkoutPlan.user_id == user_id
+    ).all()]
+
+def get_workout_plan_version(db: Session, plan_id: int, user_id: int) -> Optional[datetime]:
+    return db.query(WorkoutPlan.updated_at).filter(
+        WorkoutPlan.id == plan_id,
+        WorkoutPlan.user_id == user_id
+    ).scalar()
+
 def get_workout_plan_by_id(db: Session, plan_id: int, user_id: int):
     return db.query(WorkoutPlan).filter(
         WorkoutPlan.id == plan_id, 
@@ -49,7 +62,7 @@ def delete_workout_plan(db: Session, plan_id: int, user_id: int):
 # --- Workout Log CRUD ---
 def create_workout_log(db: Session, user_id: int, log_in: schemas.WorkoutLogCreate):
     # Serialize the logged exercises list into a JSON string
-    log_details_json = json.dumps([ex.dict() for ex in log_in.exercises])
+    log_details_json = schemas.LoggedExercises.dump_json(log_in.exercises).decode()
     
     db_log = WorkoutLog(
         user_id=user_id,
@@ -57,17 +70,24 @@ def create_workout_log(db: Session, user_id: int, log_in: schemas.WorkoutLogCrea
         notes=log_in.notes,
         log_details_json=log_details_json
     )
-    db.add(db_log)
-    db.commit()
-    db.refresh(db_log)
-    return db_log
+    return save(db, db_log)
 
-def get_workout_logs_by_user(db: Session, user_id: int, start_date: date, end_date: date):
-    return db.query(WorkoutLog).filter(
+def get_workout_logs_by_user(
+    db: Session, user_id: int, start_date: date, end_date: date,
+    after: Optional[tuple[date, int]] = None, limit: Optional[int] = None
+):
+    """
+    Logs in the date range, ordered by (date, id). `after` is the (date, id) of
+    the last log on the previous page; ix_workout_logs_user_id_date serves both.
+    """
+    query = db.query(WorkoutLog).filter(
         WorkoutLog.user_id == user_id,
         WorkoutLog.date >= start_date,
         WorkoutLog.date <= end_date
-    ).all()
+    )
+    if after is not None:
+        query = query.filter(tuple_(WorkoutLog.date, WorkoutLog.id) > tuple_(*after))
+    return query.order_by(WorkoutLog.date, WorkoutLog.id).limit(limit).all()
 
 def get_workout_log_by_id(db: Session, log_id: int, user_id: int):
     return db.query(WorkoutLog).filter(
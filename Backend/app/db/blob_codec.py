@@ -0,0 +1,179 @@
+import threading
+from typing import Optional
+
+import orjson
+from sqlalchemy import LargeBinary, select
+from sqlalchemy.types import TypeDecorator
+
+from app.core.config import settings
+
+# Stored values start with a tag byte saying how the rest is encoded. Plain JSON
+# (everything written before the codec, and BLOB_FORMAT=json) has no tag: it starts
+# with "[" or "{", which no tag is.
+TAG_MSGPACK = b"\x01"
+# Followed by the id of the blob_dictionaries row it was compressed with (0 = none),
+# 4 bytes big-endian, then a zstd frame
+TAG_ZSTD = b"\x02"
+TAGS = (TAG_MSGPACK, TAG_ZSTD)
+
+_lock = threading.Lock()
+# blob_dictionaries id -> zstandard.ZstdCompressionDict, loaded when first needed
+_dictionaries: dict = {}
+# Column name -> (id, dictionary) of its newest dictionary, or None; read once per process
+_newest: dict[str, Optional[tuple]] = {}
+# zstd (de)compressors can't be shared between threads
+_local = threading.local()
+
+
+def _zstd():
+    # Imported here so only BLOB_FORMAT=zstd (or reading zstd rows) needs the package
+    import zstandard
+    return zstandard
+
+
+def _msgpack():
+    import msgpack
+    return msgpack
+
+
+def _query(statement):
+    # A connection of its own: decoding runs inside someone else's result processing
+    from app.db.session import engine
+    with engine.connect() as connection:
+        return connection.execute(statement).first()
+
+
+def _dictionary(dictionary_id: int):
+    dictionary = _dictionaries.get(dictionary_id)
+    if dictionary is None:
+        from app.db.models.models import BlobDictionary
+        row = _query(select(BlobDictionary.data).where(BlobDictionary.id == dictionary_id))
+        if row is None:
+            raise LookupError(f"blob_dictionaries row {dictionary_id} is missing")
+        with _lock:
+            dictionary = _dictionaries.setdefault(dictionary_id, _zstd().ZstdCompressionDict(bytes(row.data)))
+    return dictionary
+
+
+def newest_dictionary(column: str) -> tuple[int, Optional[object]]:
+    """
+    (id, dictionary) to compress `column` with: the newest one trained for it, or
+    (0, None). Looked up once per process, so workers start using a newly trained
+    dictionary when they restart; what they wrote before stays readable.
+    """
+    if column not in _newest:
+        from app.db.models.models import BlobDictionary
+        row = _query(select(BlobDictionary.id).where(BlobDictionary.column == column)
+                     .order_by(BlobDictionary.id.desc()).limit(1))
+        newest = (row.id, _dictionary(row.id)) if row else None
+        with _lock:
+            _newest.setdefault(column, newest)
+    return _newest[column] or (0, None)
+
+
+def load_dictionaries(columns):
+    """
+    Load every stored dictionary and note the newest of each of `columns` (none
+    yet included), at startup, so requests don't wait on those lookups.
+    """
+    from app.db.models.models import BlobDictionary
+    from app.db.session import engine
+    with engine.connect() as connection:
+        rows = connection.execute(
+            select(BlobDictionary.id, BlobDictionary.column, BlobDictionary.data).order_by(BlobDictionary.id)).all()
+    with _lock:
+        for column in columns:
+            _newest[column] = None
+        for row in rows:
+            _dictionaries[row.id] = _zstd().ZstdCompressionDict(bytes(row.data))
+            _newest[row.column] = (row.id, _dictionaries[row.id])
+
+
+def use_dictionary(column: str, dictionary_id: int, data: Optional[bytes]):
+    """
+    Make `data` (stored as blob_dictionaries row `dictionary_id`) this process's
+    newest dictionary for `column`; None compresses without one from now on.
+    """
+    if data is None:
+        with _lock:
+            _newest[column] = None
+        return
+    dictionary = _zstd().ZstdCompressionDict(data)
+    with _lock:
+        _dictionaries[dictionary_id] = dictionary
+        _newest[column] = (dictionary_id, dictionary)
+
+
+def _compressor(dictionary_id: int, dictionary):
+    compressors = _local.__dict__.setdefault("compressors", {})
+    key = (dictionary_id, settings.BLOB_ZSTD_LEVEL)
+    if key not in compressors:
+        # The dictionary id is stored in our own header, so the frame doesn't repeat it
+        compressors[key] = _zstd().ZstdCompressor(
+            level=settings.BLOB_ZSTD_LEVEL, dict_data=dictionary, write_dict_id=False)
+    return compressors[key]
+
+
+def _decompressor(dictionary_id: int):
+    decompressors = _local.__dict__.setdefault("decompressors", {})
+    if dictionary_id not in decompressors:
+        dictionary = _dictionary(dictionary_id) if dictionary_id else None
+        decompressors[dictionary_id] = _zstd().ZstdDecompressor(dict_data=dictionary)
+    return decompressors[dictionary_id]
+
+
+def prefix(column: str, format: Optional[str] = None) -> bytes:
+    """How values written to `column` in `format` (default BLOB_FORMAT) start; b"" for plain JSON."""
+    format = format or settings.BLOB_FORMAT
+    if format == "msgpack":
+        return TAG_MSGPACK
+    if format == "zstd":
+        return TAG_ZSTD + newest_dictionary(column)[0].to_bytes(4, "big")
+    return b""
+
+
+def encode(text: str, column: str, format: Optional[str] = None) -> bytes:
+    """JSON text as stored in `column`, in `format` (default BLOB_FORMAT)."""
+    format = format or settings.BLOB_FORMAT
+    if format == "msgpack":
+        return TAG_MSGPACK + _msgpack().packb(orjson.loads(text))
+    if format == "zstd":
+        dictionary_id, dictionary = newest_dictionary(column)
+        return TAG_ZSTD + dictionary_id.to_bytes(4, "big") + \
+            _compressor(dictionary_id, dictionary).compress(text.encode())
+    return text.encode()
+
+
+def decode(data: bytes) -> str:
+    """The JSON text of a stored value, whatever its format."""
+    tag = data[:1]
+    if tag == TAG_ZSTD:
+        return _decompressor(int.from_bytes(data[1:5], "big")).decompress(data[5:]).decode()
+    if tag == TAG_MSGPACK:
+        return orjson.dumps(_msgpack().unpackb(data[1:])).decode()
+    return data.decode()
+
+
+class EncodedJSON(TypeDecorator):
+    """
+    A JSON text column stored as bytes through the codec above. The model
+    attribute is the JSON text either way, so nothing above the ORM changes
+    with BLOB_FORMAT, and rows in any format can be read.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def __init__(self, column: str):
+        super().__init__()
+        # "table.column", which names its zstd dictionaries
+        self.column = column
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else encode(value, self.column)
+
+    def process_result_value(self, value, dialect):
+        if value is None or isinstance(value, str):
+            # str: an SQLite row written as text, before the migration to bytes
+            return value
+        return decode(bytes(value))
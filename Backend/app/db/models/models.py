@@ -1,10 +1,12 @@
 # backend/app/db/models.py
-from sqlalchemy import (Column, Integer, String, Boolean, Date, ForeignKey, 
-                        Enum, Float, Numeric, Text)
+from sqlalchemy import (Column, Integer, String, Boolean, Date, DateTime, ForeignKey, 
+                        Enum, Float, Index, LargeBinary, Numeric, Text)
 from sqlalchemy.orm import relationship
+from datetime import datetime
 import enum
 
 from app.db.base_class import Base
+from app.db.blob_codec import EncodedJSON
 
 # --- Enums for Profile ---
 class UserGoal(str, enum.Enum):
@@ -28,6 +30,8 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean(), default=True)
+    # With the profile's, the ETag of GET /users/me: anything that updates the row must bump it
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     # One-to-one relationship to UserProfile
     profile = relationship("UserProfile", back_populates="user", uselist=False, cascade="all, delete-orphan")
@@ -38,6 +42,22 @@ class User(Base):
     meal_logs = relationship("UserMealLog", back_populates="owner")
     # meal_plans = relationship("MealPlan", back_populates="owner", cascade="all, delete-orphan")
 
+# --- Refresh Tokens (for Auth) ---
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    # SHA-256 (hex) of the token; the raw token is only ever sent to the client
+    token_hash = Column(String(64), unique=True, index=True, nullable=False)
+    # Every rotation of one login shares a family, so a replayed token revokes them all
+    family_id = Column(String(36), nullable=False, index=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, nullable=True)
+
+    user = relationship("User")
+
 # --- User Profile Model (for Stats) ---
 class UserProfile(Base):
     __tablename__ = "user_profiles"
@@ -52,6 +72,8 @@ class UserProfile(Base):
     
     goal = Column(Enum(UserGoal), nullable=True, default=UserGoal.maintain_weight)
     activity_level = Column(Enum(ActivityLevel), nullable=True, default=ActivityLevel.sedentary)
+    # Bumped by every update of the row (see User.version)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     # One-to-one relationship back to User
     user = relationship("User", back_populates="profile")
@@ -93,6 +115,23 @@ class Exercise(Base):
     # Optional: Add instructions
     instructions = Column(Text, nullable=True)
 
+# --- Catalog versions ---
+# One row per shared, rarely-changing table served from an in-process cache
+# (see app.services.exercise_catalog). Writers bump `version` in the same transaction.
+class CatalogVersion(Base):
+    __tablename__ = "catalog_versions"
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=1)
+
+# Trained zstd dictionaries for the EncodedJSON columns (BLOB_FORMAT=zstd). Rows
+# name the one they were compressed with, so old dictionaries are never deleted.
+class BlobDictionary(Base):
+    __tablename__ = "blob_dictionaries"
+    id = Column(Integer, primary_key=True)
+    column = Column(String, nullable=False)  # "table.column"
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
 # --- UPDATE: WorkoutPlan Model ---
 class WorkoutPlan(Base):
     __tablename__ = "workout_plans"
@@ -100,9 +139,13 @@ class WorkoutPlan(Base):
     name = Column(String, nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"))
     goal_type = Column(Enum(WorkoutGoalType), default=WorkoutGoalType.general)
+    # The plan's ETag (and, with the ids, its owner's plan list's). A timestamp rather than
+    # a counter: SQLite can reuse a deleted plan's id, and the new plan must not match it.
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # We'll store the list of exercises, sets, and reps as a JSON string
-    plan_details_json = Column(Text, nullable=False) # Renamed from exercises_json
+    # (encoded for storage as settings.BLOB_FORMAT says, see app.db.blob_codec)
+    plan_details_json = Column(EncodedJSON("workout_plans.plan_details_json"), nullable=False) # Renamed from exercises_json
     
     owner = relationship("User", back_populates="workout_plans")
 
@@ -114,11 +157,17 @@ class WorkoutLog(Base):
     user_id = Column(Integer, ForeignKey("users.id"))
     
     # We'll store what was *actually* done (sets, reps, weight) as a JSON string
-    log_details_json = Column(Text, nullable=False) # Renamed from exercises_json
+    # (encoded for storage as settings.BLOB_FORMAT says, see app.db.blob_codec)
+    log_details_json = Column(EncodedJSON("workout_logs.log_details_json"), nullable=False) # Renamed from exercises_json
     notes = Column(Text, nullable=True)
     
     owner = relationship("User", back_populates="workout_logs")
 
+    __table_args__ = (
+        # Range reads are always per user: GET /workouts/logs, ordered by (date, id)
+        Index("ix_workout_logs_user_id_date", "user_id", "date"),
+    )
+
 class FoodItem(Base):
     __tablename__ = "food_items"
     id = Column(Integer, primary_key=True)
@@ -129,17 +178,54 @@ class FoodItem(Base):
     carbs_per_100g = Column(Numeric(10, 2), nullable=False)
     fat_per_100g = Column(Numeric(10, 2), nullable=False)
     # We can add user_id to make this a user-specific food db
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+
+    __table_args__ = (
+        # Trigram index for name search (crud.base.search_by_name); Postgres only
+        Index("ix_food_items_name_trgm", "name", postgresql_using="gin",
+              postgresql_ops={"name": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+    )
 
 class UserMealLog(Base):
     __tablename__ = "user_meal_logs"
     id = Column(Integer, primary_key=True)
     date = Column(Date, nullable=False, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
-    food_items_json = Column(String) # List of food IDs and quantities
-    total_macros_json = Column(String)
     
+    # Bumped whenever the log's items change, for GET /nutrition/meals/by-date's ETag
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
     owner = relationship("User", back_populates="meal_logs")
+    # One row per logged food, in the order they were logged.
+    # Totals are summed from these; only `version` changes on this row when items do.
+    items = relationship("MealLogItem", back_populates="meal_log", order_by="MealLogItem.id",
+                         cascade="all, delete-orphan", passive_deletes=True)
+
+    # One log per user per day; log_meal upserts against this
+    __table_args__ = (
+        Index("ix_user_meal_logs_user_id_date", "user_id", "date", unique=True),
+    )
+
+class MealLogItem(Base):
+    __tablename__ = "meal_log_items"
+    id = Column(Integer, primary_key=True)
+    meal_log_id = Column(Integer, ForeignKey("user_meal_logs.id", ondelete="CASCADE"), nullable=False)
+    # The client-facing id from LoggedFoodItem; unique per log in practice, but not enforced
+    # because re-logging the same AI analysis has always been allowed to repeat it
+    log_item_id = Column(String, nullable=False)
+    name = Column(String, nullable=False)
+    # Macros are captured at the time of logging, like the old JSON blob did
+    quantity_g = Column(Float, nullable=False)
+    calories = Column(Float, nullable=False)
+    protein = Column(Float, nullable=False)
+    carbs = Column(Float, nullable=False)
+    fat = Column(Float, nullable=False)
+
+    meal_log = relationship("UserMealLog", back_populates="items")
+
+    __table_args__ = (
+        Index("ix_meal_log_items_meal_log_id_log_item_id", "meal_log_id", "log_item_id"),
+    )
 
 # class MealPlan(Base):
 #     __tablename__ = "meal_plans"
@@ -0,0 +1,133 @@
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Histogram buckets (seconds) for how long a request waited to check out a connection
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class PoolStats:
+    """Counters for one engine's pool. Read them through snapshot()."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.overflow_checkouts = 0
+        self.checkout_timeouts = 0
+        self.invalidations = 0
+        self.soft_invalidations = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            for i, bound in enumerate(WAIT_BUCKETS):
+                if seconds <= bound:
+                    self.wait_buckets[i] += 1
+                    break
+            else:
+                self.wait_buckets[-1] += 1
+
+    def snapshot(self) -> dict:
+        pool = self.pool
+        waits = sum(self.wait_buckets)
+        data = {
+            "pool_class": type(pool).__name__ if pool is not None else None,
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "overflow_checkouts": self.overflow_checkouts,
+            "checkout_timeouts": self.checkout_timeouts,
+            "invalidations": self.invalidations,
+            "soft_invalidations": self.soft_invalidations,
+            "checkout_wait_ms_avg": round(self.wait_seconds_total / waits * 1000, 3) if waits else 0.0,
+            "checkout_wait_ms_max": round(self.wait_seconds_max * 1000, 3),
+            "checkout_wait_histogram": {
+                **{f"le_{bound}": count for bound, count in zip(WAIT_BUCKETS, self.wait_buckets)},
+                "le_inf": self.wait_buckets[-1],
+            },
+        }
+        if isinstance(pool, QueuePool):
+            data.update({
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+            })
+        return data
+
+
+# name -> PoolStats, one per engine created through app.db.session
+registry: dict[str, PoolStats] = {}
+
+
+class _TimedCheckoutMixin:
+    """Times how long each checkout waits for a free connection."""
+
+    _stats: PoolStats
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self._stats.checkout_timeouts += 1
+            raise
+        finally:
+            self._stats.record_wait(time.perf_counter() - start)
+
+    def recreate(self):
+        # dispose() and engine invalidation build a fresh pool; keep reporting to the same stats
+        new_pool = super().recreate()
+        new_pool._stats = self._stats
+        self._stats.pool = new_pool
+        return new_pool
+
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument(engine, name: str) -> PoolStats:
+    """Attach pool event listeners to `engine` and register its stats under `name`."""
+    stats = registry.setdefault(name, PoolStats(name))
+    pool = engine.pool
+    stats.pool = pool
+    if isinstance(pool, _TimedCheckoutMixin):
+        pool._stats = stats
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        stats.connects += 1
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        stats.checkouts += 1
+        current = stats.pool
+        if isinstance(current, QueuePool) and current.overflow() > 0:
+            stats.overflow_checkouts += 1
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        stats.invalidations += 1
+
+    @event.listens_for(engine, "soft_invalidate")
+    def on_soft_invalidate(dbapi_connection, connection_record, exception):
+        stats.soft_invalidations += 1
+
+    return stats
+
+
+def snapshot() -> dict:
+    return {name: stats.snapshot() for name, stats in registry.items()}
@@ -1,12 +1,190 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import itertools
+import logging
+import threading
+import time
+from typing import Optional
 
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
+from sqlalchemy.sql.dml import UpdateBase
+
+from app.core import query_budget, request_timing
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.db import pool_stats
+
+logger = logging.getLogger(__name__)
+
+def _engine_kwargs(url: str, is_async: bool = False) -> dict:
+    """Pool options from settings (see DB_POOL_* in config.py)."""
+    kwargs = {"pool_pre_ping": settings.DB_POOL_PRE_PING == "always"}
+    if settings.DB_POOL_MODE == "pgbouncer":
+        # PgBouncer does the pooling; a local pool would pin server connections
+        kwargs["poolclass"] = NullPool
+        if is_async:
+            # Prepared statements don't survive transaction pooling
+            kwargs["connect_args"] = {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+        return kwargs
+    if make_url(url).get_backend_name() == "sqlite":
+        # SQLite picks its own pool class; sizing options don't apply
+        return kwargs
+    kwargs.update({
+        "poolclass": pool_stats.InstrumentedAsyncQueuePool if is_async else pool_stats.InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    })
+    return kwargs
 
 # The engine is the entry point to the database.
-# It's configured with the database URL from our settings.
-# pool_pre_ping=True checks connections for liveness before use.
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
+# It's configured with the database URL and pool options from our settings.
+engine = create_engine(settings.DATABASE_URL, **_engine_kwargs(settings.DATABASE_URL))
+pool_stats.instrument(engine, "primary")
+request_timing.instrument(engine)
+query_budget.instrument(engine)
+
+# --- Read replicas (settings.DATABASE_REPLICA_URLS) ---
+class ReplicaSet:
+    """Round-robins over the replica engines, skipping any that recently failed."""
+
+    def __init__(self, engines: list[Engine], retry_seconds: float):
+        self.engines = engines
+        self.retry_seconds = retry_seconds
+        self._unhealthy_until: dict[Engine, float] = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def choose(self) -> Optional[Engine]:
+        if not self.engines:
+            return None
+        now = time.monotonic()
+        start = next(self._counter)
+        for offset in range(len(self.engines)):
+            candidate = self.engines[(start + offset) % len(self.engines)]
+            if self._unhealthy_until.get(candidate, 0) <= now:
+                return candidate
+        return None
+
+    def mark_unhealthy(self, replica: Engine):
+        with self._lock:
+            self._unhealthy_until[replica] = time.monotonic() + self.retry_seconds
+
+    def health(self) -> dict:
+        now = time.monotonic()
+        return {
+            make_url(str(e.url)).render_as_string(hide_password=True): self._unhealthy_until.get(e, 0) <= now
+            for e in self.engines
+        }
+
+replicas = ReplicaSet(
+    [create_engine(url, **_engine_kwargs(url)) for url in settings.DATABASE_REPLICA_URLS],
+    retry_seconds=settings.REPLICA_RETRY_SECONDS,
+)
+for index, replica_engine in enumerate(replicas.engines):
+    pool_stats.instrument(replica_engine, f"replica-{index}")
+    request_timing.instrument(replica_engine)
+    query_budget.instrument(replica_engine)
+
+    @event.listens_for(replica_engine, "handle_error")
+    def _on_replica_error(context, replica_engine=replica_engine):
+        # Connection-level failures take the replica out of rotation; SQL errors don't
+        if context.is_disconnect or isinstance(context.sqlalchemy_exception, exc.OperationalError):
+            replicas.mark_unhealthy(replica_engine)
+
+def _replica_failed(error: exc.DBAPIError) -> bool:
+    return error.connection_invalidated or isinstance(error, exc.OperationalError)
+
+# user_id -> True while the user's own writes may not have reached the replicas yet.
+# Per process: see READ_YOUR_WRITES_SECONDS in config.py
+_recent_writers = TTLCache(max_entries=100_000, ttl_seconds=settings.READ_YOUR_WRITES_SECONDS)
+
+def wrote_recently(user_id: int) -> bool:
+    return _recent_writers.get(user_id) is not None
+
+class RoutingSession(Session):
+    """
+    Sends queries to a replica when the session is marked read-only
+    (session.info["read_only"]) and to the primary otherwise. The replica is
+    picked on the first read and kept for the session, so all its reads see one
+    replication point. Writes, flushes and SELECT ... FOR UPDATE always go to the
+    primary, and a read that fails on the replica is retried there.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        is_write = self._flushing or isinstance(clause, UpdateBase) \
+            or getattr(clause, "_for_update_arg", None) is not None
+        if is_write:
+            self.info["wrote"] = True
+            self.info["read_only"] = False
+        elif self.info.get("read_only"):
+            if "replica" not in self.info:
+                self.info["replica"] = replicas.choose()
+            if self.info["replica"] is not None:
+                return self.info["replica"]
+        return engine
+
+    def _read(self, method, *args, **kwargs):
+        try:
+            return method(*args, **kwargs)
+        except exc.DBAPIError as e:
+            replica = self.info.get("replica")
+            if replica is None or not self.info.get("read_only") or not _replica_failed(e):
+                raise
+            # The handle_error listener has taken it out of rotation; the rest of
+            # this session reads from the primary
+            logger.warning("Replica %s failed, reading from the primary: %s",
+                           replica.url.render_as_string(hide_password=True), e.orig)
+            self.info["replica"] = None
+        return method(*args, **kwargs)
+
+    def execute(self, *args, **kwargs):
+        return self._read(super().execute, *args, **kwargs)
+
+    def scalar(self, *args, **kwargs):
+        return self._read(super().scalar, *args, **kwargs)
+
+    def scalars(self, *args, **kwargs):
+        return self._read(super().scalars, *args, **kwargs)
+
+@event.listens_for(RoutingSession, "after_commit")
+def _remember_writer(session):
+    # Pin the writer to the primary until replication has (probably) caught up
+    user_id = session.info.get("user_id")
+    if session.info.pop("wrote", False) and user_id is not None:
+        _recent_writers.set(user_id, True)
 
 # SessionLocal is a "factory" for creating new database sessions.
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
+# expire_on_commit=False: a session lives for one request, so objects stay usable
+# after commit without a refresh() SELECT (see app.crud.base.save)
+SessionLocal = sessionmaker(
+    class_=RoutingSession, autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
+)
+
+# --- Optional async stack (settings.DB_ASYNC) ---
+def _async_database_url(url: str) -> str:
+    """Swap the sync driver in a database URL for its async counterpart."""
+    for prefix, async_prefix in (
+        ("postgresql+psycopg2://", "postgresql+asyncpg://"),
+        ("postgresql://", "postgresql+asyncpg://"),
+        ("postgres://", "postgresql+asyncpg://"),
+        ("sqlite://", "sqlite+aiosqlite://"),
+    ):
+        if url.startswith(prefix):
+            return async_prefix + url[len(prefix):]
+    return url
+
+async_engine = None
+AsyncSessionLocal = None
+if settings.DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_database_url = settings.ASYNC_DATABASE_URL or _async_database_url(settings.DATABASE_URL)
+    async_engine = create_async_engine(async_database_url, **_engine_kwargs(async_database_url, is_async=True))
+    pool_stats.instrument(async_engine.sync_engine, "async")
+    request_timing.instrument(async_engine.sync_engine)
+    query_budget.instrument(async_engine.sync_engine)
+    # expire_on_commit=False: async sessions can't lazy-load expired attributes
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
@@ -0,0 +1,62 @@
+"""
+Bulk-load an exercise catalog into the exercises table.
+
+Streams a CSV, NDJSON or JSON-array file (format from the extension, or
+--format), validates each row against ExerciseCreate and upserts by name in
+batches. Re-running the same file changes nothing. CSV columns / JSON keys:
+name, muscle_group, equipment, difficulty, instructions.
+
+    python -m app.import_exercises catalog.csv
+    python -m app.import_exercises - --format ndjson < catalog.ndjson
+"""
+import argparse
+import csv
+import sys
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.services.exercise_import import BATCH_SIZE, import_exercises
+from app.services.file_import import ImportReport, guess_format, read_rows
+
+
+def print_progress(report: ImportReport):
+    print(f"  {report.read} rows, {report.written} written ({report.rows_per_second:,.0f} rows/s)", flush=True)
+
+
+def main(args) -> int:
+    format = args.format or ("json" if args.path == "-" else guess_format(args.path))
+    engine = create_engine(settings.DATABASE_URL)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    file = sys.stdin if args.path == "-" else open(args.path, newline="", encoding="utf-8")
+    with file, SessionLocal() as db:
+        print(f"Importing {args.path} ({format}) in batches of {args.batch_size}...")
+        report = ImportReport()
+        try:
+            import_exercises(
+                db, read_rows(file, format), batch_size=args.batch_size, update_existing=not args.insert_only,
+                report=report, progress=None if args.quiet else print_progress,
+            )
+        except (csv.Error, ValueError) as e:
+            # The file itself is broken from here on; the batches before it are kept
+            report.add_read_error(e)
+
+    print(report.summary())
+    for row_number, message in report.errors:
+        print(f"  row {row_number}: {message}")
+    if report.invalid > len(report.errors):
+        print(f"  ... and {report.invalid - len(report.errors)} more invalid rows")
+    return 1 if report.invalid else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="catalog file, or - for stdin")
+    parser.add_argument("--format", choices=["csv", "ndjson", "json"])
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--insert-only", action="store_true",
+                        help="add new exercises but leave existing ones as they are")
+    parser.add_argument("--quiet", action="store_true", help="no per-batch progress")
+    sys.exit(main(parser.parse_args()))
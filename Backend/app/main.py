@@ -1,15 +1,58 @@
+import asyncio
+import contextlib
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.v1.api import api_router # Import the router
+from app.api import internal
 from app.core.config import settings
+from app.core import compression, metrics, request_timing, security
+from app.db import blob_codec
+from app.db.session import SessionLocal
+from app.services import blob_reencoder, exercise_catalog
 
 # We will create api_router in the next steps
 # from app.api.v1.api import api_router
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
+def load_exercise_catalog():
+    with SessionLocal() as db:
+        exercise_catalog.get(db)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        await run_in_threadpool(load_exercise_catalog)
+    except Exception:
+        # Not fatal: the first request loads it instead
+        logger.warning("Could not load the exercise catalog at startup", exc_info=True)
+    try:
+        await run_in_threadpool(blob_codec.load_dictionaries, blob_reencoder.COLUMNS)
+    except Exception:
+        # Not fatal either: they're looked up when first needed
+        logger.warning("Could not load the blob dictionaries at startup", exc_info=True)
+    # Several workers share their metrics through METRICS_DIR
+    flusher = asyncio.create_task(metrics.run_flusher()) \
+        if settings.METRICS_ENABLED and settings.METRICS_DIR else None
+    # Rewrites stored log and plan JSON into BLOB_FORMAT, then ends
+    reencoder = asyncio.create_task(blob_reencoder.run_in_background()) \
+        if settings.BLOB_REENCODE_IN_BACKGROUND else None
+    yield
+    for task in (flusher, reencoder):
+        if task:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+    security.shutdown_hash_executor()
+
 app = FastAPI(
     title="LifeHub API",
-    openapi_url=f"/api/v1/openapi.json"
+    openapi_url=f"/api/v1/openapi.json",
+    lifespan=lifespan
 )
 
 # Set all CORS enabled origins
@@ -20,9 +63,25 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        # Next-page cursors (app.core.pagination)
+        expose_headers=["Link"],
     )
 
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(compression.CompressionMiddleware)
+
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+# Outermost, so its total covers the other middleware too
+if settings.REQUEST_TIMING_ENABLED:
+    app.add_middleware(request_timing.RequestTimingMiddleware)
+
 app.include_router(api_router, prefix="/api/v1") # Include the API router
+if settings.INTERNAL_ENDPOINTS_ENABLED:
+    app.include_router(internal.router, prefix="/internal")
+if settings.METRICS_ENABLED:
+    app.include_router(internal.metrics_router)
 
 @app.get("/")
 def read_root():
@@ -0,0 +1,56 @@
+"""
+Rewrite the workout log and plan JSON columns in the current BLOB_FORMAT.
+
+Rows stay readable in any format, so this can run (or be stopped) at any
+time; it only touches rows in another format, a batch per transaction.
+--train-dictionary first trains a zstd dictionary per column on its newest
+rows (for BLOB_FORMAT=zstd; restart the workers so they write with it).
+--stats only reports rows and stored bytes per row, by format.
+
+    BLOB_FORMAT=zstd python -m app.reencode_blobs --train-dictionary
+    python -m app.reencode_blobs --stats
+"""
+import argparse
+import sys
+import time
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services import blob_reencoder
+
+
+def print_stats(db):
+    for name in blob_reencoder.COLUMNS:
+        for format, entry in sorted(blob_reencoder.stats(db, name).items()):
+            print(f"  {name:<34} {format:<8} {entry['rows']:>9} rows {entry['bytes_per_row']:>10} bytes/row")
+
+
+def main(args) -> int:
+    with SessionLocal() as db:
+        print_stats(db)
+        if args.stats:
+            return 0
+        if args.train_dictionary:
+            for name in blob_reencoder.COLUMNS:
+                print(f"Trained dictionary {blob_reencoder.train_dictionary(db, name)} for {name}")
+        for name in blob_reencoder.COLUMNS:
+            started, after_id, total = time.perf_counter(), 0, 0
+            while True:
+                count, after_id = blob_reencoder.reencode_batch(db, name, after_id, args.batch_size)
+                if not count:
+                    break
+                total += count
+                if not args.quiet:
+                    print(f"  {name}: {total} rows ({total / (time.perf_counter() - started):,.0f} rows/s)", flush=True)
+            print(f"Re-encoded {total} rows of {name} as {settings.BLOB_FORMAT}")
+        print_stats(db)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=settings.BLOB_REENCODE_BATCH_SIZE)
+    parser.add_argument("--train-dictionary", action="store_true", help="train a new zstd dictionary per column first")
+    parser.add_argument("--stats", action="store_true", help="only report rows and bytes per row by format")
+    parser.add_argument("--quiet", action="store_true", help="no per-batch progress")
+    sys.exit(main(parser.parse_args()))
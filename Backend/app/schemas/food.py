@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 class FoodItemBase(BaseModel):
     name: str
@@ -14,5 +14,17 @@ class FoodItem(FoodItemBase):
     id: int
     user_id: int
 
-    class Config:
-        from_attributes = True
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+# --- Bulk import (POST /nutrition/foods/import) ---
+class FoodImportError(BaseModel):
+    row: int  # 1 = the first data row (after a CSV header)
+    error: str
+
+class FoodImportResult(BaseModel):
+    read: int
+    imported: int
+    invalid: int
+    errors: list[FoodImportError]
+    # More rows failed than `errors` lists
+    errors_truncated: bool
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 from datetime import date
 import uuid
 
@@ -6,6 +6,7 @@ import uuid
 # We store the macros directly, not just a reference, to
 # capture the data at that point in time.
 class LoggedFoodItem(BaseModel):
+    # Only made up when the client (or the AI) didn't send one; stored items keep theirs
     log_item_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
     quantity_g: float
@@ -14,7 +15,10 @@ class LoggedFoodItem(BaseModel):
     carbs: float
     fat: float
 
-# This is what we'll store in the `food_items_json` column
+# A JSON list of items (the AI's answer), parsed and validated in one pass
+LoggedFoodItems = TypeAdapter(list[LoggedFoodItem])
+
+# The `food_items` part of a meal log response (one entry per meal_log_items row)
 class MealLogContents(BaseModel):
     items: list[LoggedFoodItem] = []
 
@@ -32,8 +36,7 @@ class UserMealLog(UserMealLogBase):
     food_items: MealLogContents
     total_macros: dict # We'll store totals like {"calories": 2000, ...}
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
         
 # Schema for the AI analysis endpoint
 class NaturalLanguageQuery(BaseModel):
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from app.db.models.models import UserGoal, ActivityLevel
 from typing import Optional
 
@@ -19,5 +19,4 @@ class UserProfile(UserProfileBase):
     id: int
     user_id: int
 
-    class Config:
-        from_attributes = True
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr
 from typing import Optional  # Import Optional from typing
 from .profile import UserProfile
 
@@ -36,8 +36,7 @@ class UserInDBBase(BaseModel): # Renamed from UserBase in previous step
     email: EmailStr
     is_active: bool
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Properties to return to client
 class User(UserInDBBase):
@@ -1,5 +1,5 @@
 import uuid
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 from datetime import date
 from app.db.models.models import ExerciseMuscleGroup, ExerciseDifficulty, WorkoutGoalType
 from typing import Optional
@@ -17,8 +17,7 @@ class ExerciseCreate(ExerciseBase):
 
 class Exercise(ExerciseBase):
     id: int
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # --- Workout Plan Schemas ---
 # This is the Pydantic model for an exercise *within* a plan
@@ -29,6 +28,9 @@ class PlanExercise(BaseModel):
     sets: int
     reps: str # e.g., "8-10" or "15"
 
+# The plan_details_json column: a JSON list of these
+PlanExercises = TypeAdapter(list[PlanExercise])
+
 class WorkoutPlanBase(BaseModel):
     name: str
     goal_type: WorkoutGoalType
@@ -43,8 +45,7 @@ class WorkoutPlan(WorkoutPlanBase):
     # The response will also include the parsed list of exercises
     exercises: list[PlanExercise] 
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # --- Workout Log Schemas ---
 # This is a single set (e.g., 10 reps at 50kg)
@@ -59,6 +60,9 @@ class LoggedExercise(BaseModel):
     exercise_name: str
     sets: list[LoggedSet]
 
+# The log_details_json column: a JSON list of these
+LoggedExercises = TypeAdapter(list[LoggedExercise])
+
 class WorkoutLogBase(BaseModel):
     date: date
     notes: Optional[str] = None
@@ -71,5 +75,4 @@ class WorkoutLog(WorkoutLogBase):
     user_id: int
     exercises: list[LoggedExercise]
 
-    class Config:
-        from_attributes = True
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
@@ -1,8 +1,7 @@
-import json
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from app.db.models.models import Exercise, ExerciseMuscleGroup, ExerciseDifficulty
 from app.core.config import settings
+from app.services.exercise_import import import_exercises
 
 # This is a list of common exercises to get you started
 # You can add hundreds more to this list
@@ -32,22 +31,9 @@ def seed_exercises():
     db = SessionLocal()
 
     print("Seeding exercises...")
-    count = 0
-    for ex_data in EXERCISE_DATA:
-        # Check if exercise already exists
-        exists = db.query(Exercise).filter(Exercise.name == ex_data["name"]).first()
-        if not exists:
-            db_exercise = Exercise(
-                name=ex_data["name"],
-                muscle_group=ExerciseMuscleGroup(ex_data["muscle_group"]),
-                equipment=ex_data["equipment"],
-                difficulty=ExerciseDifficulty(ex_data["difficulty"]),
-            )
-            db.add(db_exercise)
-            count += 1
-    
-    db.commit()
-    print(f"Successfully added {count} new exercises.")
+    # One INSERT ... ON CONFLICT (name) DO NOTHING; exercises already there are left as they are
+    report = import_exercises(db, EXERCISE_DATA, update_existing=False)
+    print(f"Successfully added {report.written} new exercises.")
     db.close()
     print("Seeding complete.")
 
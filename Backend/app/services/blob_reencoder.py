@@ -0,0 +1,119 @@
+import asyncio
+import logging
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import LargeBinary, bindparam, func, literal, select, type_coerce, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db import blob_codec
+from app.db.models.models import BlobDictionary, WorkoutLog, WorkoutPlan
+from app.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# The EncodedJSON columns, by the name their dictionaries are stored under
+COLUMNS = {
+    "workout_logs.log_details_json": WorkoutLog.log_details_json,
+    "workout_plans.plan_details_json": WorkoutPlan.plan_details_json,
+}
+# zstd dictionary size (bytes) and how many of the newest rows it's trained on
+DICTIONARY_SIZE = 16 * 1024
+DICTIONARY_SAMPLES = 5000
+FORMAT_NAMES = {blob_codec.TAG_MSGPACK: "msgpack", blob_codec.TAG_ZSTD: "zstd"}
+
+
+def _stored(name: str):
+    # The stored bytes, as opposed to the attribute's decoded JSON text
+    return type_coerce(COLUMNS[name], LargeBinary)
+
+
+def _stale(name: str):
+    """Rows of the column that aren't stored in BLOB_FORMAT (with the newest dictionary, for zstd)."""
+    prefix = blob_codec.prefix(name)
+    if not prefix:
+        return func.substr(_stored(name), 1, 1).in_([literal(tag, LargeBinary) for tag in blob_codec.TAGS])
+    return func.substr(_stored(name), 1, len(prefix)) != literal(prefix, LargeBinary)
+
+
+def reencode_batch(db: Session, name: str, after_id: int = 0, batch_size: int = None) -> tuple[int, int]:
+    """
+    Rewrite the next batch of stale rows (by id, after `after_id`) in BLOB_FORMAT.
+    Returns how many there were and the id to continue after. Logs and plans are only
+    ever inserted and deleted, so nothing can change a row between the read and the write.
+    """
+    column = COLUMNS[name]
+    table = column.class_.__table__
+    rows = db.execute(
+        select(table.c.id, column).where(table.c.id > after_id, _stale(name))
+        .order_by(table.c.id).limit(batch_size or settings.BLOB_REENCODE_BATCH_SIZE)
+    ).all()
+    if rows:
+        # The JSON is unchanged, so onupdate columns (a plan's updated_at, its ETag) keep their values
+        kept = {other.key: other for other in table.c if other.onupdate is not None}
+        db.execute(
+            update(table).where(table.c.id == bindparam("row_id")).values({column.key: bindparam("text"), **kept}),
+            [{"row_id": row_id, "text": text} for row_id, text in rows],
+        )
+        db.commit()
+    return len(rows), rows[-1][0] if rows else after_id
+
+
+def train_dictionary(db: Session, name: str, size: int = DICTIONARY_SIZE, samples: int = DICTIONARY_SAMPLES) -> int:
+    """
+    Train a zstd dictionary on the column's newest rows and store it as the one new
+    rows are compressed with (this process at once, other workers once restarted).
+    """
+    column = COLUMNS[name]
+    table = column.class_.__table__
+    texts = db.scalars(select(column).order_by(table.c.id.desc()).limit(samples)).all()
+    # Raises zstandard.ZstdError when there are too few samples to learn from
+    dictionary = blob_codec._zstd().train_dictionary(size, [text.encode() for text in texts])
+    row = BlobDictionary(column=name, data=dictionary.as_bytes())
+    db.add(row)
+    db.commit()
+    blob_codec.use_dictionary(name, row.id, row.data)
+    return row.id
+
+
+def stats(db: Session, name: str) -> dict[str, dict]:
+    """Rows and average stored bytes per row, by format."""
+    tag = func.substr(_stored(name), 1, 1)
+    rows = db.execute(
+        select(tag, func.count(), func.avg(func.length(_stored(name)))).group_by(tag)
+    ).all()
+    result: dict[str, dict] = {}
+    for row_tag, count, average in rows:
+        format = FORMAT_NAMES.get(bytes(row_tag) if row_tag is not None else b"", "json")
+        entry = result.setdefault(format, {"rows": 0, "bytes": 0.0})
+        entry["bytes"] += float(average or 0) * count
+        entry["rows"] += count
+    return {format: {"rows": entry["rows"], "bytes_per_row": round(entry["bytes"] / entry["rows"], 1)}
+            for format, entry in result.items()}
+
+
+def _reencode_in_session(name: str, after_id: int) -> tuple[int, int]:
+    with SessionLocal() as db:
+        return reencode_batch(db, name, after_id)
+
+
+async def run_in_background():
+    """
+    Re-encode every stale row, a batch at a time with BLOB_REENCODE_PAUSE_SECONDS
+    between batches, then stop. Started from the app's lifespan. With several
+    workers each runs one; they skip what the others have already rewritten.
+    """
+    for name in COLUMNS:
+        after_id, total = 0, 0
+        try:
+            while True:
+                count, after_id = await run_in_threadpool(_reencode_in_session, name, after_id)
+                if not count:
+                    break
+                total += count
+                await asyncio.sleep(settings.BLOB_REENCODE_PAUSE_SECONDS)
+        except Exception:
+            logger.warning("Re-encoding %s stopped after %d rows", name, total, exc_info=True)
+            continue
+        if total:
+            logger.info("Re-encoded %d rows of %s as %s", total, name, settings.BLOB_FORMAT)
@@ -0,0 +1,150 @@
+import bisect
+import hashlib
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models.models import CatalogVersion, Exercise
+from app.schemas import workout as schemas
+from app.services.exercise_search import ExerciseSearchIndex
+
+# The catalog_versions row that versions the exercises table
+CATALOG_NAME = "exercises"
+# Session.info flag: this transaction bumped the version
+_CHANGED_KEY = "exercise_catalog_changed"
+
+
+class CatalogSnapshot:
+    """
+    The exercises table as of one catalog version, serialized once.
+    `entries` holds each exercise's JSON in id order; `digest` hashes all of them,
+    so it only changes when the content does. `search` indexes the same list.
+    Pages are keyset by id: `start_after` finds where the page after an id begins.
+    """
+
+    def __init__(self, version: int, exercises: list[schemas.Exercise]):
+        self.version = version
+        self.exercises = exercises
+        self.ids = [exercise.id for exercise in exercises]
+        self.entries = [exercise.model_dump_json().encode() for exercise in exercises]
+        self.body = b"[" + b",".join(self.entries) + b"]"
+        self.digest = hashlib.blake2b(self.body, digest_size=16).hexdigest()
+        self.search = ExerciseSearchIndex(exercises)
+        self.loaded_at = time.monotonic()
+
+    def start_after(self, after_id: Optional[int]) -> int:
+        """Position of the first exercise with an id above `after_id` (0 for the first page)."""
+        return 0 if after_id is None else bisect.bisect_right(self.ids, after_id)
+
+    def last_id(self, start: int, limit: int) -> Optional[int]:
+        """Id to continue after, if exercises remain past the page at `start`."""
+        end = start + limit
+        return self.ids[end - 1] if 0 < limit and end < len(self.ids) else None
+
+    def _is_whole(self, start: int, limit: int) -> bool:
+        return start == 0 and limit >= len(self.entries)
+
+    def page(self, start: int, limit: int) -> bytes:
+        """The JSON array for one page, without re-serializing anything."""
+        if self._is_whole(start, limit):
+            return self.body
+        return b"[" + b",".join(self.entries[start:start + limit]) + b"]"
+
+    def select(self, positions: list[int]) -> bytes:
+        """The JSON array of the exercises at `positions`, in that order."""
+        return b"[" + b",".join(self.entries[i] for i in positions) + b"]"
+
+    def etag(self, start: int, limit: int) -> str:
+        if self._is_whole(start, limit):
+            return f'"{self.digest}"'
+        return f'"{self.digest}-{start}-{limit}"'
+
+
+_snapshot: Optional[CatalogSnapshot] = None
+_checked_at = 0.0
+_lock = threading.Lock()
+_loads = 0
+_checks = 0
+
+
+def _is_fresh(snapshot: Optional[CatalogSnapshot]) -> bool:
+    return snapshot is not None and time.monotonic() - _checked_at < settings.EXERCISE_CATALOG_CHECK_SECONDS
+
+
+def get(db: Session) -> CatalogSnapshot:
+    """
+    The current catalog. Between version checks (EXERCISE_CATALOG_CHECK_SECONDS)
+    this doesn't touch the database; a check is one primary-key lookup, and the
+    table is only reloaded when the version has moved.
+    """
+    global _snapshot, _checked_at, _loads, _checks
+    snapshot = _snapshot
+    if _is_fresh(snapshot):
+        return snapshot
+    with _lock:
+        snapshot = _snapshot
+        if _is_fresh(snapshot):
+            # Another thread checked while we waited for the lock
+            return snapshot
+        _checks += 1
+        version = db.execute(
+            select(CatalogVersion.version).where(CatalogVersion.name == CATALOG_NAME)
+        ).scalar() or 0
+        if snapshot is None or snapshot.version != version:
+            rows = db.query(Exercise).order_by(Exercise.id).all()
+            snapshot = CatalogSnapshot(version, [schemas.Exercise.model_validate(row) for row in rows])
+            _snapshot = snapshot
+            _loads += 1
+        _checked_at = time.monotonic()
+        return snapshot
+
+
+def mark_changed(db: Session) -> None:
+    """
+    Bump the catalog version in the caller's transaction. Call it alongside any
+    write to the exercises table: every worker reloads on its next check, and
+    this one as soon as the transaction commits.
+    """
+    bumped = db.execute(
+        update(CatalogVersion)
+        .where(CatalogVersion.name == CATALOG_NAME)
+        .values(version=CatalogVersion.version + 1)
+    ).rowcount
+    if not bumped:
+        db.add(CatalogVersion(name=CATALOG_NAME, version=1))
+    db.info[_CHANGED_KEY] = True
+
+
+def invalidate() -> None:
+    """Drop this worker's snapshot; the next get() reloads it."""
+    global _snapshot
+    with _lock:
+        _snapshot = None
+
+
+@event.listens_for(Session, "after_commit")
+def _reload_after_write(session):
+    if session.info.pop(_CHANGED_KEY, False):
+        invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_write(session):
+    session.info.pop(_CHANGED_KEY, None)
+
+
+def stats() -> dict:
+    snapshot = _snapshot
+    return {
+        "version": snapshot.version if snapshot else None,
+        "digest": snapshot.digest if snapshot else None,
+        "exercises": len(snapshot.entries) if snapshot else 0,
+        "bytes": len(snapshot.body) if snapshot else 0,
+        "age_seconds": round(time.monotonic() - snapshot.loaded_at, 1) if snapshot else None,
+        "checks": _checks,
+        "loads": _loads,
+    }
@@ -0,0 +1,100 @@
+from collections import Counter
+from typing import Iterable, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.db.models.models import Exercise
+from app.schemas.workout import ExerciseCreate
+from app.services import exercise_catalog
+from app.services.file_import import ImportReport, describe_validation_error
+
+# Columns an import may change on an existing exercise (matched by name)
+UPDATE_FIELDS = ("muscle_group", "equipment", "difficulty", "instructions")
+# Rows per INSERT ... ON CONFLICT statement (and per transaction)
+BATCH_SIZE = 1000
+
+
+def _upsert_statement(dialect: str, update_existing: bool):
+    """
+    INSERT ... ON CONFLICT (name) ... RETURNING name, executed with a list of rows.
+    The statement is the same for every batch, so it compiles once (and SQLAlchemy's
+    insertmanyvalues packs each batch into multi-row VALUES); building it with
+    .values(rows) instead spends most of the import compiling thousands of binds.
+    """
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    statement = insert(Exercise.__table__)
+    if update_existing:
+        # Only rows whose fields actually differ are rewritten (and RETURNed),
+        # so re-running the same file writes nothing
+        statement = statement.on_conflict_do_update(
+            index_elements=[Exercise.name],
+            set_={field: statement.excluded[field] for field in UPDATE_FIELDS},
+            where=or_(*(getattr(Exercise, field).is_distinct_from(statement.excluded[field])
+                        for field in UPDATE_FIELDS)),
+        )
+    else:
+        statement = statement.on_conflict_do_nothing(index_elements=[Exercise.name])
+    return statement.returning(Exercise.name)
+
+
+def _write_batch(db: Session, batch: dict[str, dict], rows_per_name: Counter, update_existing: bool) -> int:
+    """Upsert the batch; returns how many of the rows read were written (a repeated name counts each time)."""
+    statement = _upsert_statement(db.get_bind().dialect.name, update_existing)
+    written = db.scalars(statement, list(batch.values())).all()
+    if written:
+        # Running API workers reload their exercise catalog
+        exercise_catalog.mark_changed(db)
+    db.commit()
+    return sum(rows_per_name[name] for name in written)
+
+
+def import_exercises(
+    db: Session,
+    rows: Iterable[dict],
+    batch_size: int = BATCH_SIZE,
+    update_existing: bool = True,
+    report: Optional[ImportReport] = None,
+    progress=None,
+) -> ImportReport:
+    """
+    Validate `rows` against ExerciseCreate and upsert them by name, `batch_size`
+    rows per statement and transaction. Safe to re-run: existing exercises are
+    updated only where a field differs (or left alone, without `update_existing`).
+    Invalid rows are counted and skipped. `progress(report)` is called after each batch.
+    If reading `rows` fails part-way, the rows before it are still written.
+    """
+    report = report or ImportReport()
+    # Keyed by name: a name repeated within one batch would make the upsert
+    # touch the same row twice, which Postgres rejects. The last one wins.
+    batch: dict[str, dict] = {}
+    rows_per_name: Counter = Counter()
+    try:
+        for row_number, row in enumerate(rows, 1):
+            report.read += 1
+            try:
+                exercise = ExerciseCreate.model_validate(row)
+            except ValidationError as e:
+                report.add_error(row_number, describe_validation_error(e))
+                continue
+            exercise.name = exercise.name.strip()
+            if not exercise.name:
+                report.add_error(row_number, "name: must not be blank")
+                continue
+            batch[exercise.name] = exercise.model_dump()
+            rows_per_name[exercise.name] += 1
+            if len(batch) >= batch_size:
+                # Taken out first, so a batch the database rejects isn't retried below
+                full, counts = batch, rows_per_name
+                batch, rows_per_name = {}, Counter()
+                report.written += _write_batch(db, full, counts, update_existing)
+                if progress:
+                    progress(report)
+    finally:
+        if batch:
+            report.written += _write_batch(db, batch, rows_per_name, update_existing)
+            if progress:
+                progress(report)
+    return report
@@ -0,0 +1,239 @@
+import bisect
+import re
+from collections import defaultdict
+from typing import Optional
+
+from app.db.models.models import ExerciseDifficulty, ExerciseMuscleGroup
+from app.schemas import workout as schemas
+
+# How much a match in each field counts; a name hit outranks an equipment hit
+FIELD_WEIGHTS = {"name": 1.0, "muscle_group": 0.6, "equipment": 0.5}
+# How much each kind of token match counts
+EXACT, PREFIX, ONE_TYPO, TWO_TYPOS = 1.0, 0.8, 0.6, 0.4
+# Query tokens resolved to vocabulary matches, kept per index (typing repeats them)
+TOKEN_CACHE_SIZE = 4096
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: Optional[str]) -> list[str]:
+    """'Push-up', 'body_only' -> ['push', 'up'], ['body', 'only']"""
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+
+def _trigrams(token: str) -> set[str]:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def max_typos(token: str) -> int:
+    if len(token) <= 3:
+        return 0
+    return 1 if len(token) <= 7 else 2
+
+
+def edit_distance(a: str, b: str, limit: int, prefix: bool = False) -> int:
+    """
+    Damerau-Levenshtein (adjacent swaps count once), giving up past `limit`.
+    With `prefix`, the distance from `a` to the closest prefix of `b`.
+    """
+    if prefix:
+        b = b[:len(a) + limit]
+    elif abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before = None
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            if before is not None and i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return min(previous) if prefix else previous[-1]
+
+
+def _bitset(docs: list[int], size: int) -> int:
+    bits = bytearray(size // 8 + 1)
+    for doc in docs:
+        bits[doc >> 3] |= 1 << (doc & 7)
+    return int.from_bytes(bits, "little")
+
+
+class ExerciseSearchIndex:
+    """
+    In-memory search over exercise names, equipment and muscle groups.
+
+    Every distinct token gets an id. A sorted copy of the vocabulary answers
+    prefix lookups by bisection (a flattened trie), and a trigram index over
+    the vocabulary finds typo candidates, confirmed by a bounded edit distance.
+
+    Documents are numbered in tie-break order (shorter names first, then
+    alphabetical) and postings are bitsets (Python ints), one per token and
+    field. A query token becomes a few score levels ("docs whose best match
+    scores s"); ANDing levels across tokens and filters gives score buckets,
+    and the top of the best buckets is read off their lowest set bits. No
+    per-document work is done, so common tokens cost the same as rare ones.
+    """
+
+    def __init__(self, exercises: list[schemas.Exercise]):
+        self.size = len(exercises)
+        self.vocabulary: list[str] = []
+        self._token_ids: dict[str, int] = {}
+        # doc number -> position in `exercises`
+        self._positions = sorted(
+            range(len(exercises)), key=lambda i: (len(exercises[i].name), exercises[i].name.lower())
+        )
+
+        postings: dict[tuple[int, float], list[int]] = defaultdict(list)
+        muscle_groups: dict[str, list[int]] = defaultdict(list)
+        difficulties: dict[str, list[int]] = defaultdict(list)
+        for doc, position in enumerate(self._positions):
+            exercise = exercises[position]
+            terms: dict[int, float] = {}
+            for field, weight in FIELD_WEIGHTS.items():
+                value = getattr(exercise, field)
+                if isinstance(value, (ExerciseMuscleGroup, ExerciseDifficulty)):
+                    value = value.value
+                tokens = tokenize(value)
+                if field == "name":
+                    # Joined neighbours too, so "pullup" finds "Pull-up"
+                    tokens += [a + b for a, b in zip(tokens, tokens[1:])]
+                for token in tokens:
+                    token_id = self._token_id(token)
+                    if terms.get(token_id, 0) < weight:
+                        terms[token_id] = weight
+            for token_id, weight in terms.items():
+                postings[(token_id, weight)].append(doc)
+            if exercise.muscle_group:
+                muscle_groups[exercise.muscle_group.value].append(doc)
+            if exercise.difficulty:
+                difficulties[exercise.difficulty.value].append(doc)
+
+        # (token id, field weight) -> bitset of docs
+        self._postings = {key: _bitset(docs, self.size) for key, docs in postings.items()}
+        self._muscle_groups = {key: _bitset(docs, self.size) for key, docs in muscle_groups.items()}
+        self._difficulties = {key: _bitset(docs, self.size) for key, docs in difficulties.items()}
+        self._all_docs = (1 << self.size) - 1
+
+        self._sorted_vocabulary = sorted(self.vocabulary)
+        self._trigram_index: dict[str, list[int]] = defaultdict(list)
+        for token_id, token in enumerate(self.vocabulary):
+            for trigram in _trigrams(token):
+                self._trigram_index[trigram].append(token_id)
+        self._token_cache: dict[str, list[tuple[float, int]]] = {}
+
+    def _token_id(self, token: str) -> int:
+        token_id = self._token_ids.get(token)
+        if token_id is None:
+            token_id = self._token_ids[token] = len(self.vocabulary)
+            self.vocabulary.append(token)
+        return token_id
+
+    def _resolve(self, token: str) -> dict[int, float]:
+        """Vocabulary matches for one query token: {token id: match score}."""
+        matches: dict[int, float] = {}
+        exact = self._token_ids.get(token)
+        if exact is not None:
+            matches[exact] = EXACT
+        # Prefix: the contiguous run of sorted tokens starting with `token`
+        start = bisect.bisect_left(self._sorted_vocabulary, token)
+        for candidate in self._sorted_vocabulary[start:]:
+            if not candidate.startswith(token):
+                break
+            matches.setdefault(self._token_ids[candidate], PREFIX)
+        # Typos: vocabulary tokens sharing enough trigrams, within the edit budget
+        limit = max_typos(token)
+        if limit:
+            trigrams = _trigrams(token)
+            shared: dict[int, int] = defaultdict(int)
+            for trigram in trigrams:
+                for token_id in self._trigram_index.get(trigram, ()):
+                    shared[token_id] += 1
+            # An edit changes at most 3 trigrams, a swap of neighbours 4
+            needed = max(1, len(trigrams) - 4 * limit)
+            for token_id, count in shared.items():
+                if count < needed or token_id in matches:
+                    continue
+                score = self._typo_score(token, self.vocabulary[token_id], limit)
+                if score:
+                    matches[token_id] = score
+        return matches
+
+    @staticmethod
+    def _typo_score(token: str, candidate: str, limit: int) -> float:
+        distance = edit_distance(token, candidate, limit)
+        if distance > limit and len(candidate) > len(token):
+            # A typo in a word that's still being typed: "dumbel" -> "dumbbell"
+            if edit_distance(token, candidate, limit, prefix=True) <= limit:
+                return TWO_TYPOS
+        if distance > limit:
+            return 0.0
+        return ONE_TYPO if distance <= 1 else TWO_TYPOS
+
+    def _levels(self, token: str) -> list[tuple[float, int]]:
+        """[(score, docs whose best match for `token` scores exactly that)], best first."""
+        cached = self._token_cache.get(token)
+        if cached is not None:
+            return cached
+        at_least: dict[float, int] = defaultdict(int)
+        for token_id, match_score in self._resolve(token).items():
+            for weight in FIELD_WEIGHTS.values():
+                docs = self._postings.get((token_id, weight))
+                if docs:
+                    at_least[round(match_score * weight, 6)] |= docs
+        levels = []
+        seen = 0
+        for score in sorted(at_least, reverse=True):
+            docs = at_least[score] & ~seen
+            if docs:
+                levels.append((score, docs))
+                seen |= docs
+        if len(self._token_cache) >= TOKEN_CACHE_SIZE:
+            self._token_cache.clear()
+        self._token_cache[token] = levels
+        return levels
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        muscle_group: Optional[ExerciseMuscleGroup] = None,
+        difficulty: Optional[ExerciseDifficulty] = None,
+    ) -> list[int]:
+        """Positions (in catalog order) of the best matches, best first."""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or limit <= 0:
+            return []
+        allowed = self._all_docs
+        if muscle_group:
+            allowed &= self._muscle_groups.get(muscle_group.value, 0)
+        if difficulty:
+            allowed &= self._difficulties.get(difficulty.value, 0)
+
+        # total score -> docs; every token must match (AND)
+        buckets = {0.0: allowed}
+        for token in tokens:
+            combined: dict[float, int] = defaultdict(int)
+            for total, docs in buckets.items():
+                for score, matched in self._levels(token):
+                    both = docs & matched
+                    if both:
+                        combined[round(total + score, 6)] |= both
+            if not combined:
+                return []
+            buckets = combined
+
+        results = []
+        for total in sorted(buckets, reverse=True):
+            docs = buckets[total]
+            # Lowest bit first = shortest, then alphabetical, name
+            while docs and len(results) < limit:
+                lowest = docs & -docs
+                results.append(self._positions[lowest.bit_length() - 1])
+                docs ^= lowest
+            if len(results) == limit:
+                break
+        return results
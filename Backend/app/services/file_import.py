@@ -0,0 +1,184 @@
+"""
+Reading row files (CSV, NDJSON, JSON arrays) for bulk imports, one row at a time,
+and tallying the outcome. Used by app.services.exercise_import and
+app.services.food_import.
+"""
+import csv
+import json
+import re
+import time
+from typing import IO, Iterator, Optional
+
+from pydantic import ValidationError
+
+# Characters read at a time from a JSON array
+_CHUNK_SIZE = 1 << 16
+# The longest row (array element or line) a reader holds in memory; past it, the file is rejected
+MAX_ROW_SIZE = 1 << 20
+_STRUCTURE = re.compile(r'["{}\[\],]')
+_STRING_END = re.compile(r'["\\]')
+
+
+def describe_validation_error(error: ValidationError) -> str:
+    """'calories_per_100g: Input should be a valid number; ...' for one row."""
+    return "; ".join(
+        ": ".join(filter(None, (".".join(map(str, e["loc"])), e["msg"]))) for e in error.errors()
+    )
+
+
+class ImportReport:
+    """Running totals for one import; `errors` keeps the first `max_errors` invalid rows."""
+
+    def __init__(self, max_errors: int = 20):
+        self.read = 0
+        self.invalid = 0
+        self.written = 0
+        self.started = time.perf_counter()
+        self.errors: list[tuple[int, str]] = []
+        self.max_errors = max_errors
+
+    @property
+    def unchanged(self) -> int:
+        return self.read - self.invalid - self.written
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.read / max(time.perf_counter() - self.started, 1e-9)
+
+    def add_error(self, row_number: int, message: str):
+        self.invalid += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((row_number, message))
+
+    def add_read_error(self, error: Exception):
+        """The file can't be read past the rows so far: one more row, and an invalid one."""
+        self.read += 1
+        self.add_error(self.read, f"Could not read the file past this row: {error}")
+
+    def summary(self) -> str:
+        elapsed = time.perf_counter() - self.started
+        return (f"{self.read} rows in {elapsed:.2f}s ({self.rows_per_second:,.0f} rows/s): "
+                f"{self.written} written, {self.unchanged} unchanged, {self.invalid} invalid")
+
+
+# --- Readers: each yields one dict per exercise, without loading the whole file ---
+def _lines(file: IO[str], max_row_size: int) -> Iterator[str]:
+    """The lines of `file`; raises ValueError for one longer than `max_row_size`."""
+    while True:
+        line = file.readline(max_row_size + 1)
+        if not line:
+            return
+        if len(line) > max_row_size and not line.endswith("\n"):
+            raise ValueError(f"a line is longer than {max_row_size} characters")
+        yield line
+
+
+def iter_csv(file: IO[str], max_row_size: int = MAX_ROW_SIZE) -> Iterator[dict]:
+    for row in csv.DictReader(_lines(file, max_row_size)):
+        # Empty cells are missing values, not empty strings
+        yield {key: value for key, value in row.items() if key and value not in ("", None)}
+
+
+def iter_ndjson(file: IO[str], max_row_size: int = MAX_ROW_SIZE) -> Iterator[dict]:
+    for line in _lines(file, max_row_size):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # Passed on as-is, so it's reported as an invalid row rather than ending the import
+                yield line.strip()
+
+
+def _skip_separators(buffer: str, position: int) -> int:
+    while position < len(buffer) and buffer[position] in " \t\r\n,":
+        position += 1
+    return position
+
+
+def _element_end(buffer: str, start: int) -> Optional[int]:
+    """
+    Where the array element starting at `start` ends, going by brackets and
+    strings only (so it works on malformed elements too); None if it runs past
+    the buffer.
+    """
+    depth = 0
+    position = start
+    while True:
+        match = _STRUCTURE.search(buffer, position)
+        if match is None:
+            return None
+        char, position = match.group(), match.end()
+        if char == '"':
+            # Skip to the closing quote, stepping over escapes
+            while True:
+                match = _STRING_END.search(buffer, position)
+                if match is None:
+                    return None
+                position = match.end() + (match.group() == "\\")
+                if match.group() == '"':
+                    break
+        elif char in "[{":
+            depth += 1
+        elif char in "]}" and depth > 1:
+            depth -= 1
+        elif char in "]}" and depth == 1:
+            return position
+        elif depth == 0 and char in ",]":
+            # The end of a scalar (or of stray text)
+            return match.start()
+
+
+def iter_json_array(file: IO[str], max_row_size: int = MAX_ROW_SIZE) -> Iterator[dict]:
+    """
+    The elements of a top-level JSON array of objects, decoded one at a time;
+    the buffer holds at most one chunk plus the element being read. A malformed
+    element is passed on as its text (reported as an invalid row), and reading
+    resumes after it. Raises ValueError for an element longer than `max_row_size`.
+    """
+    decoder = json.JSONDecoder()
+    buffer = file.read(_CHUNK_SIZE).lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("expected a JSON array")
+    position = 1
+    while True:
+        position = _skip_separators(buffer, position)
+        if position < len(buffer) and buffer[position] == "]":
+            return
+        try:
+            element, end = decoder.raw_decode(buffer, position)
+            # At the end of the buffer, a number may continue in the next chunk
+            complete, malformed = end < len(buffer), False
+        except json.JSONDecodeError:
+            end = _element_end(buffer, position)
+            complete, malformed = end is not None, True
+        if complete and end - position > max_row_size:
+            raise ValueError(f"an element is longer than {max_row_size} characters")
+        if not complete:
+            if len(buffer) - position > max_row_size:
+                raise ValueError(f"an element is longer than {max_row_size} characters")
+            # The element runs past the buffer: drop what's been read, append a chunk
+            chunk = file.read(_CHUNK_SIZE)
+            if not chunk:
+                raise ValueError("truncated JSON array")
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        # Passed on as-is, so it's reported as an invalid row rather than ending the import
+        yield buffer[position:end].strip() if malformed else element
+        position = end
+
+
+def read_rows(file: IO[str], format: str) -> Iterator[dict]:
+    """`format` is "csv", "ndjson" or "json" (an array of objects)."""
+    readers = {"csv": iter_csv, "ndjson": iter_ndjson, "json": iter_json_array}
+    if format not in readers:
+        raise ValueError(f"unknown file format {format!r}")
+    return readers[format](file)
+
+
+def guess_format(path: str) -> str:
+    if path.endswith(".csv"):
+        return "csv"
+    if path.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return "json"
@@ -0,0 +1,79 @@
+from typing import Iterable, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app.db.models.models import FoodItem
+from app.schemas.food import FoodItemCreate
+from app.services.file_import import ImportReport, describe_validation_error
+
+
+def _database_error(error: DBAPIError) -> str:
+    # First line of the driver's message, e.g. "numeric field overflow"
+    return str(error.orig).strip().splitlines()[0]
+
+
+def _insert_batch(db: Session, batch: list[tuple[int, dict]], report: ImportReport):
+    """Insert one batch in one transaction; if the database rejects it, find the rows it rejected."""
+    # One statement for every batch: it compiles once and runs as an executemany
+    statement = insert(FoodItem.__table__)
+    try:
+        db.execute(statement, [values for _, values in batch])
+        db.commit()
+        report.written += len(batch)
+        return
+    except DBAPIError:
+        db.rollback()
+    # Rare (values the columns can't hold): retry row by row, each in a savepoint
+    for row_number, values in batch:
+        try:
+            with db.begin_nested():
+                db.execute(statement, values)
+            report.written += 1
+        except DBAPIError as e:
+            report.add_error(row_number, _database_error(e))
+    db.commit()
+
+
+def import_foods(
+    db: Session,
+    user_id: int,
+    rows: Iterable[dict],
+    batch_size: int,
+    max_rows: int,
+    report: Optional[ImportReport] = None,
+) -> ImportReport:
+    """
+    Validate `rows` against FoodItemCreate and add them to the user's food library,
+    `batch_size` rows per INSERT and transaction, so a failure part-way keeps the
+    batches before it. Invalid rows are skipped and reported by row number
+    (1 = first data row). Stops after `max_rows` rows.
+    """
+    report = report or ImportReport()
+    batch: list[tuple[int, dict]] = []
+    try:
+        for row_number, row in enumerate(rows, 1):
+            if row_number > max_rows:
+                report.add_error(row_number, f"Only {max_rows} rows can be imported at once; the rest were skipped")
+                break
+            report.read += 1
+            try:
+                food = FoodItemCreate.model_validate(row)
+            except ValidationError as e:
+                report.add_error(row_number, describe_validation_error(e))
+                continue
+            food.name = food.name.strip()
+            if not food.name:
+                report.add_error(row_number, "name: must not be blank")
+                continue
+            batch.append((row_number, {**food.model_dump(), "user_id": user_id}))
+            if len(batch) >= batch_size:
+                _insert_batch(db, batch, report)
+                batch = []
+    finally:
+        # Rows read before the file turned out to be broken still count
+        if batch:
+            _insert_batch(db, batch, report)
+    return report
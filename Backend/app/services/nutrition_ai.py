@@ -1,12 +1,50 @@
-import google.generativeai as genai
+from app.core import metrics
 from app.core.config import settings
-from app.schemas.meal import MacroAnalysisResponse, LoggedFoodItem
+from app.core.request_timing import span
+from app.schemas.meal import MacroAnalysisResponse, LoggedFoodItem, LoggedFoodItems
+import hashlib
 import json
+import re
+import time
+from types import SimpleNamespace
 from typing import Union
 
-# Configure the Gemini client
-genai.configure(api_key=settings.GEMINI_API_KEY)
-model = genai.GenerativeModel('gemini-2.5-flash')
+class StubModel:
+    """
+    Stands in for Gemini when settings.NUTRITION_AI_STUB is set (offline development,
+    load tests). Every part of the meal ("2 eggs, toast and jam") becomes one item with
+    made-up but stable macros, returned as JSON text so it goes through the same parsing
+    and validation as a real answer. NUTRITION_AI_STUB_LATENCY_MS imitates the round trip.
+    """
+
+    def generate_content(self, prompt: str):
+        if settings.NUTRITION_AI_STUB_LATENCY_MS:
+            time.sleep(settings.NUTRITION_AI_STUB_LATENCY_MS / 1000)
+        meal = prompt.rsplit("Analyze this meal:", 1)[-1].strip().strip('"')
+        parts = [part.strip() for part in re.split(r",|\+|\band\b|\bwith\b", meal) if part.strip()]
+        items = []
+        for part in parts or ["meal"]:
+            seed = int.from_bytes(hashlib.blake2b(part.lower().encode(), digest_size=4).digest(), "big")
+            quantity = 50 + seed % 250
+            protein = round(quantity * (seed % 25) / 100, 1)
+            carbs = round(quantity * (seed // 25 % 60) / 100, 1)
+            fat = round(quantity * (seed // 1500 % 20) / 100, 1)
+            items.append({
+                "name": part[:1].upper() + part[1:], "quantity_g": quantity,
+                "calories": round(4 * protein + 4 * carbs + 9 * fat, 1),
+                "protein": protein, "carbs": carbs, "fat": fat,
+            })
+        return SimpleNamespace(text=json.dumps(items))
+
+if settings.NUTRITION_AI_STUB:
+    model = StubModel()
+else:
+    # Imported here so the stub runs without google-generativeai installed
+    import google.generativeai as genai
+
+    # Configure the Gemini client
+    genai.configure(api_key=settings.GEMINI_API_KEY)
+    model = genai.GenerativeModel('gemini-2.5-flash')
 
 # This prompt is the "magic." We're forcing it to return JSON.
 SYSTEM_PROMPT = """
@@ -55,15 +93,18 @@ Each object in the list MUST contain ALL of the following fields:
 def analyze_meal_text(query: str) -> Union[MacroAnalysisResponse, None]:
     try:
         full_prompt = f"{SYSTEM_PROMPT}\n\nAnalyze this meal: \"{query}\""
-        response = model.generate_content(full_prompt)
+        started = time.perf_counter()
+        try:
+            with span("ai"):
+                response = model.generate_content(full_prompt)
+        finally:
+            metrics.ai_latency.observe(time.perf_counter() - started)
         
         json_text = response.text.strip().replace("```json", "").replace("```", "")
         
-        # 1. Parse the AI's response (which is now just a list)
-        items_data = json.loads(json_text)
-        
-        # 2. Validate the list of items using our Pydantic schema
-        validated_items: list[LoggedFoodItem] = [LoggedFoodItem(**item) for item in items_data]
+        # 1 + 2. Parse the AI's response (which is now just a list) and validate
+        #        the items against our Pydantic schema, in one pass
+        validated_items: list[LoggedFoodItem] = LoggedFoodItems.validate_json(json_text)
         
         # 3. --- THIS IS THE FIX ---
         #    Calculate totals ourselves instead of trusting the AI
@@ -83,5 +124,6 @@ def analyze_meal_text(query: str) -> Union[MacroAnalysisResponse, None]:
         return MacroAnalysisResponse(items=validated_items, totals=totals)
         
     except Exception as e:
+        metrics.ai_errors.inc()
         print(f"Error during AI analysis: {e}")
         return None
\ No newline at end of file
@@ -0,0 +1,98 @@
+"""
+Stored size and encode/decode time of the workout log and plan JSON columns.
+
+Generates --users users' worth of workout logs and plans (benchmarks.generate_data's
+shapes, --years of history each) as the app stores them, then runs every value
+through app.db.blob_codec in each BLOB_FORMAT: json (the text as is), msgpack,
+zstd without a dictionary, and zstd with a dictionary trained, as
+`python -m app.reencode_blobs --train-dictionary` does, on the first half of
+the values and measured on the other half. Reports bytes per row (tag and
+header included) and the per-row encode and decode time: the best of --rounds
+passes over all rows. Decoding ends in the JSON text the routes splice into
+their responses. No database needed.
+
+    python -m benchmarks.bench_blob_codec
+    python -m benchmarks.bench_blob_codec --users 500 --level 9
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+import orjson
+
+from app.core.config import settings
+from app.db import blob_codec
+from app.seed_data import EXERCISE_DATA
+from app.services.blob_reencoder import COLUMNS, DICTIONARY_SIZE
+from benchmarks.generate_data import user_rows
+
+FORMATS = ["json", "msgpack", "zstd", "zstd+dict"]
+
+
+def stored_values(args) -> dict[str, list[str]]:
+    """Each column's values, as compact JSON like the app writes them."""
+    exercise_ids = {n + 1: exercise["name"] for n, exercise in enumerate(EXERCISE_DATA)}
+    days = [date(2024, 1, 1) + timedelta(days=n) for n in range(round(args.years * 365))]
+    values: dict[str, list[str]] = {name: [] for name in COLUMNS}
+    for n in range(args.users):
+        rows = user_rows(random.Random(f"{args.seed}-{n}"), n + 1, exercise_ids, days, foods_per_user=0)
+        for key, name in (("workout_logs", "workout_logs.log_details_json"),
+                          ("plans", "workout_plans.plan_details_json")):
+            values[name] += [orjson.dumps(orjson.loads(row[name.split(".")[1]])).decode() for row in rows[key]]
+    return values
+
+
+def best_per_row(function, values, rounds: int) -> float:
+    """Microseconds per value, best of `rounds` passes."""
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for value in values:
+            function(value)
+        best = min(best, time.perf_counter() - started)
+    return best / len(values) * 1e6
+
+
+def measure(column: str, values: list[str], format: str, rounds: int) -> dict:
+    if format == "zstd+dict":
+        dictionary = blob_codec._zstd().train_dictionary(DICTIONARY_SIZE, [value.encode() for value in values[::2]])
+        blob_codec.use_dictionary(column, 1, dictionary.as_bytes())
+        # Measured on the rows it wasn't trained on
+        values, format = values[1::2], "zstd"
+    elif format == "zstd":
+        blob_codec.use_dictionary(column, 0, None)
+    encoded = [blob_codec.encode(value, column, format) for value in values]
+    assert [blob_codec.decode(data) for data in encoded] == values
+    return {
+        "bytes": sum(map(len, encoded)) / len(encoded),
+        "encode_us": best_per_row(lambda value: blob_codec.encode(value, column, format), values, rounds),
+        "decode_us": best_per_row(blob_codec.decode, encoded, rounds),
+    }
+
+
+def main(args) -> int:
+    settings.BLOB_ZSTD_LEVEL = args.level
+    values = stored_values(args)
+    print(f"zstd level {args.level}, dictionary {DICTIONARY_SIZE // 1024} KiB, best of {args.rounds} rounds\n")
+    print(f"{'column':<34} {'format':<10} {'rows':>7} {'bytes/row':>10} {'vs json':>8} {'encode us':>10} {'decode us':>10}")
+    for column, column_values in values.items():
+        plain = None
+        for format in FORMATS:
+            result = measure(column, column_values, format, args.rounds)
+            plain = plain or result["bytes"]
+            rows = len(column_values) if format != "zstd+dict" else len(column_values[1::2])
+            print(f"{column:<34} {format:<10} {rows:>7} {result['bytes']:>10.1f} "
+                  f"{result['bytes'] / plain:>7.0%} {result['encode_us']:>10.2f} {result['decode_us']:>10.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--years", type=float, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--level", type=int, default=settings.BLOB_ZSTD_LEVEL, help="zstd compression level")
+    parser.add_argument("--rounds", type=int, default=5)
+    sys.exit(main(parser.parse_args()))
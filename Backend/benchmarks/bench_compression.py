@@ -0,0 +1,146 @@
+"""
+Bytes on the wire and CPU cost of response compression, per route.
+
+Builds the bodies of the large responses the way their routes do (the
+exercise catalog at limit=1000, a 100-log page of GET /workouts/logs, a busy
+day's meal log, a user's plans) and runs each through
+app.core.compression in every encoding at the configured levels
+(COMPRESSION_*). Reports the bytes sent and the CPU time per response: the
+best of --rounds rounds, each long enough to take --min-time seconds. The
+"hit" row is the catalog served from the compressed-variant cache. --levels
+adds a sweep over each encoder's levels on the two largest bodies, which is
+where the configured defaults and caps come from. No database or running API
+needed.
+
+    python -m benchmarks.bench_compression
+    python -m benchmarks.bench_compression --levels
+"""
+import argparse
+import gzip
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+os.environ.setdefault("NUTRITION_AI_STUB", "true")
+
+import brotli
+import zstandard
+
+from app.api.v1.endpoints import nutrition, workout
+from app.core import compression
+from app.core.config import settings
+from app.core.json_response import json_response
+from app.schemas.workout import Exercise
+from app.seed_data import EXERCISE_DATA
+from app.services.exercise_catalog import CatalogSnapshot
+from benchmarks.generate_data import FOODS, user_rows
+
+# Levels swept by --levels (the settings cap gzip and br at 6, zstd at 9)
+LEVELS = {
+    "gzip": (lambda body, level: gzip.compress(body, compresslevel=level, mtime=0), [1, 3, 5, 6, 9]),
+    "br": (lambda body, level: brotli.compress(body, quality=level), [0, 2, 4, 6, 9, 11]),
+    "zstd": (lambda body, level: zstandard.ZstdCompressor(level=level).compress(body), [1, 3, 6, 9, 15, 19]),
+}
+
+
+def catalog_body(size: int = 1000) -> bytes:
+    exercises = [Exercise.model_validate({**EXERCISE_DATA[n % len(EXERCISE_DATA)], "id": n + 1,
+                                          "name": f"{EXERCISE_DATA[n % len(EXERCISE_DATA)]['name']} {n // len(EXERCISE_DATA) + 1}",
+                                          "instructions": "Keep your core braced and control the lowering phase."})
+                 for n in range(size)]
+    return CatalogSnapshot(1, exercises).page(0, size)
+
+
+def workout_bodies(logs: int = 100) -> tuple[bytes, bytes]:
+    """A page of `logs` workout logs and the user's plans, as GET /workouts/logs and /plans send them."""
+    exercise_ids = {n + 1: exercise["name"] for n, exercise in enumerate(EXERCISE_DATA)}
+    days = [date(2024, 1, 1) + timedelta(days=n) for n in range(365)]
+    rows = user_rows(random.Random(1), 1, exercise_ids, days, foods_per_user=0)
+    page = [workout.parse_log_response(SimpleNamespace(id=n + 1, **row))
+            for n, row in enumerate(rows["workout_logs"][:logs])]
+    plans = [workout.parse_plan_response(SimpleNamespace(id=n + 1, **row)) for n, row in enumerate(rows["plans"])]
+    return json_response(page).body, json_response(plans).body
+
+
+def meal_body(items: int = 40) -> bytes:
+    """A busy day's GET /nutrition/meals/by-date."""
+    rng = random.Random(1)
+    foods = [food for meal in FOODS.values() for food in meal]
+    logged = []
+    for _ in range(items):
+        name, kcal, protein, carbs, fat, (low, high) = rng.choice(foods)
+        grams = rng.randrange(low, high + 1, 5)
+        logged.append(SimpleNamespace(
+            log_item_id=str(uuid.UUID(int=rng.getrandbits(128), version=4)), name=name, quantity_g=grams,
+            calories=round(kcal * grams / 100, 1), protein=round(protein * grams / 100, 1),
+            carbs=round(carbs * grams / 100, 1), fat=round(fat * grams / 100, 1)))
+    log = SimpleNamespace(id=1, date=date(2024, 5, 1), user_id=1, items=logged)
+    return json_response(nutrition.parse_log_response(log)).body
+
+
+def cpu_per_call(function, rounds: int, min_time: float) -> float:
+    """Microseconds of CPU (this thread) per call, best of `rounds`."""
+    number = 1
+    while True:
+        started = time.thread_time()
+        for _ in range(number):
+            function()
+        if time.thread_time() - started >= min_time:
+            break
+        number *= 2
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.thread_time()
+        for _ in range(number):
+            function()
+        best = min(best, (time.thread_time() - started) / number)
+    return best * 1e6
+
+
+def main(args) -> int:
+    logs, plans = workout_bodies()
+    bodies = {
+        "GET /workouts/exercises?limit=1000": catalog_body(),
+        "GET /workouts/logs (100 logs)": logs,
+        "GET /nutrition/meals/by-date (40 items)": meal_body(),
+        "GET /workouts/plans": plans,
+    }
+    print(f"gzip {settings.COMPRESSION_GZIP_LEVEL}, br {settings.COMPRESSION_BROTLI_QUALITY}, "
+          f"zstd {settings.COMPRESSION_ZSTD_LEVEL}; CPU time, best of {args.rounds} rounds\n")
+    print(f"{'route':<42} {'encoding':<9} {'bytes':>8} {'ratio':>6} {'cpu us':>9}")
+    for route, body in bodies.items():
+        print(f"{route:<42} {'identity':<9} {len(body):>8} {1:>6.0%} {0:>9.1f}")
+        for encoding in compression.compressors():
+            compressed = compression.compress(body, encoding)
+            seconds = cpu_per_call(lambda: compression.compress(body, encoding), args.rounds, args.min_time)
+            print(f"{'':<42} {encoding:<9} {len(compressed):>8} {len(compressed) / len(body):>6.0%} {seconds:>9.1f}")
+        if route.startswith("GET /workouts/exercises"):
+            encoding = next(iter(compression.compressors()))
+            key = ("GET", "/api/v1/workouts/exercises", b"limit=1000", '"catalog-etag"')
+            compressed = compression.compress(body, encoding, key)
+            seconds = cpu_per_call(lambda: compression.compress(body, encoding, key), args.rounds, args.min_time)
+            print(f"{'':<42} {encoding + ' hit':<9} {len(compressed):>8} {len(compressed) / len(body):>6.0%} "
+                  f"{seconds:>9.1f}  (cached)")
+
+    if args.levels:
+        print(f"\n{'body':<42} {'encoder':<9} {'level':>5} {'bytes':>8} {'cpu us':>9}")
+        for route in list(bodies)[:2]:
+            body = bodies[route]
+            for encoder, (function, levels) in LEVELS.items():
+                for level in levels:
+                    size = len(function(body, level))
+                    seconds = cpu_per_call(lambda: function(body, level), args.rounds, args.min_time)
+                    print(f"{route:<42} {encoder:<9} {level:>5} {size:>8} {seconds:>9.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.05)
+    parser.add_argument("--levels", action="store_true", help="also sweep each encoder's levels")
+    sys.exit(main(parser.parse_args()))
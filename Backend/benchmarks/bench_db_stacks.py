@@ -0,0 +1,73 @@
+"""
+Sync vs async database stack benchmark.
+
+Start two servers against the same database, one with DB_ASYNC=false and one
+with DB_ASYNC=true, then compare req/s and latency percentiles on the read
+routes that the async stack serves:
+
+    DB_ASYNC=false uvicorn app.main:app --port 8000 --workers 2
+    DB_ASYNC=true  uvicorn app.main:app --port 8001 --workers 2
+    python -m benchmarks.bench_db_stacks --sync-url http://localhost:8000 \\
+        --async-url http://localhost:8001 --email a@b.com --password secret
+"""
+import argparse
+import asyncio
+from datetime import date, timedelta
+
+import httpx
+
+from benchmarks.loadgen import LatencyRecorder, drive, login, print_report
+
+
+def routes(token: str, log_date: date, days: int):
+    headers = {"Authorization": f"Bearer {token}"}
+    start = log_date - timedelta(days=days)
+    return {
+        "GET /nutrition/meals/by-date": lambda c: c.get(
+            "/api/v1/nutrition/meals/by-date", params={"log_date": log_date.isoformat()}, headers=headers
+        ),
+        "GET /workouts/logs": lambda c: c.get(
+            "/api/v1/workouts/logs",
+            params={"start_date": start.isoformat(), "end_date": log_date.isoformat()},
+            headers=headers,
+        ),
+    }
+
+
+async def bench(base_url: str, args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        token = await login(client, args.email, args.password)
+        results = {}
+        # One route at a time, so each gets the full concurrency
+        for route, factory in routes(token, args.date, args.days).items():
+            recorder = LatencyRecorder()
+            await drive(client, route, factory, recorder, args.concurrency, args.duration)
+            recorder.stop()
+            results.update(recorder.report())
+        return results
+
+
+async def main(args):
+    sync_report = await bench(args.sync_url, args)
+    async_report = await bench(args.async_url, args)
+    print_report(f"sync stack ({args.sync_url})", sync_report)
+    print_report(f"async stack ({args.async_url})", async_report)
+    print()
+    for route in sync_report:
+        s, a = sync_report[route], async_report.get(route, {})
+        print(f"{route}: req/s {s['req_per_s']} -> {a.get('req_per_s')}, "
+              f"p99 {s['p99_ms']}ms -> {a.get('p99_ms')}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sync-url", default="http://localhost:8000")
+    parser.add_argument("--async-url", default="http://localhost:8001")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--date", type=date.fromisoformat, default=date.today())
+    parser.add_argument("--days", type=int, default=90, help="Width of the /workouts/logs range")
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--concurrency", type=int, default=64)
+    asyncio.run(main(parser.parse_args()))
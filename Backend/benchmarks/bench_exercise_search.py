@@ -0,0 +1,117 @@
+"""
+Micro-benchmark for the in-memory exercise search (app/services/exercise_search.py).
+
+Builds an index over a synthetic catalog (default 50k exercises, names like
+"Seated Close-Grip Cable Row") and times a mix of exact, prefix, typo,
+multi-word and filtered queries. "cold" clears the per-index token cache
+before every query; "warm" is a repeat of the same query.
+No database or running API needed.
+
+    python -m benchmarks.bench_exercise_search --size 50000
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+
+from app.db.models.models import ExerciseDifficulty, ExerciseMuscleGroup
+from app.schemas.workout import Exercise
+from app.services.exercise_search import ExerciseSearchIndex
+
+from benchmarks.loadgen import percentile
+
+MODIFIERS = ["Incline", "Decline", "Seated", "Standing", "Single-Arm", "Close-Grip", "Wide-Grip",
+             "Reverse", "Paused", "Tempo", "Deficit", "Banded", "Kneeling", "Lying", "Alternating",
+             "Neutral-Grip", "Isometric", "Half", "Bulgarian", "Landmine"]
+EQUIPMENT = ["Barbell", "Dumbbell", "Cable", "Machine", "Kettlebell", "Smith Machine", "Band",
+             "Bodyweight", "EZ-Bar", "Trap Bar"]
+MOVEMENTS = {
+    "Bench Press": "chest", "Fly": "chest", "Push-up": "chest", "Row": "back", "Pulldown": "back",
+    "Pull-up": "back", "Deadlift": "back", "Shoulder Press": "shoulders", "Lateral Raise": "shoulders",
+    "Curl": "biceps", "Hammer Curl": "biceps", "Pushdown": "triceps", "Skull Crusher": "triceps",
+    "Squat": "legs", "Lunge": "legs", "Hip Thrust": "legs", "Calf Raise": "legs",
+    "Crunch": "core", "Plank": "core", "Clean and Press": "full_body",
+}
+
+QUERIES = [
+    # (label, query, filters)
+    ("exact", "bench press", {}),
+    ("exact, common", "press", {}),
+    ("prefix", "lat", {}),
+    ("prefix, 1 char", "k", {}),
+    ("typo", "dumbell curl", {}),
+    ("typo", "bench pres", {}),
+    ("typo, swap", "sqaut", {}),
+    ("multi-word", "seated cable row", {}),
+    ("filter", "press", {"muscle_group": ExerciseMuscleGroup.shoulders}),
+    ("filter", "curl", {"difficulty": ExerciseDifficulty.beginner}),
+    ("no match", "zzzz", {}),
+]
+
+
+def synthetic_catalog(size: int, seed: int = 7) -> list[Exercise]:
+    rng = random.Random(seed)
+    difficulties = list(ExerciseDifficulty)
+    names = set()
+    exercises = []
+    while len(exercises) < size:
+        movement, muscle_group = rng.choice(list(MOVEMENTS.items()))
+        equipment = rng.choice(EQUIPMENT)
+        parts = rng.sample(MODIFIERS, rng.randint(0, 2)) + [equipment, movement]
+        if len(names) > size // 2:
+            # Past the plain combinations, number the variations
+            parts.append(f"Variation {rng.randint(1, 99)}")
+        name = " ".join(parts)
+        if name in names:
+            continue
+        names.add(name)
+        exercises.append(Exercise(
+            id=len(exercises) + 1, name=name, muscle_group=ExerciseMuscleGroup(muscle_group),
+            equipment=equipment.lower().replace(" ", "_"), difficulty=rng.choice(difficulties),
+        ))
+    return exercises
+
+
+def time_query(index: ExerciseSearchIndex, query: str, filters: dict, repeat: int, cold: bool) -> list[float]:
+    timings = []
+    for _ in range(repeat):
+        if cold:
+            index._token_cache.clear()
+        started = time.perf_counter()
+        index.search(query, limit=20, **filters)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main(args) -> int:
+    started = time.perf_counter()
+    exercises = synthetic_catalog(args.size)
+    print(f"generated {len(exercises)} exercises in {time.perf_counter() - started:.2f}s")
+
+    started = time.perf_counter()
+    index = ExerciseSearchIndex(exercises)
+    print(f"built index in {time.perf_counter() - started:.2f}s, {len(index.vocabulary)} distinct tokens\n")
+
+    print(f"{'query':<34} {'hits':>4} {'top match':<40} {'cold p50':>9} {'cold p99':>9} {'warm p50':>9}")
+    everything = []
+    for label, query, filters in QUERIES:
+        cold = time_query(index, query, filters, args.repeat, cold=True)
+        warm = time_query(index, query, filters, args.repeat, cold=False)
+        everything.extend(cold)
+        hits = index.search(query, limit=20, **filters)
+        top = exercises[hits[0]].name if hits else "-"
+        shown = f"{label}: {query!r}" + (" +filter" if filters else "")
+        print(f"{shown:<34} {len(hits):>4} {top[:40]:<40} "
+              f"{statistics.median(cold) * 1000:>7.3f}ms {percentile(cold, 99) * 1000:>7.3f}ms "
+              f"{statistics.median(warm) * 1000:>7.3f}ms")
+    print(f"\nall queries, cold: p50 {statistics.median(everything) * 1000:.3f}ms, "
+          f"p99 {percentile(everything, 99) * 1000:.3f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=50_000, help="exercises in the synthetic catalog")
+    parser.add_argument("--repeat", type=int, default=200, help="runs per query")
+    sys.exit(main(parser.parse_args()))
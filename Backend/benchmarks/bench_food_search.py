@@ -0,0 +1,190 @@
+"""
+Food search benchmark: the old ILIKE scan vs the pg_trgm search path.
+
+Loads --rows synthetic food_items spread over --users benchmark users into a
+migrated Postgres database (alembic head, so the trigram indexes exist), then
+times both queries per search term and checks what each one finds for
+misspelled terms. The rows are left in place for re-runs; pass --cleanup to
+delete them (and the benchmark users) at the end.
+
+    python -m benchmarks.bench_food_search --url postgresql+psycopg2://user:pw@localhost/lifehub_bench
+"""
+import argparse
+import statistics
+import sys
+import time
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session
+
+from benchmarks.loadgen import percentile
+
+EMAIL_PATTERN = "bench-food-search-%@example.invalid"
+
+# Real substrings, then the same foods with a typo
+TERMS = ["chicken", "oat", "greek yogurt", "brown rice", "salmon", "almond butter"]
+TYPO_TERMS = ["chiken", "yoghurt", "samlon", "almnd butter", "brocoli", "bluberry"]
+
+ADJECTIVES = ["Grilled", "Roasted", "Raw", "Steamed", "Smoked", "Organic", "Fried", "Baked",
+              "Boiled", "Fresh", "Frozen", "Canned", "Dried", "Low Fat", "Whole", "Spicy"]
+FOODS = ["Chicken Breast", "Chicken Thigh", "Rolled Oats", "Greek Yogurt", "Brown Rice",
+         "White Rice", "Salmon Fillet", "Almond Butter", "Peanut Butter", "Broccoli",
+         "Blueberry", "Banana", "Sweet Potato", "Lentils", "Tofu", "Cottage Cheese",
+         "Turkey Mince", "Quinoa", "Avocado", "Spinach", "Black Beans", "Egg Whites",
+         "Tuna Steak", "Beef Sirloin", "Whole Wheat Bread", "Cheddar Cheese", "Apple"]
+
+
+def sql_array(values: list[str]) -> str:
+    return "ARRAY[" + ", ".join("'" + v.replace("'", "''") + "'" for v in values) + "]"
+
+
+def load(engine, rows: int, users: int) -> list[int]:
+    with engine.begin() as conn:
+        user_ids = list(conn.execute(
+            text("SELECT id FROM users WHERE email LIKE :pattern ORDER BY id"), {"pattern": EMAIL_PATTERN}
+        ).scalars())
+        if len(user_ids) < users:
+            conn.execute(text("""
+                INSERT INTO users (email, full_name, hashed_password, is_active)
+                SELECT replace(:pattern, '%', n::text), 'Search Bench', '!', true
+                FROM generate_series(:start, :stop) AS n
+            """), {"pattern": EMAIL_PATTERN, "start": len(user_ids), "stop": users - 1})
+            user_ids = list(conn.execute(
+                text("SELECT id FROM users WHERE email LIKE :pattern ORDER BY id"), {"pattern": EMAIL_PATTERN}
+            ).scalars())
+        user_ids = user_ids[:users]
+
+        existing = conn.execute(
+            text("SELECT count(*) FROM food_items WHERE user_id = ANY(:ids)"), {"ids": user_ids}
+        ).scalar_one()
+        if existing >= rows:
+            print(f"reusing {existing} food_items rows")
+            return user_ids
+
+        print(f"loading {rows - existing} food_items rows ...", flush=True)
+        started = time.perf_counter()
+        conn.execute(text(f"""
+            INSERT INTO food_items (name, calories_per_100g, protein_per_100g, carbs_per_100g, fat_per_100g, user_id)
+            SELECT
+                ({sql_array(ADJECTIVES)})[1 + n % {len(ADJECTIVES)}] || ' ' ||
+                ({sql_array(FOODS)})[1 + (n / {len(ADJECTIVES)}) % {len(FOODS)}] || ' #' || n,
+                round((random() * 500)::numeric, 2), round((random() * 40)::numeric, 2),
+                round((random() * 80)::numeric, 2), round((random() * 30)::numeric, 2),
+                (:ids)[1 + n % :users]
+            FROM generate_series(:start, :stop) AS n
+        """), {"ids": user_ids, "users": len(user_ids), "start": existing, "stop": rows - 1})
+        print(f"loaded in {time.perf_counter() - started:.1f}s")
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("ANALYZE food_items"))
+    return user_ids
+
+
+def legacy_search(db: Session, user_id: int, query: str):
+    # The query search_user_food_items ran before the trigram indexes
+    from app.db.models.models import FoodItem
+    return db.query(FoodItem).filter(
+        FoodItem.user_id == user_id,
+        FoodItem.name.ilike(f"%{query}%")
+    ).all()
+
+
+def trigram_search(db: Session, user_id: int, query: str):
+    from app.crud.crud_food import search_user_food_items
+    return search_user_food_items(db, user_id=user_id, query=query, limit=20)
+
+
+def time_search(engine, search, user_ids: list[int], terms: list[str], repeat: int,
+                seq_scan: bool = False) -> dict:
+    latencies: dict[str, list[float]] = {}
+    found: dict[str, int] = {}
+    with Session(engine) as db:
+        if seq_scan:
+            # Before the migration nothing indexed user_id, and the btree on name
+            # can't serve ILIKE '%q%'; hide the new indexes to get that plan back
+            db.execute(text("SET LOCAL enable_indexscan = off"))
+            db.execute(text("SET LOCAL enable_bitmapscan = off"))
+        for term in terms:
+            for i in range(repeat):
+                user_id = user_ids[i % len(user_ids)]
+                started = time.perf_counter()
+                results = search(db, user_id, term)
+                latencies.setdefault(term, []).append(time.perf_counter() - started)
+                found[term] = len(results)
+                db.expunge_all()
+    return {"latencies": latencies, "found": found}
+
+
+def report(title: str, result: dict):
+    print(f"\n{title}")
+    print(f"  {'term':<16} {'found':>7} {'p50 ms':>9} {'p99 ms':>9}")
+    everything = []
+    for term, values in result["latencies"].items():
+        everything.extend(values)
+        print(f"  {term:<16} {result['found'][term]:>7} "
+              f"{statistics.median(values) * 1000:>9.2f} {percentile(values, 99) * 1000:>9.2f}")
+    print(f"  {'all':<16} {'':>7} {statistics.median(everything) * 1000:>9.2f} "
+          f"{percentile(everything, 99) * 1000:>9.2f}")
+
+
+def explain(engine, user_id: int, term: str):
+    """EXPLAIN ANALYZE each statement search_user_food_items runs for `term`."""
+    from app.crud.crud_food import search_user_food_items
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    with Session(engine) as db:
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            search_user_food_items(db, user_id=user_id, query=term, limit=20)
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+        for statement, parameters in statements:
+            if not statement.lstrip().upper().startswith("SELECT FOOD_ITEMS"):
+                continue
+            plan = db.connection().exec_driver_sql(
+                "EXPLAIN (ANALYZE, COSTS OFF, TIMING OFF, BUFFERS OFF) " + statement, parameters
+            ).scalars()
+            print(f"\nplan for '{term}':")
+            for line in plan:
+                print("  " + line)
+
+
+def main(args) -> int:
+    engine = create_engine(args.url)
+    if engine.dialect.name != "postgresql":
+        print("this benchmark needs Postgres (the trigram path is Postgres-only)")
+        return 1
+    user_ids = load(engine, args.rows, args.users)
+
+    terms = TERMS + TYPO_TERMS
+    legacy = time_search(engine, legacy_search, user_ids, terms, args.repeat, seq_scan=True)
+    trigram = time_search(engine, trigram_search, user_ids, terms, args.repeat)
+    report(f"ILIKE '%q%' seq scan (old), {args.rows} rows / {args.users} users, all matches returned", legacy)
+    report("pg_trgm search_by_name (new), top 20", trigram)
+    explain(engine, user_ids[0], TERMS[0])
+    explain(engine, user_ids[0], TYPO_TERMS[0])
+
+    typo_misses = [t for t in TYPO_TERMS if trigram["found"][t] == 0]
+    print(f"\ntypo terms found by the old query: "
+          f"{sum(1 for t in TYPO_TERMS if legacy['found'][t])}/{len(TYPO_TERMS)}, "
+          f"by the new one: {len(TYPO_TERMS) - len(typo_misses)}/{len(TYPO_TERMS)}")
+
+    if args.cleanup:
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM food_items WHERE user_id = ANY(:ids)"), {"ids": user_ids})
+            conn.execute(text("DELETE FROM users WHERE id = ANY(:ids)"), {"ids": user_ids})
+        print("benchmark rows deleted")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", required=True, help="SQLAlchemy URL of a migrated Postgres database")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1000,
+                        help="food_items are spread evenly; fewer users means larger libraries to search")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per search term")
+    parser.add_argument("--cleanup", action="store_true")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,84 @@
+"""
+Login burst benchmark.
+
+Drives background traffic on meal-log and workout routes, first alone and then
+alongside a burst of concurrent logins, and reports logins/sec plus the p99 of
+the unrelated routes in both phases. With bcrypt on the hashing pool the
+background p99 should barely move during the burst.
+
+    python -m benchmarks.bench_login_burst --email a@b.com --password secret
+"""
+import argparse
+import asyncio
+from datetime import date, timedelta
+
+import httpx
+
+from benchmarks.loadgen import LatencyRecorder, drive, login, print_report
+
+
+def background_routes(token: str):
+    headers = {"Authorization": f"Bearer {token}"}
+    today = date.today()
+    month_ago = today - timedelta(days=30)
+    return {
+        "GET /nutrition/meals/by-date": lambda c: c.get(
+            "/api/v1/nutrition/meals/by-date", params={"log_date": today.isoformat()}, headers=headers
+        ),
+        "GET /workouts/logs": lambda c: c.get(
+            "/api/v1/workouts/logs",
+            params={"start_date": month_ago.isoformat(), "end_date": today.isoformat()},
+            headers=headers,
+        ),
+    }
+
+
+async def run_phase(client, token, args, with_burst: bool) -> LatencyRecorder:
+    recorder = LatencyRecorder()
+    tasks = [
+        drive(client, route, factory, recorder, args.background_concurrency, args.duration)
+        for route, factory in background_routes(token).items()
+    ]
+    if with_burst:
+        form = {"username": args.email, "password": args.password}
+        tasks.append(
+            drive(
+                client,
+                "POST /login/token",
+                lambda c: c.post("/api/v1/login/token", data=form),
+                recorder,
+                args.burst_concurrency,
+                args.duration,
+            )
+        )
+    await asyncio.gather(*tasks)
+    recorder.stop()
+    return recorder
+
+
+async def main(args):
+    limits = httpx.Limits(max_connections=args.burst_concurrency + 2 * args.background_concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        token = await login(client, args.email, args.password)
+        baseline = (await run_phase(client, token, args, with_burst=False)).report()
+        burst = (await run_phase(client, token, args, with_burst=True)).report()
+
+    print_report("background only", baseline)
+    print_report("background + login burst", burst)
+    logins = burst.get("POST /login/token")
+    if logins:
+        print(f"\nlogins/sec: {logins['statuses'].get(200, 0) / args.duration:.1f}  "
+              f"(503s: {logins['statuses'].get(503, 0)})")
+    for route in baseline:
+        print(f"{route}: p99 {baseline[route]['p99_ms']}ms -> {burst[route]['p99_ms']}ms during burst")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--burst-concurrency", type=int, default=32)
+    parser.add_argument("--background-concurrency", type=int, default=8)
+    asyncio.run(main(parser.parse_args()))
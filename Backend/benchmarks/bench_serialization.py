@@ -0,0 +1,241 @@
+"""
+Micro-benchmarks for the meal-log and workout serialization hot paths.
+
+Times the JSON and Pydantic work a request does around the database, through
+the app's own code: request body validation, the JSON written by the workout
+CRUD, and building the response body. The *.passthrough cases are what the
+routes do now (json_response, splicing in the stored workout JSON); the
+*.response_model ones are the path they replaced: json.loads the stored
+JSON, then FastAPI's response_model validation + serialization (taken from
+the real routes). Meal logs go from 1 to 500 items, workout logs from 1 to
+50 exercises of up to 10 sets. The meal.contents_* and meal.ai_items* pairs
+compare Pydantic's v1-style calls (parse_raw, .json(), json.loads + one
+model per item) with the native ones (model_validate_json, model_dump_json,
+a TypeAdapter). No database or running API needed.
+
+Each result is the per-call time: the best and the median of --rounds rounds,
+each long enough to take --min-time seconds. --save stores them as the
+baseline; later runs are compared against it and any case whose best time got
+more than --threshold slower is flagged (exit status 1). The best is compared,
+not the median, because it is the least disturbed by whatever else the
+machine is doing.
+
+    python -m benchmarks.bench_serialization --save
+    python -m benchmarks.bench_serialization --filter workout
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import uuid
+import warnings
+from datetime import date
+from pathlib import Path
+from types import SimpleNamespace
+
+# The routes are imported for their response models; nothing calls Gemini
+os.environ.setdefault("NUTRITION_AI_STUB", "true")
+
+import fastapi
+import pydantic
+
+from app.api.v1.endpoints import nutrition, workout
+from app.core.json_response import json_response
+from app.crud import crud_workout
+from app.schemas.meal import LoggedFoodItem, LoggedFoodItems, MealLogContents, UserMealLogCreate
+from app.schemas.workout import PlanExercise, WorkoutLogCreate
+
+MEAL_SIZES = [1, 10, 50, 200, 500]
+# (exercises, sets per exercise)
+WORKOUT_SIZES = [(1, 1), (5, 3), (10, 4), (25, 5), (50, 10)]
+# Logs per GET /workouts/logs page in the page case (a month of training)
+PAGE_LOGS = 30
+DEFAULT_BASELINE = Path(__file__).parent / ".results" / "serialization.json"
+
+
+class NoDatabase:
+    """Just enough of a Session for the CRUD create functions to build their row."""
+
+    def add(self, obj):
+        pass
+
+    def commit(self):
+        pass
+
+
+def response_field(router, path: str, method: str):
+    route = next(r for r in router.routes if r.path == path and method in r.methods)
+    return route.response_field
+
+
+def respond(field, content) -> bytes:
+    """What FastAPI does with an endpoint's return value (fastapi.routing.serialize_response)."""
+    value, errors = field.validate(content, {}, loc=("response",))
+    assert not errors, errors
+    return field.serialize_json(value, by_alias=True)
+
+
+def loaded(document: dict, stored: str) -> dict:
+    """A workout document as the routes built it before passthrough: the stored JSON parsed."""
+    return {**document, "exercises": json.loads(stored)}
+
+
+def meal_cases(size: int) -> dict:
+    items = [
+        {"log_item_id": str(uuid.uuid4()), "name": f"Food item {n}", "quantity_g": 100.0 + n,
+         "calories": 250.5, "protein": 12.25, "carbs": 30.0, "fat": 8.75}
+        for n in range(size)
+    ]
+    body = json.dumps({"items_to_log": items})
+    log = SimpleNamespace(id=1, date=date(2024, 5, 1), user_id=1, items=[SimpleNamespace(**item) for item in items])
+    by_date = response_field(nutrition.router, "/meals/by-date", "GET")
+    contents = MealLogContents(items=[LoggedFoodItem(**item) for item in items])
+    blob = contents.model_dump_json()
+    # What the AI answers: items without ids, so each gets a new one
+    ai_text = json.dumps([{key: value for key, value in item.items() if key != "log_item_id"} for item in items])
+    response = nutrition.parse_log_response(log)
+    return {
+        # FastAPI: json.loads the body, then validate it against the parameter's model
+        "meal.request_body": lambda: UserMealLogCreate.model_validate(json.loads(body)),
+        "meal.parse_log_response": lambda: nutrition.parse_log_response(log),
+        "meal.response_model": lambda: respond(by_date, response),
+        "meal.passthrough": lambda: json_response(nutrition.parse_log_response(log)).body,
+        # The v1-style blob round trip the meal log used (and meal plans still would)
+        "meal.contents_parse_raw": lambda: MealLogContents.parse_raw(blob),
+        "meal.contents_json": lambda: contents.json(),
+        "meal.contents_validate_json": lambda: MealLogContents.model_validate_json(blob),
+        "meal.contents_dump_json": lambda: contents.model_dump_json(),
+        # nutrition_ai's parsing, before and after
+        "meal.ai_items_v1": lambda: [LoggedFoodItem(**item) for item in json.loads(ai_text)],
+        "meal.ai_items": lambda: LoggedFoodItems.validate_json(ai_text),
+    }
+
+
+def workout_cases(exercises: int, sets: int) -> dict:
+    logged = [
+        {"log_exercise_id": str(uuid.uuid4()), "exercise_id": n + 1, "exercise_name": f"Exercise {n}",
+         "sets": [{"reps": 8 + s % 5, "weight": 22.5 + s * 2.5} for s in range(sets)]}
+        for n in range(exercises)
+    ]
+    planned = [{"exercise_id": n + 1, "name": f"Exercise {n}", "sets": sets, "reps": "8-10"} for n in range(exercises)]
+    body = json.dumps({"date": "2024-05-01", "notes": "Felt strong", "exercises": logged})
+    log_in = WorkoutLogCreate.model_validate(json.loads(body))
+    db_log = SimpleNamespace(id=1, date=date(2024, 5, 1), user_id=1, notes="Felt strong",
+                             log_details_json=json.dumps(logged))
+    db_plan = SimpleNamespace(id=1, name="Push Day", user_id=1, goal_type="hypertrophy",
+                              plan_details_json=json.dumps(planned))
+    logs_field = response_field(workout.router, "/logs", "GET")
+    plan_field = response_field(workout.router, "/plans/{plan_id}", "GET")
+    log_document = lambda: loaded(workout.parse_log_response(db_log), db_log.log_details_json)
+    plan_document = lambda: loaded(workout.parse_plan_response(db_plan), db_plan.plan_details_json)
+    page = [log_document() for _ in range(PAGE_LOGS)]
+    plan = plan_document()
+    return {
+        "workout.request_body": lambda: WorkoutLogCreate.model_validate(json.loads(body)),
+        # Builds the row, including the log_details_json it stores
+        "workout.create_log": lambda: crud_workout.create_workout_log(NoDatabase(), user_id=1, log_in=log_in),
+        "workout.parse_log_response": log_document,
+        f"workout.logs_page_x{PAGE_LOGS}": lambda: respond(
+            logs_field, [log_document() for _ in range(PAGE_LOGS)]),
+        f"workout.response_model_x{PAGE_LOGS}": lambda: respond(logs_field, page),
+        f"workout.passthrough_x{PAGE_LOGS}": lambda: json_response(
+            [workout.parse_log_response(db_log) for _ in range(PAGE_LOGS)]).body,
+        "plan.parse_plan_response": plan_document,
+        "plan.response_model": lambda: respond(plan_field, plan),
+        "plan.passthrough": lambda: json_response(workout.parse_plan_response(db_plan)).body,
+        "plan.request_exercises": lambda: [PlanExercise.model_validate(exercise) for exercise in planned],
+    }
+
+
+def all_cases():
+    for size in MEAL_SIZES:
+        for name, run in meal_cases(size).items():
+            yield name, f"{size} items", run
+    for exercises, sets in WORKOUT_SIZES:
+        for name, run in workout_cases(exercises, sets).items():
+            yield name, f"{exercises}x{sets} sets", run
+
+
+def measure(run, rounds: int, min_time: float) -> dict:
+    # One untimed call first (lazy imports, mapper configuration), then, like
+    # timeit's autorange, the loop count that makes one round last min_time
+    run()
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            run()
+        if time.perf_counter() - started >= min_time:
+            break
+        loops *= 2
+    per_call = []
+    # As timeit does: no garbage collection in the middle of a timed round
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            started = time.perf_counter()
+            for _ in range(loops):
+                run()
+            per_call.append((time.perf_counter() - started) / loops * 1e6)
+    finally:
+        gc.enable()
+    return {"loops": loops, "min_us": round(min(per_call), 2), "median_us": round(statistics.median(per_call), 2)}
+
+
+def environment() -> dict:
+    return {"python": platform.python_version(), "pydantic": pydantic.VERSION, "fastapi": fastapi.__version__,
+            "machine": platform.machine(), "node": platform.node()}
+
+
+def main(args) -> int:
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else None
+    if baseline and baseline["environment"] != environment():
+        print(f"note: the baseline was recorded on {baseline['environment']}")
+    previous = baseline["results"] if baseline else {}
+
+    results, regressions = {}, []
+    print(f"{'case':<32} {'size':<14} {'loops':>7} {'min us':>10} {'median us':>10} {'base min':>10} {'change':>8}")
+    # The v1-style calls warn on every use
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        for name, size, run in all_cases():
+            key = f"{name}[{size}]"
+            if args.filter and args.filter not in key:
+                continue
+            result = results[key] = measure(run, args.rounds, args.min_time)
+            line = f"{name:<32} {size:<14} {result['loops']:>7} {result['min_us']:>10} {result['median_us']:>10}"
+            if key in previous:
+                change = result["min_us"] / previous[key]["min_us"] - 1
+                flag = "  REGRESSION" if change > args.threshold else ""
+                if flag:
+                    regressions.append(key)
+                line += f" {previous[key]['min_us']:>10} {change:>+8.0%}{flag}"
+            print(line, flush=True)
+
+    if args.save:
+        # Cases left out by --filter keep their old baseline
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(
+            {"environment": environment(), "results": {**previous, **results}}, indent=2, sort_keys=True) + "\n")
+        print(f"\nsaved {len(results)} results to {args.baseline}")
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.05, help="seconds per round")
+    parser.add_argument("--filter", help="only cases whose name[size] contains this")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="flag cases whose best time is more than this fraction slower than the baseline")
+    sys.exit(main(parser.parse_args()))
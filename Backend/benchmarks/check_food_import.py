@@ -0,0 +1,152 @@
+"""
+Memory and throughput check for POST /nutrition/foods/import.
+
+Streams a generated CSV or NDJSON body (default 100k rows, with a few invalid
+rows mixed in) through the app in-process, then checks that every valid row
+was imported, that each invalid one was reported by row number, and that the
+peak memory traced while importing stays far below the size of the upload.
+Two broken uploads are checked the same way:
+
+- a JSON array of as many rows whose second element is malformed: it's
+  reported as an invalid row and the rest are still imported;
+- NDJSON ending in one line far longer than MAX_ROW_SIZE, with no newline:
+  the rows before it are imported and the import stops there.
+
+Runs against DATABASE_URL, which must be migrated; the benchmark user and its
+foods are deleted afterwards.
+
+    python -m benchmarks.check_food_import --rows 100000 --format csv
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+import tracemalloc
+import uuid
+from typing import Optional
+
+import httpx
+
+from app.db.models.models import FoodItem, User
+from app.db.session import SessionLocal
+from app.main import app
+
+# Every INVALID_EVERY-th row has a non-numeric calorie value
+INVALID_EVERY = 9973
+CONTENT_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson", "json": "application/json"}
+MALFORMED_ROW = 2
+MALFORMED_ELEMENT = '{"name": "Broken Food", "calories_per_100g": }'
+# Rows before the overlong line, and that line's length
+OVERSIZED_AFTER = 10
+OVERSIZED_LINE_MB = 16
+FIELDS = ("name", "calories_per_100g", "protein_per_100g", "carbs_per_100g", "fat_per_100g")
+
+
+def generate_body(rows: int, format: str, malformed_row: Optional[int] = None, chunk_rows: int = 500):
+    """The upload, a few hundred rows per chunk, never built in full."""
+    separator = ",\n" if format == "json" else "\n"
+    if format == "csv":
+        yield (",".join(FIELDS) + "\n").encode()
+    elif format == "json":
+        yield b"["
+    lines = []
+    for n in range(1, rows + 1):
+        calories = "lots" if n % INVALID_EVERY == 0 else str(50 + n % 400)
+        values = (f"Imported Food {n}", calories, "10.5", "20", "3.25")
+        if n == malformed_row:
+            lines.append(MALFORMED_ELEMENT)
+        elif format == "csv":
+            lines.append(",".join(values))
+        else:
+            lines.append(json.dumps(dict(zip(FIELDS, values))))
+        if len(lines) == chunk_rows or n == rows:
+            yield (separator.join(lines) + ("]" if format == "json" and n == rows else separator)).encode()
+            lines = []
+
+
+def generate_oversized_body(chunk_size: int = 1 << 16):
+    """OVERSIZED_AFTER good NDJSON rows, then one line of OVERSIZED_LINE_MB that never ends."""
+    yield from generate_body(OVERSIZED_AFTER, "ndjson")
+    yield b'{"name": "'
+    for _ in range(OVERSIZED_LINE_MB * (1 << 20) // chunk_size):
+        yield b"x" * chunk_size
+
+
+async def stream(body):
+    for chunk in body:
+        yield chunk
+
+
+async def main(args) -> int:
+    expected_invalid = [n * INVALID_EVERY for n in range(1, args.rows // INVALID_EVERY + 1)]
+    # (name, format, body, rows expected to be imported, rows expected to be reported)
+    cases = [
+        (f"{args.rows} rows", args.format, lambda: generate_body(args.rows, args.format),
+         args.rows - len(expected_invalid), expected_invalid),
+        ("JSON array with a malformed element", "json",
+         lambda: generate_body(args.rows, "json", malformed_row=MALFORMED_ROW),
+         args.rows - len(expected_invalid) - 1, sorted(expected_invalid + [MALFORMED_ROW])),
+        (f"NDJSON with a {OVERSIZED_LINE_MB} MB line", "ndjson", generate_oversized_body,
+         OVERSIZED_AFTER, [OVERSIZED_AFTER + 1]),
+    ]
+
+    # httpx's ASGI transport hands the body to the app chunk by chunk, as a server
+    # would (Starlette's TestClient reads it all first, which would skew the peak)
+    transport = httpx.ASGITransport(app=app)
+    client = httpx.AsyncClient(transport=transport, base_url="http://check", timeout=None)
+    email = f"food-import-{uuid.uuid4().hex[:8]}@example.com"
+    (await client.post("/api/v1/users/", json={"email": email, "password": "import-check"})).raise_for_status()
+    token = (await client.post("/api/v1/login/token", data={"username": email, "password": "import-check"})).json()
+    with SessionLocal() as db:
+        user_id = db.query(User.id).filter(User.email == email).scalar()
+
+    failures = []
+    try:
+        for name, format, body, expected_imported, expected_errors in cases:
+            body_size = sum(len(chunk) for chunk in body())
+            headers = {"Authorization": f"Bearer {token['access_token']}", "Content-Type": CONTENT_TYPES[format]}
+            tracemalloc.start()
+            started = time.perf_counter()
+            response = await client.post("/api/v1/nutrition/foods/import", content=stream(body()), headers=headers)
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            response.raise_for_status()
+            result = response.json()
+            with SessionLocal() as db:
+                stored = db.query(FoodItem).filter(FoodItem.user_id == user_id).delete()
+                db.commit()
+
+            print(f"{name} ({body_size / 1e6:.1f} MB {format}) in {elapsed:.2f}s "
+                  f"({result['read'] / elapsed:,.0f} rows/s, tracemalloc on)")
+            print(f"  imported {result['imported']}, invalid {result['invalid']}, stored {stored}, "
+                  f"peak traced memory {peak / 1e6:.1f} MB")
+            if result["imported"] != expected_imported or stored != result["imported"]:
+                failures.append(f"{name}: expected {expected_imported} imported rows")
+            reported = [error["row"] for error in result["errors"]]
+            if reported != expected_errors:
+                failures.append(f"{name}: unexpected error rows: {reported[:10]}")
+            if peak > args.max_peak_mb * 1e6:
+                failures.append(f"{name}: peak memory above {args.max_peak_mb} MB")
+    finally:
+        await client.aclose()
+        with SessionLocal() as db:
+            db.query(FoodItem).filter(FoodItem.user_id == user_id).delete()
+            db.query(User).filter(User.id == user_id).delete()
+            db.commit()
+
+    for failure in failures:
+        print("FAIL: " + failure)
+    if not failures:
+        print("OK")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000, help="at most FOOD_IMPORT_MAX_ROWS")
+    parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    parser.add_argument("--max-peak-mb", type=float, default=8.0,
+                        help="fail if the import's peak traced memory exceeds this")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,71 @@
+"""
+Concurrency check for POST /nutrition/meals/log.
+
+Fires many appends for the same (fresh) day in parallel, then reads the day
+back and checks that every item landed and that they all share one log row.
+Before the (user_id, date) upsert, concurrent first-of-day appends could
+create duplicate logs and lose items.
+
+    python -m benchmarks.check_meal_log_concurrency --email a@b.com --password secret
+"""
+import argparse
+import asyncio
+import sys
+import uuid
+from datetime import date, timedelta
+
+import httpx
+
+from benchmarks.loadgen import login
+
+
+async def main(args) -> int:
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        token = await login(client, args.email, args.password)
+        headers = {"Authorization": f"Bearer {token}"}
+        # A random far-future day, so every run starts without a log row
+        log_date = (date(2100, 1, 1) + timedelta(days=uuid.uuid4().int % 36500)).isoformat()
+        expected = set()
+
+        async def append(n: int):
+            items = []
+            for i in range(args.items_per_request):
+                log_item_id = f"concurrency-{n}-{i}-{uuid.uuid4()}"
+                expected.add(log_item_id)
+                items.append({"log_item_id": log_item_id, "name": "probe", "quantity_g": 1,
+                              "calories": 1, "protein": 0, "carbs": 0, "fat": 0})
+            response = await client.post(
+                "/api/v1/nutrition/meals/log", params={"log_date": log_date},
+                json={"items_to_log": items}, headers=headers,
+            )
+            return response.status_code, response.json().get("id")
+
+        results = await asyncio.gather(*(append(n) for n in range(args.requests)))
+        statuses = {status for status, _ in results}
+        log_ids = {log_id for _, log_id in results}
+
+        response = await client.get(
+            "/api/v1/nutrition/meals/by-date", params={"log_date": log_date}, headers=headers
+        )
+        stored = {item["log_item_id"] for item in response.json()["food_items"]["items"]}
+
+    missing = expected - stored
+    print(f"{args.requests} parallel appends to {log_date}: statuses {sorted(statuses)}, "
+          f"log ids returned {sorted(log_ids)}, items expected {len(expected)}, stored {len(stored)}")
+    if statuses != {200} or len(log_ids) != 1 or missing:
+        print(f"FAIL: {len(missing)} items lost")
+        return 1
+    print("OK: one log row, no items lost")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--items-per-request", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=50)
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,170 @@
+"""
+Per-route SQL query budgets.
+
+Calls every /api/v1 route in-process with QUERY_BUDGET_MODE=raise, each
+request from a cold start: the principal cache and exercise catalog are
+emptied first, so the count includes loading them. The GETs with ETags are
+called again with If-None-Match, current (a 304) and stale (a 200). Reports how many
+statements each route ran against its budget in
+app.core.query_budget.ROUTE_BUDGETS, and fails (exit status 1) when a route
+goes over, lazy-loads a relationship, has no budget, or isn't called here.
+Runs against DATABASE_URL, which must be migrated; the check user and its
+data are deleted afterwards. The Gemini stub (NUTRITION_AI_STUB) stands in
+for the AI route.
+
+    python -m benchmarks.check_query_budgets
+"""
+import argparse
+import os
+import re
+import sys
+from datetime import date
+
+# Before the app (and its settings) are imported
+os.environ["QUERY_BUDGET_MODE"] = "raise"
+os.environ["REQUEST_TIMING_ENABLED"] = "true"
+# Each response's query count is read from its Server-Timing header
+os.environ["SERVER_TIMING_HEADER"] = "true"
+os.environ.setdefault("NUTRITION_AI_STUB", "true")
+
+from fastapi.testclient import TestClient
+
+from app.core import principal_cache
+from app.core.query_budget import ROUTE_BUDGETS, QueryBudgetExceeded
+from app.db.session import SessionLocal
+from app.main import app
+from app.services import exercise_catalog
+from benchmarks.generate_data import cleanup, email_for
+
+EMAIL_PREFIX = "budget-check"
+PASSWORD = "budget-check-password"
+DAY = date(2024, 5, 1).isoformat()
+FOOD = {"name": "Oats", "quantity_g": 80, "calories": 311.2, "protein": 10.5, "carbs": 52.9, "fat": 5.5}
+
+
+def queries(response) -> int:
+    match = re.search(r'desc="(\d+) quer', response.headers.get("server-timing", ""))
+    return int(match.group(1)) if match else 0
+
+
+class Checker:
+    def __init__(self, client: TestClient):
+        self.client = client
+        self.headers: dict = {}
+        self.results: dict[str, list] = {}
+        self.failures: list[str] = []
+
+    def call(self, method: str, template: str, path: str = None, expect: int = 200, **kwargs):
+        """One request from a cold start; `template` is the route it should match."""
+        principal_cache.clear()
+        exercise_catalog.invalidate()
+        key = f"{method} /api/v1{template}"
+        budget = ROUTE_BUDGETS.get(key, "none")
+        kwargs.setdefault("headers", self.headers)
+        try:
+            response = self.client.request(method, "/api/v1" + (path or template), **kwargs)
+        except QueryBudgetExceeded as e:
+            self.results.setdefault(key, []).append(("-", budget, str(e)))
+            self.failures.append(f"{key}: {e}")
+            return None
+        note = "" if response.status_code == expect else f"status {response.status_code}: {response.text[:200]}"
+        self.results.setdefault(key, []).append((queries(response), budget, note))
+        if note:
+            self.failures.append(f"{key}: {note}")
+        if key not in ROUTE_BUDGETS:
+            self.failures.append(f"{key}: no budget in ROUTE_BUDGETS")
+        return response
+
+    def revalidate(self, template: str, response, path: str = None, **kwargs):
+        """GET `template` again with the ETag `response` came with, then with a stale one."""
+        if response is None:
+            return
+        self.call("GET", template, path, expect=304,
+                  headers={**self.headers, "If-None-Match": response.headers["etag"]}, **kwargs)
+        self.call("GET", template, path, headers={**self.headers, "If-None-Match": 'W/"stale"'}, **kwargs)
+
+    def run(self, email: str):
+        self.call("POST", "/users/", json={"email": email, "password": PASSWORD, "full_name": "Budget Check"})
+        tokens = self.call("POST", "/login/token", data={"username": email, "password": PASSWORD}).json()
+        rotated = self.call("POST", "/login/refresh", json={"refresh_token": tokens["refresh_token"]}).json()
+        # Replaying a spent refresh token revokes the whole login
+        self.call("POST", "/login/refresh", json={"refresh_token": tokens["refresh_token"]}, expect=401)
+        tokens = self.call("POST", "/login/token", data={"username": email, "password": PASSWORD}).json()
+        self.headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+        self.revalidate("/users/me", self.call("GET", "/users/me"))
+
+        self.call("POST", "/profile/", json={"age": 30, "height": 180, "weight": 80})
+        self.call("GET", "/profile/me")
+        self.call("PUT", "/profile/me", json={"age": 31, "height": 180, "weight": 79})
+
+        self.call("POST", "/nutrition/foods", json={"name": "Rolled oats", "calories_per_100g": 389,
+                                                    "protein_per_100g": 13, "carbs_per_100g": 66, "fat_per_100g": 7})
+        self.call("GET", "/nutrition/foods/search", params={"query": "oats"})
+        self.call("GET", "/nutrition/foods/search", params={"query": "oast"})
+        self.call("POST", "/nutrition/foods/import", headers={**self.headers, "Content-Type": "text/csv"},
+                  content="name,calories_per_100g,protein_per_100g,carbs_per_100g,fat_per_100g\nRice,130,2.7,28,0.3\n")
+
+        # Creates the day's log, then adds to it
+        log = self.call("POST", "/nutrition/meals/log", params={"log_date": DAY}, json={"items_to_log": [FOOD]})
+        log = self.call("POST", "/nutrition/meals/log", params={"log_date": DAY}, json={"items_to_log": [FOOD]})
+        self.revalidate("/nutrition/meals/by-date", self.call("GET", "/nutrition/meals/by-date", params={"log_date": DAY}),
+                        params={"log_date": DAY})
+        items = log.json()["food_items"]["items"] if log else []
+        if len(items) == 2:
+            self.call("PUT", "/nutrition/meals/log-item/{log_item_id}", f"/nutrition/meals/log-item/{items[0]['log_item_id']}",
+                      params={"log_date": DAY}, json={**items[0], "quantity_g": 120})
+            self.call("DELETE", "/nutrition/meals/log-item", json={"date": DAY, "log_item_id": items[1]["log_item_id"]})
+        self.call("POST", "/nutrition/nutrition/analyze", json={"query": "two eggs and toast"})
+
+        exercises = self.call("GET", "/workouts/exercises").json()
+        self.call("GET", "/workouts/exercises/search", params={"query": "press"})
+        chosen = exercises[:3]
+        plan = self.call("POST", "/workouts/plans", json={"name": "Push Day", "goal_type": "hypertrophy", "exercises": [
+            {"exercise_id": e["id"], "name": e["name"], "sets": 3, "reps": "8-10"} for e in chosen]})
+        self.revalidate("/workouts/plans", self.call("GET", "/workouts/plans"))
+        if plan:
+            path = f"/workouts/plans/{plan.json()['id']}"
+            self.revalidate("/workouts/plans/{plan_id}", self.call("GET", "/workouts/plans/{plan_id}", path), path)
+            self.call("DELETE", "/workouts/plans/{plan_id}", f"/workouts/plans/{plan.json()['id']}", expect=204)
+        workout_log = self.call("POST", "/workouts/logs", json={"date": DAY, "exercises": [
+            {"exercise_id": e["id"], "exercise_name": e["name"], "sets": [{"reps": 8, "weight": 60}]} for e in chosen]})
+        self.call("GET", "/workouts/logs", params={"start_date": DAY, "end_date": DAY})
+        if workout_log:
+            self.call("DELETE", "/workouts/logs/{log_id}", f"/workouts/logs/{workout_log.json()['id']}", expect=204)
+
+        self.call("POST", "/login/logout", json={"refresh_token": rotated["refresh_token"]}, expect=204)
+
+
+def api_routes() -> set[str]:
+    return {f"{method.upper()} {path}" for path, operations in app.openapi()["paths"].items()
+            if path.startswith("/api/v1/") for method in operations}
+
+
+def main(args) -> int:
+    email = email_for(EMAIL_PREFIX, os.getpid())
+    # raise_server_exceptions: a QueryBudgetExceeded reaches call() instead of becoming a 500
+    with TestClient(app, raise_server_exceptions=True) as client:
+        checker = Checker(client)
+        try:
+            checker.run(email)
+        finally:
+            with SessionLocal() as db:
+                cleanup(db, EMAIL_PREFIX)
+
+    print(f"{'route':<56} {'queries':>8} {'budget':>7}")
+    for key, calls in sorted(checker.results.items(), key=lambda item: item[0].split(" ", 1)[::-1]):
+        for count, budget, note in calls:
+            budget = "-" if budget is None else budget
+            print(f"{key:<56} {count:>8} {budget:>7}  {note}".rstrip())
+    for key in sorted((set(ROUTE_BUDGETS) | api_routes()) - set(checker.results)):
+        checker.failures.append(f"{key}: not called by this check")
+    if checker.failures:
+        print(f"\n{len(checker.failures)} problem(s):\n  " + "\n  ".join(checker.failures))
+        return 1
+    print(f"\nall {len(checker.results)} routes within budget, no lazy loads")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sys.exit(main(parser.parse_args()))
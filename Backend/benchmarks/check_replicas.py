@@ -0,0 +1,121 @@
+"""
+Read-replica routing (app.db.session.RoutingSession) with two SQLite files.
+
+Creates a primary and two replica databases in a temporary directory.
+Replication is simulated by copying the primary over a replica with sqlite3's
+backup API, so a replica lags until it is copied to. Through the API
+(in-process) and the session, it checks that:
+
+- a user's GET right after their own write reads the primary
+  (read-your-writes), and a GET once READ_YOUR_WRITES_SECONDS has passed
+  reads a lagging replica;
+- every read in a session goes to the replica the session started on;
+- a GET whose replica can't be opened is retried on the primary (still a 200),
+  and that replica is taken out of rotation.
+
+Exits with status 1 on any failure. Doesn't touch DATABASE_URL.
+
+    python -m benchmarks.check_replicas
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+DIRECTORY = tempfile.mkdtemp(prefix="lifehub-replicas-")
+PRIMARY = os.path.join(DIRECTORY, "primary.db")
+REPLICAS = [os.path.join(DIRECTORY, f"replica-{name}.db") for name in "ab"]
+READ_YOUR_WRITES_SECONDS = 1.0
+
+# Before the app (and its settings) are imported
+os.environ["DATABASE_URL"] = f"sqlite:///{PRIMARY}"
+os.environ["DATABASE_REPLICA_URLS"] = json.dumps([f"sqlite:///{path}" for path in REPLICAS])
+os.environ["READ_YOUR_WRITES_SECONDS"] = str(READ_YOUR_WRITES_SECONDS)
+os.environ["DB_ASYNC"] = "false"
+os.environ.setdefault("NUTRITION_AI_STUB", "true")
+
+from fastapi.testclient import TestClient
+
+from app.db.base_class import Base
+from app.db.models.models import WorkoutPlan
+from app.db.session import SessionLocal, engine, replicas
+from app.main import app
+
+PASSWORD = "replica-check-password"
+
+
+def replicate(path: str):
+    """Bring the replica at `path` up to date with the primary."""
+    with sqlite3.connect(PRIMARY) as source, sqlite3.connect(path) as target:
+        source.backup(target)
+
+
+def main(args) -> int:
+    failures = []
+
+    def check(name: str, ok: bool, detail=""):
+        print(f"{'ok  ' if ok else 'FAIL'} {name}" + (f": {detail}" if not ok and detail else ""))
+        if not ok:
+            failures.append(name)
+
+    Base.metadata.create_all(engine)
+    for path in REPLICAS:
+        replicate(path)
+
+    client = TestClient(app)
+    email = "replica-check@example.com"
+    client.post("/api/v1/users/", json={"email": email, "password": PASSWORD}).raise_for_status()
+    tokens = client.post("/api/v1/login/token", data={"username": email, "password": PASSWORD}).json()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    def plan_names():
+        response = client.get("/api/v1/workouts/plans", headers=headers)
+        return response.status_code, [plan["name"] for plan in response.json()]
+
+    # Read-your-writes, then the lagging replica
+    client.post("/api/v1/workouts/plans", headers=headers,
+                json={"name": "Push Day", "goal_type": "general", "exercises": []}).raise_for_status()
+    result = plan_names()
+    check("a GET right after the user's write reads the primary", result == (200, ["Push Day"]), result)
+    time.sleep(READ_YOUR_WRITES_SECONDS + 0.2)
+    result = plan_names()
+    check("a GET after READ_YOUR_WRITES_SECONDS reads a (lagging) replica", result == (200, []), result)
+
+    # One replica per session: A has caught up, B hasn't
+    replicate(REPLICAS[0])
+    seen = {}
+    for _ in range(4):
+        with SessionLocal() as db:
+            db.info["read_only"] = True
+            counts = {db.query(WorkoutPlan).count() for _ in range(args.reads)}
+            replica = db.info.get("replica")
+        seen.setdefault(replica, set()).update(counts)
+    expected = {replicas.engines[0]: {1}, replicas.engines[1]: {0}}
+    check(f"every session's {args.reads} reads went to the replica it started on", seen == expected,
+          {str(replica.url) if replica else None: counts for replica, counts in seen.items()})
+
+    # Both replicas fail: each request falls back to the primary
+    for replica_engine, path in zip(replicas.engines, REPLICAS):
+        replica_engine.dispose()
+        os.remove(path)
+        os.mkdir(path)
+    results = [plan_names() for _ in range(3)]
+    check("GETs whose replica fails are retried on the primary",
+          results == [(200, ["Push Day"])] * 3, results)
+    check("failed replicas are taken out of rotation", not any(replicas.health().values()), replicas.health())
+
+    print("OK" if not failures else f"{len(failures)} check(s) failed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reads", type=int, default=10, help="reads per session in the stickiness check")
+    try:
+        sys.exit(main(parser.parse_args()))
+    finally:
+        shutil.rmtree(DIRECTORY, ignore_errors=True)
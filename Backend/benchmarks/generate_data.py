@@ -0,0 +1,224 @@
+"""
+Synthetic data generator for load tests.
+
+Fills the database with N users, each with a profile, a personal food library,
+a few workout plans and M years of history: a meal log most days (breakfast,
+lunch, dinner and sometimes a snack, 4-8 items a day) and three to five
+workouts a week that follow the user's plans, with slowly rising weights.
+Everything is derived from --seed, so two runs produce the same data. Every
+user has the same password, for benchmarks.load_test to log in with.
+
+Rows go in with one multi-row INSERT per table and chunk of users, so a
+million meal items take minutes, not hours. Runs against DATABASE_URL, which
+must be migrated; exercises are seeded first if the table is empty.
+
+    python -m benchmarks.generate_data --users 200 --years 2
+    python -m benchmarks.generate_data --cleanup
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+
+from sqlalchemy import delete, func, insert, select
+
+from app.core.security import get_password_hash
+from app.db.models.models import (ActivityLevel, Exercise, FoodItem, MealLogItem, RefreshToken, User,
+                                  UserGoal, UserMealLog, UserProfile, WorkoutGoalType, WorkoutLog,
+                                  WorkoutPlan)
+from app.db.session import SessionLocal
+from app.seed_data import EXERCISE_DATA
+from app.services.exercise_import import import_exercises
+
+# name, kcal, protein, carbs, fat per 100g, and a typical portion range in grams
+FOODS = {
+    "breakfast": [
+        ("Oatmeal", 68, 2.4, 12, 1.4, (150, 300)), ("Scrambled Eggs", 149, 10, 1.6, 11, (100, 200)),
+        ("Greek Yogurt", 59, 10, 3.6, 0.4, (150, 250)), ("Banana", 89, 1.1, 23, 0.3, (100, 140)),
+        ("Whole Wheat Toast", 247, 13, 41, 3.4, (30, 80)), ("Peanut Butter", 588, 25, 20, 50, (15, 35)),
+        ("Blueberries", 57, 0.7, 14, 0.3, (50, 150)), ("Orange Juice", 45, 0.7, 10, 0.2, (200, 300)),
+    ],
+    "lunch": [
+        ("Grilled Chicken Breast", 165, 31, 0, 3.6, (120, 220)), ("Brown Rice", 112, 2.6, 24, 0.9, (150, 300)),
+        ("Caesar Salad", 190, 7, 8, 15, (150, 300)), ("Turkey Sandwich", 217, 13, 24, 7.5, (180, 280)),
+        ("Lentil Soup", 93, 6, 14, 1.5, (250, 400)), ("Tuna Salad", 187, 16, 9, 9, (120, 200)),
+        ("Quinoa", 120, 4.4, 21, 1.9, (150, 250)), ("Apple", 52, 0.3, 14, 0.2, (150, 200)),
+    ],
+    "dinner": [
+        ("Salmon Fillet", 208, 20, 0, 13, (120, 200)), ("Spaghetti Bolognese", 151, 8, 17, 5.5, (250, 450)),
+        ("Steamed Broccoli", 35, 2.4, 7, 0.4, (80, 200)), ("Beef Stir Fry", 160, 14, 8, 8, (250, 400)),
+        ("Sweet Potato", 86, 1.6, 20, 0.1, (150, 300)), ("Roast Chicken Thigh", 209, 26, 0, 11, (120, 220)),
+        ("Mixed Green Salad", 20, 1.5, 3.5, 0.2, (80, 150)), ("Tofu Curry", 130, 7, 9, 7.5, (250, 400)),
+    ],
+    "snack": [
+        ("Almonds", 579, 21, 22, 50, (20, 40)), ("Protein Bar", 350, 30, 40, 8, (45, 65)),
+        ("Dark Chocolate", 546, 4.9, 61, 31, (15, 40)), ("Cottage Cheese", 98, 11, 3.4, 4.3, (100, 200)),
+        ("Hummus with Carrots", 110, 4, 12, 5.5, (100, 180)), ("Protein Shake", 80, 16, 3, 1, (300, 400)),
+    ],
+}
+PLAN_NAMES = ["Push Day", "Pull Day", "Leg Day", "Full Body A", "Full Body B", "Upper Body", "Core & Cardio"]
+PLAN_REPS = {
+    WorkoutGoalType.strength: ["3-5", "5"], WorkoutGoalType.hypertrophy: ["8-10", "8-12", "10"],
+    WorkoutGoalType.endurance: ["15", "15-20"], WorkoutGoalType.general: ["10", "10-12", "12"],
+}
+
+
+def email_for(prefix: str, n: int) -> str:
+    return f"{prefix}-{n}@example.com"
+
+
+def user_rows(rng: random.Random, user_id: int, exercise_ids: dict[int, str], days: list[date], foods_per_user: int):
+    """All of one user's rows except the user itself, as {table: [row dicts]}."""
+    profile = {
+        "user_id": user_id, "age": rng.randint(18, 70), "height": round(rng.gauss(172, 9), 1),
+        "weight": round(rng.gauss(75, 13), 1), "goal": rng.choice(list(UserGoal)),
+        "activity_level": rng.choice(list(ActivityLevel)),
+    }
+    all_foods = [food for meal in FOODS.values() for food in meal]
+    library = [
+        {"user_id": user_id, "name": f"{name} ({brand})", "calories_per_100g": kcal,
+         "protein_per_100g": protein, "carbs_per_100g": carbs, "fat_per_100g": fat}
+        for brand in ("Homemade", "Store Brand", "Deli", "Organic", "Frozen", "Restaurant")
+        for name, kcal, protein, carbs, fat, _ in all_foods
+    ]
+    library = rng.sample(library, min(foods_per_user, len(library)))
+
+    goal_type = rng.choice(list(WorkoutGoalType))
+    plan_names = rng.sample(PLAN_NAMES, rng.randint(2, 4))
+    plans = []
+    for _ in plan_names:
+        chosen = rng.sample(list(exercise_ids), min(len(exercise_ids), rng.randint(4, 7)))
+        plans.append([{"exercise_id": exercise_id, "name": exercise_ids[exercise_id],
+                       "sets": rng.randint(3, 5), "reps": rng.choice(PLAN_REPS[goal_type])}
+                      for exercise_id in chosen])
+    plan_rows = [{"user_id": user_id, "name": name, "goal_type": goal_type, "plan_details_json": json.dumps(exercises)}
+                 for name, exercises in zip(plan_names, plans)]
+
+    meal_logs, meal_items, workout_logs = [], [], []
+    # Working weight per exercise, creeping up over the months
+    weights = {planned["exercise_id"]: rng.choice([10, 15, 20, 30, 40, 60]) for plan in plans for planned in plan}
+    workouts_per_week = rng.randint(3, 5)
+    for day in days:
+        if rng.random() < 0.9:
+            items = []
+            for meal, choices in FOODS.items():
+                if meal == "snack" and rng.random() < 0.5:
+                    continue
+                for name, kcal, protein, carbs, fat, (low, high) in rng.sample(choices, rng.randint(1, 2)):
+                    grams = rng.randrange(low, high + 1, 5)
+                    items.append({
+                        "log_item_id": str(uuid.UUID(int=rng.getrandbits(128), version=4)), "name": name,
+                        "quantity_g": grams, "calories": round(kcal * grams / 100, 1),
+                        "protein": round(protein * grams / 100, 1), "carbs": round(carbs * grams / 100, 1),
+                        "fat": round(fat * grams / 100, 1),
+                    })
+            meal_logs.append({"user_id": user_id, "date": day})
+            meal_items.append(items)
+        if rng.random() < workouts_per_week / 7:
+            exercises = []
+            for planned in rng.choice(plans):
+                weights[planned["exercise_id"]] += rng.choice([0, 0, 0, 0.5, 1])
+                weight = weights[planned["exercise_id"]]
+                reps = int(planned["reps"].split("-")[-1])
+                exercises.append({
+                    "log_exercise_id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                    "exercise_id": planned["exercise_id"], "exercise_name": planned["name"],
+                    "sets": [{"reps": max(1, reps - rng.randint(0, 2)), "weight": round(weight * 2) / 2}
+                             for _ in range(planned["sets"])],
+                })
+            workout_logs.append({"user_id": user_id, "date": day, "log_details_json": json.dumps(exercises),
+                                 "notes": rng.choice([None, None, None, "Felt strong", "Tired today", "New PR!"])})
+    return {"profile": profile, "foods": library, "plans": plan_rows, "meal_logs": meal_logs,
+            "meal_items": meal_items, "workout_logs": workout_logs}
+
+
+def exercise_names(db) -> dict[int, str]:
+    if not db.scalar(select(func.count()).select_from(Exercise)):
+        import_exercises(db, EXERCISE_DATA, update_existing=False)
+    return dict(db.execute(select(Exercise.id, Exercise.name)).all())
+
+
+def write_chunk(db, args, hashed_password: str, exercise_ids, days, numbers: range) -> dict[str, int]:
+    """Insert users `numbers` and everything they own, in one transaction."""
+    users = [{"email": email_for(args.email_prefix, n), "full_name": f"Load Test User {n}",
+              "hashed_password": hashed_password, "is_active": True} for n in numbers]
+    # sort_by_parameter_order: ids come back in the order of the rows, even as an executemany
+    user_ids = db.scalars(insert(User).returning(User.id, sort_by_parameter_order=True), users).all()
+    owned = [user_rows(random.Random(f"{args.seed}-{n}"), user_id, exercise_ids, days, args.foods_per_user)
+             for n, user_id in zip(numbers, user_ids)]
+
+    db.execute(insert(UserProfile), [rows["profile"] for rows in owned])
+    db.execute(insert(FoodItem), [food for rows in owned for food in rows["foods"]])
+    db.execute(insert(WorkoutPlan), [plan for rows in owned for plan in rows["plans"]])
+    workout_logs = [log for rows in owned for log in rows["workout_logs"]]
+    if workout_logs:
+        db.execute(insert(WorkoutLog), workout_logs)
+    meal_logs = [log for rows in owned for log in rows["meal_logs"]]
+    items = [log_items for rows in owned for log_items in rows["meal_items"]]
+    if meal_logs:
+        log_ids = db.scalars(insert(UserMealLog).returning(UserMealLog.id, sort_by_parameter_order=True),
+                             meal_logs).all()
+        db.execute(insert(MealLogItem), [{**item, "meal_log_id": log_id}
+                                         for log_id, log_items in zip(log_ids, items) for item in log_items])
+    db.commit()
+    return {"users": len(users), "meal_logs": len(meal_logs), "meal_items": sum(map(len, items)),
+            "workout_logs": len(workout_logs)}
+
+
+def cleanup(db, prefix: str) -> int:
+    """Delete the generated users and everything they own."""
+    user_ids = select(User.id).where(User.email.like(f"{prefix}-%@example.com")).scalar_subquery()
+    count = db.scalar(select(func.count()).select_from(User).where(User.email.like(f"{prefix}-%@example.com")))
+    db.execute(delete(MealLogItem).where(
+        MealLogItem.meal_log_id.in_(select(UserMealLog.id).where(UserMealLog.user_id.in_(user_ids)))))
+    for model in (UserMealLog, WorkoutLog, WorkoutPlan, FoodItem, UserProfile, RefreshToken):
+        db.execute(delete(model).where(model.user_id.in_(user_ids)))
+    db.execute(delete(User).where(User.id.in_(user_ids)))
+    db.commit()
+    return count
+
+
+def main(args) -> int:
+    with SessionLocal() as db:
+        if args.cleanup:
+            print(f"Deleted {cleanup(db, args.email_prefix)} generated users and their data")
+            return 0
+        if db.scalar(select(User.id).where(User.email == email_for(args.email_prefix, 1))):
+            print(f"Users named {email_for(args.email_prefix, 1)} etc. already exist; run with --cleanup first")
+            return 1
+
+        exercise_ids = exercise_names(db)
+        today = date.today()
+        days = [today - timedelta(days=n) for n in range(round(args.years * 365) - 1, -1, -1)]
+        hashed_password = get_password_hash(args.password)
+        totals: dict[str, int] = {}
+        started = time.perf_counter()
+        for first in range(1, args.users + 1, args.chunk_size):
+            counts = write_chunk(db, args, hashed_password, exercise_ids, days,
+                                 range(first, min(first + args.chunk_size, args.users + 1)))
+            for table, count in counts.items():
+                totals[table] = totals.get(table, 0) + count
+            print(f"  {totals['users']}/{args.users} users, {totals['meal_items']} meal items, "
+                  f"{totals['workout_logs']} workouts ({time.perf_counter() - started:.1f}s)", flush=True)
+
+    print(f"Generated {', '.join(f'{count} {table}' for table, count in totals.items())} "
+          f"in {time.perf_counter() - started:.1f}s")
+    print(f"Log in as {email_for(args.email_prefix, 1)} .. {email_for(args.email_prefix, args.users)} "
+          f"with password {args.password!r}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--years", type=float, default=1.0, help="days of history per user = years * 365")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--foods-per-user", type=int, default=50)
+    parser.add_argument("--email-prefix", default="loadtest", help="users are <prefix>-<n>@example.com")
+    parser.add_argument("--password", default="loadtest-password")
+    parser.add_argument("--chunk-size", type=int, default=20, help="users per transaction")
+    parser.add_argument("--cleanup", action="store_true", help="delete the generated users instead")
+    sys.exit(main(parser.parse_args()))
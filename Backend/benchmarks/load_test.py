@@ -0,0 +1,225 @@
+"""
+End-to-end load test over the real API routes.
+
+Logs in as users made by benchmarks.generate_data, then keeps --concurrency
+requests in flight for --duration seconds, each to a route picked from a
+weighted mix, as a random one of those users. Reports requests/sec and p50,
+p95 and p99 latency per route, and overall throughput.
+
+A mix is a preset name or route=weight pairs (routes listed by --list-routes):
+
+    python -m benchmarks.load_test --mix browse
+    python -m benchmarks.load_test --mix meals.by_date=5,meals.log=1,ai.analyze=1
+
+--spawn-server starts uvicorn on --base-url's port with the Gemini stub
+(NUTRITION_AI_STUB) switched on, so the whole run works offline; otherwise
+point --base-url at a server you started yourself.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+from urllib.parse import urlsplit
+
+import httpx
+
+from benchmarks.generate_data import FOODS, email_for
+from benchmarks.loadgen import LatencyRecorder, drive_mix, login, print_report
+
+MIXES = {
+    # Someone opening the app: mostly reads, the odd new entry
+    "browse": {
+        "meals.by_date": 30, "workout_logs.range": 20, "plans.list": 10, "exercises.list": 5,
+        "exercises.search": 10, "foods.search": 10, "profile.me": 5, "users.me": 5,
+        "meals.log": 3, "workout_logs.create": 2,
+    },
+    # Logging meals and workouts through the day
+    "logging": {
+        "meals.log": 25, "meals.by_date": 25, "meals.update_item": 5, "foods.search": 15,
+        "ai.analyze": 10, "workout_logs.create": 10, "workout_logs.range": 10,
+    },
+    "ai": {"ai.analyze": 1},
+    "logins": {"login": 1},
+}
+SEARCH_TERMS = ["chicken", "oat", "salmn", "protein", "rice", "yogurt", "bench", "squat", "curl", "dumbell", "press"]
+MEALS = ["2 scrambled eggs, toast and a latte", "chicken caesar salad", "bowl of oatmeal with banana",
+         "salmon with rice and broccoli", "protein shake", "spaghetti bolognese and a side salad"]
+
+
+class Users:
+    """Logged-in generated users; each request goes out as a random one."""
+
+    def __init__(self, tokens: list[str], rng: random.Random):
+        self.headers = [{"Authorization": f"Bearer {token}"} for token in tokens]
+        self.rng = rng
+
+    def pick(self) -> dict:
+        return self.rng.choice(self.headers)
+
+
+def build_routes(users: Users, args, exercises: list[dict], rng: random.Random) -> dict:
+    history_days = max(1, round(args.years * 365))
+
+    def random_day() -> date:
+        return date.today() - timedelta(days=rng.randrange(history_days))
+
+    def food_item() -> dict:
+        name, kcal, protein, carbs, fat, (low, high) = rng.choice(rng.choice(list(FOODS.values())))
+        grams = rng.randrange(low, high + 1, 5)
+        return {"name": name, "quantity_g": grams, "calories": kcal * grams / 100,
+                "protein": protein * grams / 100, "carbs": carbs * grams / 100, "fat": fat * grams / 100}
+
+    def workout() -> dict:
+        chosen = rng.sample(exercises, min(len(exercises), 4))
+        return {"date": random_day().isoformat(), "exercises": [
+            {"exercise_id": exercise["id"], "exercise_name": exercise["name"],
+             "sets": [{"reps": rng.randint(5, 12), "weight": rng.randrange(10, 100, 5)} for _ in range(3)]}
+            for exercise in chosen
+        ]}
+
+    async def update_item(client: httpx.AsyncClient) -> httpx.Response:
+        # Read a day, then change one of its items (two requests, timed together)
+        headers, day = users.pick(), random_day().isoformat()
+        log = await client.get("/api/v1/nutrition/meals/by-date", params={"log_date": day}, headers=headers)
+        items = log.json()["food_items"]["items"] if log.status_code == 200 else []
+        if not items:
+            return log
+        item = {**rng.choice(items), "quantity_g": rng.randrange(50, 300, 5)}
+        return await client.put(f"/api/v1/nutrition/meals/log-item/{item['log_item_id']}",
+                                params={"log_date": day}, json=item, headers=headers)
+
+    def recent_range() -> dict:
+        end = random_day()
+        return {"start_date": (end - timedelta(days=30)).isoformat(), "end_date": end.isoformat()}
+
+    login_form = lambda: {"username": email_for(args.email_prefix, rng.randint(1, args.users)),
+                          "password": args.password}
+    return {
+        "meals.by_date": lambda c: c.get("/api/v1/nutrition/meals/by-date",
+                                         params={"log_date": random_day().isoformat()}, headers=users.pick()),
+        "meals.log": lambda c: c.post("/api/v1/nutrition/meals/log", params={"log_date": random_day().isoformat()},
+                                      json={"items_to_log": [food_item() for _ in range(rng.randint(1, 3))]},
+                                      headers=users.pick()),
+        "meals.update_item": update_item,
+        "foods.search": lambda c: c.get("/api/v1/nutrition/foods/search",
+                                        params={"query": rng.choice(SEARCH_TERMS)}, headers=users.pick()),
+        "ai.analyze": lambda c: c.post("/api/v1/nutrition/nutrition/analyze",
+                                       json={"query": rng.choice(MEALS)}, headers=users.pick()),
+        "workout_logs.range": lambda c: c.get("/api/v1/workouts/logs", params=recent_range(), headers=users.pick()),
+        "workout_logs.create": lambda c: c.post("/api/v1/workouts/logs", json=workout(), headers=users.pick()),
+        "plans.list": lambda c: c.get("/api/v1/workouts/plans", headers=users.pick()),
+        "exercises.list": lambda c: c.get("/api/v1/workouts/exercises"),
+        "exercises.search": lambda c: c.get("/api/v1/workouts/exercises/search",
+                                            params={"query": rng.choice(SEARCH_TERMS)}),
+        "profile.me": lambda c: c.get("/api/v1/profile/me", headers=users.pick()),
+        "users.me": lambda c: c.get("/api/v1/users/me", headers=users.pick()),
+        "login": lambda c: c.post("/api/v1/login/token", data=login_form()),
+    }
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    if value in MIXES:
+        return MIXES[value]
+    mix = {}
+    for pair in value.split(","):
+        route, _, weight = pair.partition("=")
+        mix[route.strip()] = float(weight or 1)
+    return mix
+
+
+def spawn_server(args) -> subprocess.Popen:
+    url = urlsplit(args.base_url)
+    env = {**os.environ, "NUTRITION_AI_STUB": "true", "NUTRITION_AI_STUB_LATENCY_MS": str(args.ai_latency_ms)}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", url.hostname, "--port", str(url.port or 80),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        env=env,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(args.base_url + "/", timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        if server.poll() is not None:
+            break
+        time.sleep(0.25)
+    server.terminate()
+    raise SystemExit("The server did not start")
+
+
+async def run(args, mix: dict[str, float]) -> dict:
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        # Log in one user per --login-concurrency at a time: bcrypt is slow on purpose
+        semaphore = asyncio.Semaphore(args.login_concurrency)
+
+        async def log_in(n: int) -> str:
+            async with semaphore:
+                return await login(client, email_for(args.email_prefix, n), args.password)
+
+        tokens = await asyncio.gather(*(log_in(n) for n in range(1, args.users + 1)))
+        exercises = (await client.get("/api/v1/workouts/exercises", params={"limit": 200})).json()
+        routes = build_routes(Users(tokens, rng), args, exercises, rng)
+        unknown = set(mix) - set(routes)
+        if unknown:
+            raise SystemExit(f"Unknown routes in --mix: {', '.join(sorted(unknown))}")
+
+        if args.warmup:
+            await drive_mix(client, routes, mix, LatencyRecorder(), args.concurrency, args.warmup, args.seed)
+        recorder = LatencyRecorder()
+        await drive_mix(client, routes, mix, recorder, args.concurrency, args.duration, args.seed)
+        recorder.stop()
+    return recorder.report()
+
+
+def main(args) -> int:
+    if args.list_routes:
+        print("\n".join(build_routes(Users(["x"], random.Random()), args, [], random.Random())))
+        return 0
+    mix = parse_mix(args.mix)
+    server = spawn_server(args) if args.spawn_server else None
+    try:
+        report = asyncio.run(run(args, mix))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    print_report(f"mix {args.mix}, {args.concurrency} concurrent, {args.duration:.0f}s", report)
+    total = sum(row["requests"] for row in report.values())
+    errors = sum(count for row in report.values() for code, count in row["statuses"].items() if not 200 <= code < 400)
+    print(f"\ntotal: {total} requests, {total / args.duration:,.1f} req/s, {errors} errors")
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({"mix": mix, "concurrency": args.concurrency, "duration": args.duration, "routes": report},
+                      file, indent=2)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--mix", default="browse", help=f"a preset ({', '.join(MIXES)}) or route=weight,...")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="seconds of unrecorded traffic first")
+    parser.add_argument("--users", type=int, default=20, help="how many generated users to log in as")
+    parser.add_argument("--email-prefix", default="loadtest")
+    parser.add_argument("--password", default="loadtest-password")
+    parser.add_argument("--years", type=float, default=1.0, help="history generated per user, to pick dates from")
+    parser.add_argument("--login-concurrency", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--spawn-server", action="store_true", help="run uvicorn with the Gemini stub")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers, with --spawn-server")
+    parser.add_argument("--ai-latency-ms", type=float, default=0.0, help="stub Gemini latency, with --spawn-server")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--list-routes", action="store_true")
+    sys.exit(main(parser.parse_args()))
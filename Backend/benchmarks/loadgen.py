@@ -0,0 +1,126 @@
+"""
+Small asyncio load generator shared by the benchmark scripts.
+
+Run the API separately (e.g. `uvicorn app.main:app --workers 4`) and point
+the scripts at it with --base-url. Requires `httpx`.
+"""
+import asyncio
+import math
+import random
+import time
+from collections import defaultdict
+from typing import Awaitable, Callable
+
+import httpx
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+class LatencyRecorder:
+    """Collects per-route latencies and status codes."""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def record(self, route: str, seconds: float, status_code: int):
+        self.latencies[route].append(seconds)
+        self.statuses[route][status_code] += 1
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    def report(self) -> dict[str, dict]:
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        rows = {}
+        for route, values in self.latencies.items():
+            rows[route] = {
+                "requests": len(values),
+                "req_per_s": round(len(values) / elapsed, 1) if elapsed else 0.0,
+                "p50_ms": round(percentile(values, 50) * 1000, 1),
+                "p95_ms": round(percentile(values, 95) * 1000, 1),
+                "p99_ms": round(percentile(values, 99) * 1000, 1),
+                "statuses": dict(self.statuses[route]),
+            }
+        return rows
+
+
+def print_report(title: str, report: dict[str, dict]):
+    print(f"\n== {title}")
+    print(f"{'route':<40} {'reqs':>7} {'req/s':>8} {'p50ms':>8} {'p95ms':>8} {'p99ms':>8}  statuses")
+    for route, row in sorted(report.items()):
+        print(
+            f"{route:<40} {row['requests']:>7} {row['req_per_s']:>8} {row['p50_ms']:>8} "
+            f"{row['p95_ms']:>8} {row['p99_ms']:>8}  {row['statuses']}"
+        )
+
+
+RequestFactory = Callable[[httpx.AsyncClient], Awaitable[httpx.Response]]
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    route: str,
+    make_request: RequestFactory,
+    recorder: LatencyRecorder,
+    concurrency: int,
+    duration: float,
+):
+    """Keep `concurrency` requests to `route` in flight for `duration` seconds."""
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = await make_request(client)
+                status_code = response.status_code
+            except httpx.HTTPError:
+                status_code = 0
+            recorder.record(route, time.perf_counter() - start, status_code)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def drive_mix(
+    client: httpx.AsyncClient,
+    routes: dict[str, RequestFactory],
+    weights: dict[str, float],
+    recorder: LatencyRecorder,
+    concurrency: int,
+    duration: float,
+    seed: int = 0,
+):
+    """Like drive(), but each request goes to a route picked at random by `weights`."""
+    deadline = time.perf_counter() + duration
+    names = [name for name in weights if weights[name] > 0]
+    cumulative = [sum(weights[name] for name in names[:n + 1]) for n in range(len(names))]
+
+    async def worker(rng: random.Random):
+        while time.perf_counter() < deadline:
+            route = rng.choices(names, cum_weights=cumulative)[0]
+            start = time.perf_counter()
+            try:
+                response = await routes[route](client)
+                status_code = response.status_code
+            except httpx.HTTPError:
+                status_code = 0
+            recorder.record(route, time.perf_counter() - start, status_code)
+
+    await asyncio.gather(*(worker(random.Random(f"{seed}-{n}")) for n in range(concurrency)))
+
+
+async def login(client: httpx.AsyncClient, email: str, password: str) -> str:
+    response = await client.post(
+        "/api/v1/login/token", data={"username": email, "password": password}
+    )
+    response.raise_for_status()
+    return response.json()["access_token"]
@@ -0,0 +1,105 @@
+"""Normalize meal logs into meal_log_items
+
+Revision ID: 9b4f0c7d2a13
+Revises: 5d2e9b7c41a0
+Create Date: 2026-10-18 11:02:47.193540
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b4f0c7d2a13'
+down_revision: Union[str, Sequence[str], None] = '5d2e9b7c41a0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ITEM_FIELDS = ('log_item_id', 'name', 'quantity_g', 'calories', 'protein', 'carbs', 'fat')
+MACRO_FIELDS = ('calories', 'protein', 'carbs', 'fat')
+BATCH_SIZE = 1000
+
+meal_logs = sa.table(
+    'user_meal_logs',
+    sa.column('id', sa.Integer),
+    sa.column('food_items_json', sa.String),
+    sa.column('total_macros_json', sa.String),
+)
+meal_log_items = sa.table(
+    'meal_log_items',
+    sa.column('id', sa.Integer),
+    sa.column('meal_log_id', sa.Integer),
+    *(sa.column(field) for field in ITEM_FIELDS),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('meal_log_items',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('meal_log_id', sa.Integer(), nullable=False),
+    sa.Column('log_item_id', sa.String(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('quantity_g', sa.Float(), nullable=False),
+    sa.Column('calories', sa.Float(), nullable=False),
+    sa.Column('protein', sa.Float(), nullable=False),
+    sa.Column('carbs', sa.Float(), nullable=False),
+    sa.Column('fat', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['meal_log_id'], ['user_meal_logs.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_meal_log_items_meal_log_id_log_item_id', 'meal_log_items', ['meal_log_id', 'log_item_id'], unique=False)
+
+    # Backfill: one row per item of each day's JSON blob, keeping the list order
+    bind = op.get_bind()
+    rows = bind.execute(sa.select(meal_logs.c.id, meal_logs.c.food_items_json).order_by(meal_logs.c.id))
+    batch = []
+    for meal_log_id, food_items_json in rows:
+        items = json.loads(food_items_json).get('items', []) if food_items_json else []
+        for item in items:
+            batch.append({'meal_log_id': meal_log_id, **{field: item[field] for field in ITEM_FIELDS}})
+        if len(batch) >= BATCH_SIZE:
+            bind.execute(meal_log_items.insert(), batch)
+            batch = []
+    if batch:
+        bind.execute(meal_log_items.insert(), batch)
+
+    op.drop_column('user_meal_logs', 'food_items_json')
+    op.drop_column('user_meal_logs', 'total_macros_json')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('user_meal_logs', sa.Column('food_items_json', sa.VARCHAR(), autoincrement=False, nullable=True))
+    op.add_column('user_meal_logs', sa.Column('total_macros_json', sa.VARCHAR(), autoincrement=False, nullable=True))
+
+    # Rebuild each day's JSON blobs from its items
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.select(meal_log_items.c.meal_log_id, *(meal_log_items.c[field] for field in ITEM_FIELDS))
+        .order_by(meal_log_items.c.meal_log_id, meal_log_items.c.id)
+    )
+    logs = {}
+    for row in rows:
+        logs.setdefault(row.meal_log_id, []).append({field: row._mapping[field] for field in ITEM_FIELDS})
+    for meal_log_id, items in logs.items():
+        totals = {field: sum(item[field] for item in items) for field in MACRO_FIELDS}
+        bind.execute(
+            meal_logs.update().where(meal_logs.c.id == meal_log_id).values(
+                food_items_json=json.dumps({'items': items}),
+                total_macros_json=json.dumps(totals),
+            )
+        )
+    empty_totals = json.dumps({field: 0 for field in MACRO_FIELDS})
+    bind.execute(
+        meal_logs.update().where(meal_logs.c.food_items_json.is_(None)).values(
+            food_items_json=json.dumps({'items': []}),
+            total_macros_json=empty_totals,
+        )
+    )
+
+    op.drop_index('ix_meal_log_items_meal_log_id_log_item_id', table_name='meal_log_items')
+    op.drop_table('meal_log_items')
@@ -0,0 +1,51 @@
+"""Store workout log and plan JSON as bytes; add blob_dictionaries table
+
+Revision ID: a83d61f0c5e7
+Revises: f2c7a9e4b318
+Create Date: 2026-10-18 19:12:44.803516
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a83d61f0c5e7'
+down_revision: Union[str, Sequence[str], None] = 'f2c7a9e4b318'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The EncodedJSON columns (app.db.blob_codec); their existing JSON text stays as is, in bytes
+BLOB_COLUMNS = [('workout_logs', 'log_details_json'), ('workout_plans', 'plan_details_json')]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('blob_dictionaries',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('column', sa.String(), nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    for table, column in BLOB_COLUMNS:
+        if op.get_bind().dialect.name == 'postgresql':
+            op.alter_column(table, column, type_=sa.LargeBinary(), existing_type=sa.Text(),
+                            existing_nullable=False, postgresql_using=f"convert_to({column}, 'UTF8')")
+        else:
+            # SQLite keeps a value's own storage class whatever the column type says
+            op.execute(f'UPDATE {table} SET {column} = CAST({column} AS BLOB)')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Only plain JSON converts back: run `BLOB_FORMAT=json python -m app.reencode_blobs` first
+    for table, column in BLOB_COLUMNS:
+        if op.get_bind().dialect.name == 'postgresql':
+            op.alter_column(table, column, type_=sa.Text(), existing_type=sa.LargeBinary(),
+                            existing_nullable=False, postgresql_using=f"convert_from({column}, 'UTF8')")
+        else:
+            op.execute(f'UPDATE {table} SET {column} = CAST({column} AS TEXT)')
+    op.drop_table('blob_dictionaries')
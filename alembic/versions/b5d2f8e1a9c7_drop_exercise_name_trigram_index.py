@@ -0,0 +1,40 @@
+"""Drop the exercise name trigram index
+
+Revision ID: b5d2f8e1a9c7
+Revises: c4e19b7a2d53
+Create Date: 2026-10-18 22:41:09.530271
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d2f8e1a9c7'
+down_revision: Union[str, Sequence[str], None] = 'c4e19b7a2d53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Exercise search runs on the in-process index (app.services.exercise_catalog) now
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_exercises_name_trgm', table_name='exercises', postgresql_concurrently=True,
+                      if_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_exercises_name_trgm', 'exercises', ['name'], unique=False,
+            postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'},
+            postgresql_concurrently=True, if_not_exists=True,
+        )
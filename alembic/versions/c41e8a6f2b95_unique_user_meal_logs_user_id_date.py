@@ -0,0 +1,44 @@
+"""Unique (user_id, date) on user_meal_logs
+
+Revision ID: c41e8a6f2b95
+Revises: 9b4f0c7d2a13
+Create Date: 2026-10-18 11:48:05.667213
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41e8a6f2b95'
+down_revision: Union[str, Sequence[str], None] = '9b4f0c7d2a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Concurrent first-of-day logs could create several rows for one day.
+    # Fold their items into the oldest row and drop the rest before adding the constraint.
+    op.execute("""
+        CREATE TEMPORARY TABLE meal_log_duplicates AS
+        SELECT id, MIN(id) OVER (PARTITION BY user_id, date) AS keep_id
+        FROM user_meal_logs
+    """)
+    op.execute("""
+        UPDATE meal_log_items SET meal_log_id = (
+            SELECT keep_id FROM meal_log_duplicates d WHERE d.id = meal_log_items.meal_log_id
+        )
+        WHERE meal_log_id IN (SELECT id FROM meal_log_duplicates WHERE id <> keep_id)
+    """)
+    op.execute("DELETE FROM user_meal_logs WHERE id IN (SELECT id FROM meal_log_duplicates WHERE id <> keep_id)")
+    op.execute("DROP TABLE meal_log_duplicates")
+
+    op.create_index('ix_user_meal_logs_user_id_date', 'user_meal_logs', ['user_id', 'date'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_meal_logs_user_id_date', table_name='user_meal_logs')
@@ -0,0 +1,42 @@
+"""Add row versions for the ETags of per-user GETs
+
+Revision ID: c4e19b7a2d53
+Revises: a83d61f0c5e7
+Create Date: 2026-10-18 21:03:17.215094
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e19b7a2d53'
+down_revision: Union[str, Sequence[str], None] = 'a83d61f0c5e7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+VERSIONED_TABLES = ['users', 'user_profiles', 'user_meal_logs']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in VERSIONED_TABLES:
+        op.add_column(table, sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    if op.get_bind().dialect.name == 'postgresql':
+        op.add_column('workout_plans', sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(),
+                                                 nullable=False))
+        op.alter_column('workout_plans', 'updated_at', server_default=None)
+    else:
+        # SQLite can't add a column whose default isn't a constant, nor make it NOT NULL afterwards
+        # without rebuilding the table; the model sets it on every insert
+        op.add_column('workout_plans', sa.Column('updated_at', sa.DateTime(), nullable=True))
+        op.execute('UPDATE workout_plans SET updated_at = CURRENT_TIMESTAMP')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('workout_plans', 'updated_at')
+    for table in reversed(VERSIONED_TABLES):
+        op.drop_column(table, 'version')
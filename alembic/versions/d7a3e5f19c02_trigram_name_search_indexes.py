@@ -0,0 +1,53 @@
+"""Trigram indexes for food and exercise name search
+
+Revision ID: d7a3e5f19c02
+Revises: c41e8a6f2b95
+Create Date: 2026-10-18 14:02:37.118409
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a3e5f19c02'
+down_revision: Union[str, Sequence[str], None] = 'c41e8a6f2b95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRGM_INDEXES = (
+    ('ix_food_items_name_trgm', 'food_items'),
+    ('ix_exercises_name_trgm', 'exercises'),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Food search is always scoped to one user
+    op.create_index(op.f('ix_food_items_user_id'), 'food_items', ['user_id'], unique=False)
+
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    # Needs CREATE privilege on the database (or a superuser) the first time
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # CONCURRENTLY so building over a large food_items table doesn't block writes;
+    # it can't run inside the migration's transaction
+    with op.get_context().autocommit_block():
+        for name, table in TRGM_INDEXES:
+            op.create_index(
+                name, table, ['name'], unique=False,
+                postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'},
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name, table in TRGM_INDEXES:
+                op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+        # pg_trgm is left installed; other objects may depend on it
+    op.drop_index(op.f('ix_food_items_user_id'), table_name='food_items')
@@ -0,0 +1,43 @@
+"""Composite (user_id, date) index on workout_logs
+
+Revision ID: f2c7a9e4b318
+Revises: e5b1c8d2f4a6
+Create Date: 2026-10-18 17:40:52.361077
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c7a9e4b318'
+down_revision: Union[str, Sequence[str], None] = 'e5b1c8d2f4a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        op.create_index('ix_workout_logs_user_id_date', 'workout_logs', ['user_id', 'date'], unique=False)
+        return
+    # CONCURRENTLY so a large workout_logs table stays writable while it builds
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_workout_logs_user_id_date', 'workout_logs', ['user_id', 'date'], unique=False,
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        op.drop_index('ix_workout_logs_user_id_date', table_name='workout_logs')
+        return
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_workout_logs_user_id_date', table_name='workout_logs',
+            postgresql_concurrently=True, if_exists=True,
+        )
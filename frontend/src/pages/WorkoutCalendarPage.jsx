@@ -6,6 +6,28 @@ import { Link } from 'react-router-dom';
 // Helper to format date as YYYY-MM-DD
 const toYYYYMMDD = (date) => date.toISOString().split('T')[0];
 
+// GET /workouts/logs returns one page at a time; the Link header points at the next one
+const LOGS_PAGE_SIZE = 100;
+
+const fetchAllLogs = async (startDate, endDate) => {
+  const logs = [];
+  let cursor = null;
+  do {
+    const res = await apiClient.get('/workouts/logs', {
+      params: {
+        start_date: toYYYYMMDD(startDate),
+        end_date: toYYYYMMDD(endDate),
+        limit: LOGS_PAGE_SIZE,
+        ...(cursor && { cursor }),
+      },
+    });
+    logs.push(...res.data);
+    const next = res.headers.link?.match(/<([^>]+)>;\s*rel="next"/);
+    cursor = next ? new URL(next[1]).searchParams.get('cursor') : null;
+  } while (cursor);
+  return logs;
+};
+
 export default function WorkoutCalendarPage() {
   const [date, setDate] = useState(new Date());
   const [logs, setLogs] = useState({}); // Stores logs keyed by date string
@@ -17,10 +39,10 @@ export default function WorkoutCalendarPage() {
     const endDate = new Date(viewDate.getFullYear(), viewDate.getMonth() + 1, 0);
     
     try {
-      const res = await apiClient.get(`/workouts/logs?start_date=${toYYYYMMDD(startDate)}&end_date=${toYYYYMMDD(endDate)}`);
+      const data = await fetchAllLogs(startDate, endDate);
       
       // Map logs to a dictionary for easy lookup
-      const logsByDate = res.data.reduce((acc, log) => {
+      const logsByDate = data.reduce((acc, log) => {
         acc[log.date] = log;
         return acc;
       }, {});